@@ -8,12 +8,11 @@ import time
 import logging
 import subprocess
 import queue
-import base64
-from flask import request, jsonify, Blueprint
+from flask import request, jsonify, Blueprint, Response
 from datetime import datetime
 from printer_controller import PrintJob, ConnectionStatus
 from werkzeug.utils import secure_filename
-from config import SUPPORTED_IMAGE_FORMATS, MAX_UPLOAD_SIZE
+from config import SUPPORTED_IMAGE_FORMATS, MAX_UPLOAD_SIZE, PREVIEW_CACHE_MAX_AGE
 from io import BytesIO
 from PIL import Image, UnidentifiedImageError
 # ---- Watcher MQTT Notification ----
@@ -134,18 +133,24 @@ def setup_api_routes(app, printer):
             dither_threshold = int(request.form.get('dither_threshold', '128'))
             dither_strength = float(request.form.get('dither_strength', '1.0'))
             scaling_mode = request.form.get('scaling_mode', 'fit_aspect')
+            dither_algorithm = request.form.get('dither_algorithm') or None
             
             # Bild verarbeiten mit erweiterten Parametern (image_data bereits gelesen)
             result = printer.process_image_for_preview(
                 image_data, fit_to_label, maintain_aspect, enable_dither,
                 dither_threshold=dither_threshold, dither_strength=dither_strength,
-                scaling_mode=scaling_mode
+                scaling_mode=scaling_mode, dither_algorithm=dither_algorithm
             )
             
             if result:
+                # Token auf das fertige Raster: Drucken ohne erneuten Upload (/api/print-token)
+                token_info = printer.create_preview_token(result) or {}
                 return jsonify({
                     'success': True,
-                    'preview_base64': result.preview_base64,
+                    'preview_id': result.preview_id,
+                    'preview_url': f'/api/preview/{result.preview_id}.png',
+                    'preview_token': token_info.get('token'),
+                    'token_expires_in': token_info.get('expires_in'),
                     'info': {
                         **result.info,
                         # Für Vorschau: Offsets auf 0 setzen, da sie nicht angewendet werden
@@ -160,6 +165,21 @@ def setup_api_routes(app, printer):
             logger.error(f"Preview error: {e}", exc_info=True)
             return jsonify({'success': False, 'error': str(e)})
 
+    @app.route('/api/preview/<preview_id>.png', methods=['GET'])
+    def api_preview_png(preview_id):
+        """Liefert eine Vorschau als 1-Bit-PNG (Inhalts-Hash als ETag, 304 bei Wiederholung)"""
+        # Inhalt ist durch den Hash festgelegt - der Browser darf ohne Server-Lookup revalidieren
+        if preview_id in request.if_none_match:
+            response = Response(status=304)
+        else:
+            png = printer.get_preview_png(preview_id)
+            if png is None:
+                return jsonify({'success': False, 'error': 'Vorschau unbekannt oder abgelaufen'}), 404
+            response = Response(png, mimetype='image/png')
+        response.set_etag(preview_id)
+        response.headers['Cache-Control'] = f'private, max-age={PREVIEW_CACHE_MAX_AGE}, immutable'
+        return response
+
     @app.route('/api/print-image', methods=['POST'])
     def api_print_image():
         """Druckt hochgeladenes Bild MIT ALLEN Vorschau-Parametern"""
@@ -181,6 +201,7 @@ def setup_api_routes(app, printer):
             dither_threshold = int(request.form.get('dither_threshold', '128'))
             dither_strength = float(request.form.get('dither_strength', '1.0'))
             scaling_mode = request.form.get('scaling_mode', 'fit_aspect')
+            dither_algorithm = request.form.get('dither_algorithm') or None
             
             # Legacy-Support für 'dither' Parameter
             if 'dither' in request.form:
@@ -202,7 +223,7 @@ def setup_api_routes(app, printer):
             # Für Log/Dateiname (optional)
             filename = secure_filename(file.filename or f"image.{detected_fmt.lower()}")
             
-            logger.info(f"🖨️ Printing image with settings: fit_to_label={fit_to_label}, maintain_aspect={maintain_aspect}, dither={enable_dither}, threshold={dither_threshold}, strength={dither_strength}, scaling={scaling_mode}")
+            logger.info(f"🖨️ Printing image with settings: fit_to_label={fit_to_label}, maintain_aspect={maintain_aspect}, dither={enable_dither}, threshold={dither_threshold}, strength={dither_strength}, scaling={scaling_mode}, algorithm={dither_algorithm or 'default'}")
 
             # ---- Drucken MIT ALLEN PARAMETERN ----
             if use_queue:
@@ -215,7 +236,8 @@ def setup_api_routes(app, printer):
                     'enable_dither': enable_dither,
                     'dither_threshold': dither_threshold,
                     'dither_strength': dither_strength,
-                    'scaling_mode': scaling_mode
+                    'scaling_mode': scaling_mode,
+                    'dither_algorithm': dither_algorithm
                 })
                 return jsonify({
                     'success': True,
@@ -230,7 +252,8 @@ def setup_api_routes(app, printer):
                         'enable_dither': enable_dither,
                         'dither_threshold': dither_threshold,
                         'dither_strength': dither_strength,
-                        'scaling_mode': scaling_mode
+                        'scaling_mode': scaling_mode,
+                        'dither_algorithm': dither_algorithm
                     }
                 })
             else:
@@ -242,7 +265,8 @@ def setup_api_routes(app, printer):
                     enable_dither=enable_dither,
                     dither_threshold=dither_threshold,
                     dither_strength=dither_strength,
-                    scaling_mode=scaling_mode
+                    scaling_mode=scaling_mode,
+                    dither_algorithm=dither_algorithm
                 )
                 return jsonify({
                     'success': success,
@@ -256,13 +280,33 @@ def setup_api_routes(app, printer):
                         'enable_dither': enable_dither,
                         'dither_threshold': dither_threshold,
                         'dither_strength': dither_strength,
-                        'scaling_mode': scaling_mode
+                        'scaling_mode': scaling_mode,
+                        'dither_algorithm': dither_algorithm
                     }
                 })
 
         except Exception as e:
             logger.error(f"API print image error: {e}")
             return jsonify({'success': False, 'error': str(e)}), 500
+
+    @app.route('/api/print-token', methods=['POST'])
+    def api_print_token():
+        """Druckt das Raster einer Vorschau per Token (kein Upload, kein erneutes Dithering)"""
+        try:
+            payload = request.get_json(silent=True) or request.form
+            token = payload.get('token') or payload.get('preview_token')
+            if not token:
+                return jsonify({'success': False, 'error': 'Kein Vorschau-Token angegeben'}), 400
+            use_queue = str(payload.get('use_queue', 'false')).lower() == 'true'
+            
+            result = printer.print_preview_token(token, use_queue=use_queue)
+            if result.get('token_expired'):
+                return jsonify(result), 410
+            return jsonify(result)
+        except Exception as e:
+            logger.error(f"API print token error: {e}")
+            return jsonify({'success': False, 'error': str(e)}), 500
+
     @app.route('/api/print-text', methods=['POST'])
     def api_print_text():
         """Druckt Text mit Offset-Einstellungen"""
@@ -326,17 +370,13 @@ def setup_api_routes(app, printer):
                 img = printer.create_text_image_preview(text, font_size, alignment)
             
             if img:
-                # Als Base64 für Vorschau konvertieren
-                import io
-                import base64
-                
-                img_buffer = io.BytesIO()
-                img.save(img_buffer, format='PNG')
-                img_base64 = base64.b64encode(img_buffer.getvalue()).decode('utf-8')
+                # Als 1-Bit-PNG veröffentlichen, Browser lädt es per GET (ETag/304)
+                preview_id = printer.publish_preview_image(img)
                 
                 return jsonify({
                     'success': True,
-                    'preview_base64': img_base64,
+                    'preview_id': preview_id,
+                    'preview_url': f'/api/preview/{preview_id}.png',
                     'info': {
                         'width': img.width,
                         'height': img.height,
@@ -391,6 +431,15 @@ def setup_api_routes(app, printer):
             logger.error(f"Queue status error: {e}", exc_info=True)
             return jsonify({'error': str(e)})
 
+    @app.route('/api/printer-status', methods=['GET'])
+    def api_printer_status():
+        """Fragt Papier-, Deckel- und Akkustatus beim Drucker ab"""
+        try:
+            return jsonify(printer.query_printer_status())
+        except Exception as e:
+            logger.error(f"Printer status error: {e}", exc_info=True)
+            return jsonify({'success': False, 'error': str(e)})
+
     @app.route('/api/clear-queue', methods=['POST'])
     def api_clear_queue():
         """Leert die Print Queue"""
@@ -611,20 +660,16 @@ def setup_api_routes(app, printer):
             # Bild mit Codes erstellen - OHNE OFFSETS für Vorschau!
             img = printer.create_text_image_with_codes_preview(text, font_size, alignment)
             if img:
-                # Als Base64 für Vorschau konvertieren
-                import io
-                import base64
-                
-                img_buffer = io.BytesIO()
-                img.save(img_buffer, format='PNG')
-                img_base64 = base64.b64encode(img_buffer.getvalue()).decode('utf-8')
+                # Als 1-Bit-PNG veröffentlichen, Browser lädt es per GET (ETag/304)
+                preview_id = printer.publish_preview_image(img)
                 
                 # Codes analysieren für Info
                 processed_text, codes = printer.code_generator.parse_and_process_text(text)
                 
                 return jsonify({
                     'success': True,
-                    'preview_base64': img_base64,
+                    'preview_id': preview_id,
+                    'preview_url': f'/api/preview/{preview_id}.png',
                     'info': {
                         'width': img.width,
                         'height': img.height,
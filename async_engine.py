@@ -0,0 +1,214 @@
+"""
+Asyncio-Engine für Phomemo M110
+Ein Event-Loop-Thread treibt Übertragungen, Heartbeats und Verbindungs-
+überwachung: nicht-blockierende Writes per add_writer, Pacing per Timer
+Wird von printer_controller.py verwendet
+"""
+
+import asyncio
+import logging
+import threading
+import functools
+import concurrent.futures
+from typing import Any, Awaitable, Callable, Coroutine, Dict, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncPrinterEngine:
+    """
+    Event-Loop in einem eigenen Thread mit thread-sicherer Brücke
+
+    Flask-Requests und die Queue rufen Coroutinen über run() (blockierend,
+    Ergebnis) oder submit() (concurrent.futures.Future) auf; innerhalb des
+    Loops wird direkt awaited. Der Transport-Kanal läuft nicht-blockierend:
+    ist der Puffer voll, wartet writev() per loop.add_writer statt einen
+    Thread zu parken. Pausen laufen als Timer (asyncio.sleep), wiederkehrende
+    Aufgaben (Heartbeat, Monitor) als Tasks im selben Loop.
+
+    Blockierende Aufrufe (subprocess, rfcomm) gehen über to_thread() in den
+    Default-Executor des Loops.
+    """
+
+    def __init__(self, name: str = 'phomemo-asyncio'):
+        self.name = name
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._periodic: Dict[str, asyncio.Task] = {}
+        self.stats = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'inflight': 0,
+            'writer_waits': 0,
+            'bytes_written': 0,
+        }
+
+    # ------------------------------------------------------------------ Loop
+
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self.loop = loop
+        self._ready.set()
+        logger.info("📡 Asyncio engine started")
+        try:
+            loop.run_forever()
+        finally:
+            pending = asyncio.all_tasks(loop)
+            for task in pending:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            loop.run_until_complete(loop.shutdown_default_executor())
+            loop.close()
+            logger.info("📡 Asyncio engine stopped")
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        with self._lock:
+            if not self.running:
+                self._ready.clear()
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+        # Auch parallele Aufrufer warten, bis der Loop steht
+        self._ready.wait()
+
+    def stop(self, timeout: float = 5.0):
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None and thread.is_alive():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            thread.join(timeout=timeout)
+        self._periodic.clear()
+
+    def in_loop_thread(self) -> bool:
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    # ------------------------------------------------------------------ Brücke
+
+    async def _tracked(self, coro: Coroutine) -> Any:
+        self.stats['inflight'] += 1
+        try:
+            result = await coro
+            self.stats['completed'] += 1
+            return result
+        except BaseException:
+            self.stats['failed'] += 1
+            raise
+        finally:
+            self.stats['inflight'] -= 1
+
+    def submit(self, coro: Coroutine) -> concurrent.futures.Future:
+        """Plant coro im Loop ein (startet ihn bei Bedarf) - aus beliebigen Threads"""
+        self.start()
+        self.stats['submitted'] += 1
+        return asyncio.run_coroutine_threadsafe(self._tracked(coro), self.loop)
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """Führt coro im Loop aus und wartet auf das Ergebnis (Brücke für Flask/Queue-Threads)"""
+        if self.in_loop_thread():
+            coro.close()
+            raise RuntimeError("blocking bridge called from the event loop - await the coroutine instead")
+        return self.submit(coro).result(timeout)
+
+    async def to_thread(self, fn: Callable, *args, **kwargs) -> Any:
+        """Blockierenden Aufruf im Executor ausführen, ohne den Loop anzuhalten"""
+        return await asyncio.get_running_loop().run_in_executor(None, functools.partial(fn, *args, **kwargs))
+
+    async def acquire(self, lock: threading.Lock, poll_interval: float = 0.002, max_interval: float = 0.02):
+        """
+        Holt einen threading.Lock, ohne den Loop zu blockieren
+
+        Versucht es nicht-blockierend und wartet dazwischen per Timer (wachsendes
+        Intervall) - wartende Coroutinen belegen so keinen Executor-Thread.
+        """
+        interval = poll_interval
+        while not lock.acquire(blocking=False):
+            await asyncio.sleep(interval)
+            interval = min(interval * 2, max_interval)
+
+    # ------------------------------------------------------------------ Schreiben
+
+    async def wait_writable(self, fd: int):
+        """Wartet per add_writer, bis fd wieder Daten annimmt"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        loop.add_writer(fd, lambda: future.done() or future.set_result(None))
+        self.stats['writer_waits'] += 1
+        try:
+            await future
+        finally:
+            loop.remove_writer(fd)
+
+    async def writev(self, transport, buffers: Sequence[bytes]) -> int:
+        """
+        Schreibt alle Puffer über die (nicht-blockierende) Transport-Sitzung
+
+        Returns:
+            int: Anzahl geschriebener Bytes
+        """
+        transport.set_nonblocking(True)
+        pending = [memoryview(b) for b in buffers if len(b)]
+        written = 0
+        while pending:
+            try:
+                n = transport.send_some(pending)
+            except BlockingIOError:
+                await self.wait_writable(transport.fileno())
+                continue
+            written += n
+            # Vollständig geschriebene Puffer verwerfen, angefangenen kürzen
+            while pending and n >= len(pending[0]):
+                n -= len(pending[0])
+                pending.pop(0)
+            if n:
+                pending[0] = pending[0][n:]
+        self.stats['bytes_written'] += written
+        return written
+
+    async def write(self, transport, data: bytes) -> int:
+        return await self.writev(transport, [data])
+
+    # ------------------------------------------------------------------ Wiederkehrende Aufgaben
+
+    async def _periodic_loop(self, name: str, interval: float, fn: Callable[[], Awaitable[Optional[float]]]):
+        while True:
+            delay = interval
+            try:
+                next_delay = await fn()
+                if next_delay is not None:
+                    delay = next_delay
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Periodic task {name} error: {e}")
+            await asyncio.sleep(delay)
+
+    def every(self, name: str, interval: float, fn: Callable[[], Awaitable[Optional[float]]]):
+        """
+        Startet fn als wiederkehrenden Task im Loop
+
+        fn darf die Wartezeit bis zum nächsten Lauf zurückgeben (z.B. Back-off),
+        sonst gilt interval.
+        """
+        self.start()
+
+        def create():
+            task = self._periodic.get(name)
+            if task is not None and not task.done():
+                task.cancel()
+            self._periodic[name] = self.loop.create_task(self._periodic_loop(name, interval, fn), name=name)
+        self.loop.call_soon_threadsafe(create)
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            'running': self.running,
+            'periodic': sorted(name for name, task in self._periodic.items() if not task.done()),
+            **self.stats,
+        }
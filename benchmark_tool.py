@@ -0,0 +1,721 @@
+#!/usr/bin/env python3
+"""
+Phomemo M110 Benchmark-Tool
+Misst die Bildverarbeitungs-Pipeline ohne angeschlossenen Drucker
+"""
+
+import sys
+import os
+import io
+import time
+import logging
+import argparse
+from typing import Dict, Any, Callable, List, Optional
+
+from PIL import Image, ImageDraw, ImageChops
+
+# Module liegen im selben Verzeichnis
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import LABEL_SIZES, IMAGE_SCALING_MODES, PRINTER_WIDTH_PIXELS, PRINTER_BYTES_PER_LINE
+from image_pipeline import flatten_to_grayscale, fit_image_to_label, decode_for_label
+from dither_engine import dither_image, available_dither_algorithms
+from raster_engine import pack_image_to_raster, compute_raster_stats
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def image_buffer_bytes(img: Image.Image) -> int:
+    """Speicherbedarf eines PIL-Bildpuffers (Pixel x Kanäle, 1-Bit-Bilder gepackt)"""
+    if img.mode == '1':
+        return (img.width + 7) // 8 * img.height
+    return img.width * img.height * len(img.getbands())
+
+
+def create_sample_image(width: int = 2400, height: int = 1600, alpha: bool = False) -> bytes:
+    """Erzeugt ein Foto-ähnliches Testbild (Verläufe, Formen, Text) als PNG-Bytes"""
+    mode = 'RGBA' if alpha else 'RGB'
+    img = Image.new(mode, (width, height), (255, 255, 255, 0) if alpha else 'white')
+
+    gradient = Image.linear_gradient('L').resize((width, height))
+    img.paste(Image.merge('RGB', (gradient, gradient.rotate(90).resize((width, height)), gradient)), (0, 0))
+
+    draw = ImageDraw.Draw(img)
+    for i in range(0, min(width, height) // 2, 40):
+        draw.ellipse([i, i, width - i, height - i], outline=(i % 255, 80, 200), width=6)
+    draw.rectangle([width // 8, height // 3, width // 2, height // 2], fill=(20, 20, 20))
+    draw.text((width // 10, height // 10), "BENCHMARK 0123456789", fill=(0, 0, 0))
+
+    if alpha:
+        mask = Image.new('L', (width, height), 0)
+        ImageDraw.Draw(mask).ellipse([width // 10, height // 10, width * 9 // 10, height * 9 // 10], fill=255)
+        img.putalpha(mask)
+
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def _rgb_pipeline(image_bytes: bytes, target_width: int, target_height: int,
+                  scaling_mode: str, peak: List[int]) -> Image.Image:
+    """Bisheriger Weg: RGB bis nach der Geometrie, erst dann Graustufen"""
+    img = Image.open(io.BytesIO(image_bytes))
+    img = img.convert('RGB')
+    peak.append(image_buffer_bytes(img))
+    img = fit_image_to_label(img, target_width, target_height, scaling_mode)
+    peak.append(image_buffer_bytes(img))
+    img = img.convert('L')
+    return img
+
+
+def _gray_pipeline(image_bytes: bytes, target_width: int, target_height: int,
+                   scaling_mode: str, peak: List[int]) -> Image.Image:
+    """Graustufen-Weg: direkt nach dem Dekodieren nach 'L' (Alpha auf Weiß)"""
+    img = Image.open(io.BytesIO(image_bytes))
+    img = flatten_to_grayscale(img)
+    peak.append(image_buffer_bytes(img))
+    img = fit_image_to_label(img, target_width, target_height, scaling_mode)
+    peak.append(image_buffer_bytes(img))
+    return img
+
+
+def _time_pipeline(pipeline: Callable, image_bytes: bytes, target_width: int, target_height: int,
+                   scaling_mode: str, repeat: int) -> Dict[str, Any]:
+    """Führt eine Pipeline repeat-mal aus und liefert Bestzeit, Mittelwert und Puffer-Spitze"""
+    durations = []
+    peak: List[int] = []
+    result = None
+    for _ in range(max(1, repeat)):
+        peak.clear()
+        start = time.perf_counter()
+        result = pipeline(image_bytes, target_width, target_height, scaling_mode, peak)
+        durations.append(time.perf_counter() - start)
+
+    return {
+        'best_ms': round(min(durations) * 1000, 2),
+        'mean_ms': round(sum(durations) / len(durations) * 1000, 2),
+        'peak_buffer_bytes': max(peak) if peak else 0,
+        'result': result,
+    }
+
+
+def benchmark_grayscale_pipeline(image_bytes: Optional[bytes] = None, label_size: str = '40x30',
+                                 repeat: int = 5) -> Dict[str, Any]:
+    """
+    Vergleicht RGB- und Graustufen-Pipeline je Skalierungsmodus
+
+    Returns:
+        dict: je Modus Zeiten (ms) und größter Zwischenpuffer (Bytes) beider Wege,
+              dazu ob die Graustufen-Ergebnisse übereinstimmen (max. Pixel-Abweichung)
+    """
+    if image_bytes is None:
+        image_bytes = create_sample_image()
+
+    label = LABEL_SIZES.get(label_size, LABEL_SIZES['40x30'])
+    target_width = min(label['width_px'], PRINTER_WIDTH_PIXELS)
+    target_height = label['height_px']
+
+    results = {}
+    for scaling_mode in IMAGE_SCALING_MODES:
+        rgb = _time_pipeline(_rgb_pipeline, image_bytes, target_width, target_height, scaling_mode, repeat)
+        gray = _time_pipeline(_gray_pipeline, image_bytes, target_width, target_height, scaling_mode, repeat)
+
+        # Abweichung durch Rundung beim Resampling in 8 statt 3x8 Bit
+        # (bei Transparenz zusätzlich: RGB-Weg druckt transparente Flächen nicht weiß)
+        diff = ImageChops.difference(rgb.pop('result'), gray.pop('result')).getextrema()[1]
+
+        results[scaling_mode] = {
+            'rgb': rgb,
+            'gray': gray,
+            'speedup': round(rgb['best_ms'] / gray['best_ms'], 2) if gray['best_ms'] else None,
+            'memory_ratio': round(gray['peak_buffer_bytes'] / rgb['peak_buffer_bytes'], 2) if rgb['peak_buffer_bytes'] else None,
+            'max_pixel_diff': diff,
+        }
+
+    return results
+
+
+def print_pipeline_report(results: Dict[str, Any]):
+    """Gibt die Benchmark-Ergebnisse als Tabelle aus"""
+    print(f"{'Modus':<14} {'RGB ms':>9} {'Gray ms':>9} {'Speedup':>8} {'RGB MB':>8} {'Gray MB':>8} {'Diff':>5}")
+    for mode, entry in results.items():
+        print(f"{mode:<14} {entry['rgb']['best_ms']:>9.2f} {entry['gray']['best_ms']:>9.2f} "
+              f"{entry['speedup'] or 0:>7.2f}x "
+              f"{entry['rgb']['peak_buffer_bytes'] / 1e6:>8.2f} {entry['gray']['peak_buffer_bytes'] / 1e6:>8.2f} "
+              f"{entry['max_pixel_diff']:>5}")
+
+
+def benchmark_dither_algorithms(image_bytes: Optional[bytes] = None, label_size: str = '40x30',
+                                repeat: int = 5, printer=None) -> Dict[str, Any]:
+    """
+    Vergleicht die Dithering-Engines: Renderzeit und daraus folgende Übertragungsdauer
+
+    Args:
+        printer: Controller für Speed-Tier und Pacing (Standard: Offline-Instanz ohne Services)
+
+    Returns:
+        dict: je Verfahren render_ms, bit_density, complexity, Speed-Tier und
+              geplante Übertragungsdauer in Sekunden
+    """
+    if printer is None:
+        from printer_controller import EnhancedPhomemoM110
+        printer = EnhancedPhomemoM110('00:00:00:00:00:00', auto_start=False)
+
+    if image_bytes is None:
+        image_bytes = create_sample_image()
+
+    label = LABEL_SIZES.get(label_size, LABEL_SIZES['40x30'])
+    target = (PRINTER_WIDTH_PIXELS, label['height_px'])
+    img, _ = decode_for_label(image_bytes, target)
+    gray = fit_image_to_label(img, target[0], target[1])
+
+    results = {}
+    for algorithm in available_dither_algorithms():
+        durations = []
+        bw = None
+        for _ in range(max(1, repeat)):
+            start = time.perf_counter()
+            bw = dither_image(gray, algorithm)
+            durations.append(time.perf_counter() - start)
+
+        stats = compute_raster_stats(pack_image_to_raster(bw, PRINTER_BYTES_PER_LINE), PRINTER_BYTES_PER_LINE)
+        transmission = printer.estimate_transmission_time(stats)
+        results[algorithm] = {
+            'render_ms': round(min(durations) * 1000, 2),
+            'bit_density': round(stats.bit_density, 4),
+            'complexity': round(stats.complexity, 4),
+            'speed': transmission['speed'],
+            'transmit_seconds': transmission['seconds'],
+        }
+
+    return results
+
+
+def print_dither_report(results: Dict[str, Any]):
+    """Gibt den Vergleich der Dithering-Engines als Tabelle aus"""
+    print(f"{'Verfahren':<16} {'Render ms':>10} {'Dichte':>7} {'Kompl.':>7} {'Speed':>11} {'Senden s':>9}")
+    for algorithm, entry in results.items():
+        print(f"{algorithm:<16} {entry['render_ms']:>10.2f} {entry['bit_density'] * 100:>6.1f}% "
+              f"{entry['complexity'] * 100:>6.1f}% {entry['speed']:>11} {entry['transmit_seconds']:>9.2f}")
+
+
+def benchmark_flow_control(image_bytes: Optional[bytes] = None, label_size: str = '40x30',
+                           drain_rate: float = 8000.0, buffer_capacity: int = 4096,
+                           printer=None) -> Dict[str, Any]:
+    """
+    Vergleicht feste Pausen, TIOCOUTQ-Flusskontrolle und Token-Bucket an einer Drucker-Attrappe
+
+    Die Attrappe (printer_simulator.SimulatedPrinter) arbeitet drain_rate Bytes/s
+    ab; ihre queue_probe ersetzt TIOCOUTQ, das auf ptys nicht gefüllt wird.
+
+    Returns:
+        dict: je Pacing-Modus send_s (bis send_bitmap zurückkehrt), done_s (bis der
+              Puffer leer ist), Overruns, maximaler Rückstau und Byte-Gleichheit
+    """
+    from printer_simulator import SimulatedPrinter
+
+    if printer is None:
+        from printer_controller import EnhancedPhomemoM110
+        printer = EnhancedPhomemoM110('00:00:00:00:00:00', auto_start=False)
+
+    if image_bytes is None:
+        image_bytes = create_sample_image()
+
+    label = LABEL_SIZES.get(label_size, LABEL_SIZES['40x30'])
+    target = (PRINTER_WIDTH_PIXELS, label['height_px'])
+    img, _ = decode_for_label(image_bytes, target)
+    raster = pack_image_to_raster(dither_image(fit_image_to_label(img, target[0], target[1])), PRINTER_BYTES_PER_LINE)
+    height = len(raster) // PRINTER_BYTES_PER_LINE
+
+    sim = SimulatedPrinter(drain_rate=drain_rate, buffer_capacity=buffer_capacity)
+    printer.rfcomm_device = sim.path
+    printer.output_queue_probe = sim.queue_probe(printer.transport)
+    original_mode = printer.settings.get('pacing_mode')
+
+    results = {}
+    reference = None
+    try:
+        for mode in ('fixed', 'outq', 'bucket'):
+            sim.reset()
+            printer.settings['pacing_mode'] = mode
+            start = time.monotonic()
+            ok = printer.send_bitmap(raster, height)
+            send_s = time.monotonic() - start
+            sim.wait_idle()
+            done_s = (sim.last_drained_at or time.monotonic()) - start
+
+            received = bytes(sim.received)
+            reference = reference or received
+            results[mode] = {
+                'ok': ok,
+                'send_s': round(send_s, 3),
+                'done_s': round(done_s, 3),
+                'identical': received == reference,
+                **sim.get_stats(),
+            }
+    finally:
+        printer.settings['pacing_mode'] = original_mode
+        printer.output_queue_probe = None
+        printer.close_transport()
+        sim.close()
+
+    return results
+
+
+def benchmark_pacing_calibration(drain_rate: float = 8000.0, buffer_capacity: int = 4096,
+                                 mac_address: str = '00:00:00:00:00:00', persist: bool = False) -> Dict[str, Any]:
+    """
+    Kalibriert das Token-Bucket-Pacing gegen eine Drucker-Attrappe
+
+    Args:
+        mac_address: MAC, unter der das Ergebnis gespeichert wird (nur mit persist)
+
+    Returns:
+        dict: Ergebnis von EnhancedPhomemoM110.calibrate_pacing
+    """
+    from printer_controller import EnhancedPhomemoM110
+    from printer_simulator import SimulatedPrinter
+
+    printer = EnhancedPhomemoM110(mac_address, auto_start=False)
+    sim = SimulatedPrinter(drain_rate=drain_rate, buffer_capacity=buffer_capacity)
+    try:
+        return printer.calibrate_pacing(sim.path, sim.queue_probe(printer.transport), persist=persist)
+    finally:
+        printer.close_transport()
+        sim.close()
+
+
+def print_calibration_report(result: Dict[str, Any]):
+    """Gibt den Raten-Sweep der Kalibrierung aus"""
+    print(f"{'Rate B/s':>9} {'Gemessen B/s':>13} {'Fertig s':>9} {'Max. Rückstau':>14} {'OK':>4}")
+    for entry in result.get('sweep', []):
+        print(f"{entry['rate_bps']:>9} {entry['measured_bps'] or 0:>13.0f} {entry['done_s']:>9.3f} "
+              f"{entry['max_depth']:>14} {'✓' if entry['passed'] else '✗':>4}")
+    if result.get('success'):
+        print(f"➡️  Token-Bucket: {result['rate_bps']} B/s, Burst {result['burst_bytes']} B")
+    else:
+        print(f"❌ Kalibrierung fehlgeschlagen: {result.get('error')}")
+
+
+def benchmark_line_scheduler(lines: int = 640, pause_ms: float = 2.0, load_threads: int = 2) -> Dict[str, Any]:
+    """
+    Vergleicht naives sleep() je Zeile mit DeadlineClock unter CPU-Last
+
+    Lastthreads konkurrieren um den GIL - wie Bildverarbeitung während eines
+    Drucks. Gemessen wird nur das Pacing (keine Writes).
+
+    Returns:
+        dict: je Verfahren geplante und tatsächliche Dauer sowie Drift
+    """
+    import threading
+    from flow_control import DeadlineClock
+
+    pause = pause_ms / 1000.0
+    planned = lines * pause
+    stop = threading.Event()
+
+    def burn():
+        while not stop.is_set():
+            sum(range(1000))
+
+    workers = [threading.Thread(target=burn, daemon=True) for _ in range(load_threads)]
+    for worker in workers:
+        worker.start()
+
+    results = {}
+    try:
+        start = time.perf_counter()
+        for _ in range(lines):
+            time.sleep(pause)
+        actual = time.perf_counter() - start
+        results['sleep'] = {'planned_s': round(planned, 3), 'actual_s': round(actual, 3),
+                            'drift_ms': round((actual - planned) * 1000, 1)}
+
+        clock = DeadlineClock()
+        for _ in range(lines):
+            clock.wait(pause)
+        timing = clock.finish()
+        results['deadline'] = {'planned_s': timing['planned_s'], 'actual_s': timing['actual_s'],
+                               'drift_ms': timing['drift_ms']}
+    finally:
+        stop.set()
+        for worker in workers:
+            worker.join()
+
+    return results
+
+
+def benchmark_transmit_engine(image_bytes: Optional[bytes] = None, label_size: str = '40x30',
+                              drain_rate: float = 8000.0, buffer_capacity: int = 4096,
+                              commands: int = 8) -> Dict[str, Any]:
+    """
+    Vergleicht Sende-Thread und Asyncio-Engine an einer Drucker-Attrappe
+
+    Während eines Rasterjobs schicken commands Threads (wie Flask-Requests)
+    gleichzeitig ESC @. Gemessen werden Dauer, Threads im Prozess (Spitze)
+    und ob alle Kommandos durchgingen.
+
+    Returns:
+        dict: je Engine send_s, peak_threads, commands_ok, bytes, writer_waits
+    """
+    import threading
+    from printer_simulator import SimulatedPrinter
+    from printer_controller import EnhancedPhomemoM110
+    from async_engine import AsyncPrinterEngine
+    from transmit_worker import TransmitWorker
+
+    if image_bytes is None:
+        image_bytes = create_sample_image()
+
+    label = LABEL_SIZES.get(label_size, LABEL_SIZES['40x30'])
+    target = (PRINTER_WIDTH_PIXELS, label['height_px'])
+    img, _ = decode_for_label(image_bytes, target)
+    raster = pack_image_to_raster(dither_image(fit_image_to_label(img, target[0], target[1])), PRINTER_BYTES_PER_LINE)
+    height = len(raster) // PRINTER_BYTES_PER_LINE
+
+    results = {}
+    for engine in ('thread', 'asyncio'):
+        printer = EnhancedPhomemoM110('00:00:00:00:00:00', auto_start=False)
+        printer.settings['pacing_mode'] = 'fixed'
+        if engine == 'asyncio':
+            printer.async_engine = AsyncPrinterEngine()
+            printer.transmit_worker = None
+        else:
+            printer.async_engine = None
+            printer.transmit_worker = TransmitWorker()
+        sim = SimulatedPrinter(drain_rate=drain_rate, buffer_capacity=buffer_capacity)
+        printer.rfcomm_device = sim.path
+
+        peak = [threading.active_count()]
+        sampling = threading.Event()
+
+        def sample():
+            while not sampling.is_set():
+                peak[0] = max(peak[0], threading.active_count())
+                time.sleep(0.005)
+
+        sampler = threading.Thread(target=sample, daemon=True)
+        sampler.start()
+        try:
+            outcomes = []
+            start = time.monotonic()
+            job = threading.Thread(target=lambda: outcomes.append(printer.send_bitmap(raster, height)))
+            job.start()
+            senders = [threading.Thread(target=lambda: outcomes.append(printer.send_command(b'\x1b\x40')))
+                       for _ in range(commands)]
+            for sender in senders:
+                sender.start()
+            for thread in [job] + senders:
+                thread.join()
+            send_s = time.monotonic() - start
+            sim.wait_idle()
+            results[engine] = {
+                'ok': all(outcomes),
+                'send_s': round(send_s, 3),
+                'peak_threads': peak[0],
+                'commands_ok': sum(1 for ok in outcomes[1:] if ok) if len(outcomes) > 1 else 0,
+                'bytes': sim.total_received,
+                'writer_waits': printer.async_engine.stats['writer_waits'] if printer.async_engine else 0,
+            }
+        finally:
+            sampling.set()
+            sampler.join()
+            printer.stop_services()
+            sim.close()
+
+    return results
+
+
+def benchmark_queue_pipeline(image_bytes: Optional[bytes] = None, jobs: int = 6,
+                              drain_rate: float = 8000.0, buffer_capacity: int = 4096) -> Dict[str, Any]:
+    """
+    Batch aus Bild-Jobs über die Print-Queue, mit und ohne Render/Sende-Pipeline
+
+    Verglichen wird die Gesamtdauer mit der reinen Sendezeit (Summe aus
+    transmit_history) - mit Pipeline sollte sie sich dieser annähern.
+
+    Returns:
+        dict: je Variante total_s, transmit_s, overhead_s, ok
+    """
+    from printer_simulator import SimulatedPrinter
+    from printer_controller import EnhancedPhomemoM110
+
+    if image_bytes is None:
+        image_bytes = create_sample_image()
+
+    results = {}
+    for pipeline in (False, True):
+        sim = SimulatedPrinter(drain_rate=drain_rate, buffer_capacity=buffer_capacity)
+        printer = EnhancedPhomemoM110('00:00:00:00:00:00', auto_start=False)
+        printer.save_settings = lambda: True
+        printer.settings['pacing_mode'] = 'fixed'
+        printer.rfcomm_device = sim.path
+        printer.queue_pipeline = pipeline
+        # Ohne Job-Journal - sonst liefen echte wartende Jobs über die Attrappe
+        printer.job_store = None
+        printer.render_cache.clear()
+        try:
+            printer.start_services()
+            start = time.monotonic()
+            for index in range(jobs):
+                # Je Job eigene Bytes - sonst trifft der Render-Cache
+                printer.queue_print_job('image', {'image_data': image_bytes + bytes([index])})
+            # Fertig, wenn jeder Job übertragen wurde (ein transmit_history-Eintrag je Job)
+            while len(printer.transmit_history) < jobs and printer.stats['failed_jobs'] == 0:
+                time.sleep(0.02)
+            total_s = time.monotonic() - start
+            transmit_s = sum(entry['actual_s'] for entry in printer.transmit_history)
+            results['pipeline' if pipeline else 'serial'] = {
+                'ok': printer.stats['failed_jobs'] == 0 and all(e['success'] for e in printer.transmit_history),
+                'total_s': round(total_s, 3),
+                'transmit_s': round(transmit_s, 3),
+                'overhead_s': round(total_s - transmit_s, 3),
+            }
+        finally:
+            printer.stop_services()
+            sim.close()
+
+    return results
+
+
+def benchmark_render_pool(image_bytes: Optional[bytes] = None, requests: int = 4,
+                          workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Parallele Bild-Vorschauen in Threads vs. im Render-Prozesspool
+
+    Während gerendert wird, fragt ein Thread wie ein Status-Poll der Web-UI
+    get_queue_status() ab - unter dem GIL warten diese Abfragen auf die
+    Bildverarbeitung, mit Prozesspool nicht.
+
+    Returns:
+        dict: je Variante total_s, ok und Poll-Latenz (p50/max in ms)
+    """
+    import threading
+    from printer_controller import EnhancedPhomemoM110
+    from render_pool import RenderPool
+
+    if image_bytes is None:
+        image_bytes = create_sample_image()
+
+    results = {}
+    for variant in ('threads', 'processes'):
+        printer = EnhancedPhomemoM110('00:00:00:00:00:00', auto_start=False)
+        printer.save_settings = lambda: True
+        if variant == 'processes':
+            # Vor allen Threads starten (Worker entstehen per fork)
+            printer.render_pool = RenderPool(workers)
+            printer.render_pool.start()
+        outcomes = []
+        latencies = []
+        done = threading.Event()
+
+        def render(index):
+            # Je Anfrage eigene Bytes - sonst trifft der Render-Cache
+            outcomes.append(printer.process_image_for_preview(image_bytes + bytes([index])) is not None)
+
+        def poll():
+            # Latenz ab dem geplanten Aufwachen: enthält das Warten auf den GIL
+            while not done.is_set():
+                due = time.perf_counter() + 0.01
+                time.sleep(0.01)
+                printer.get_queue_status()
+                latencies.append((time.perf_counter() - due) * 1000)
+
+        poller = threading.Thread(target=poll, daemon=True)
+        renderers = [threading.Thread(target=render, args=(index,)) for index in range(requests)]
+        try:
+            poller.start()
+            start = time.perf_counter()
+            for thread in renderers:
+                thread.start()
+            for thread in renderers:
+                thread.join()
+            total_s = time.perf_counter() - start
+        finally:
+            done.set()
+            poller.join()
+            if printer.render_pool is not None:
+                printer.render_pool.stop()
+
+        latencies.sort()
+        results[variant] = {
+            'ok': len(outcomes) == requests and all(outcomes),
+            'total_s': round(total_s, 3),
+            'workers': printer.render_pool.workers if printer.render_pool is not None else 1,
+            'poll_p50_ms': round(latencies[len(latencies) // 2], 2) if latencies else 0.0,
+            'poll_max_ms': round(latencies[-1], 2) if latencies else 0.0,
+        }
+
+    return results
+
+
+def print_render_pool_report(results: Dict[str, Any]):
+    """Gibt den Render-Pool-Vergleich aus"""
+    print(f"{'Variante':<10} {'Worker':>7} {'Gesamt s':>9} {'Poll p50 ms':>12} {'Poll max ms':>12} {'OK':>4}")
+    for variant, entry in results.items():
+        print(f"{variant:<10} {entry['workers']:>7} {entry['total_s']:>9.3f} {entry['poll_p50_ms']:>12.2f} "
+              f"{entry['poll_max_ms']:>12.2f} {str(entry['ok']):>4}")
+
+
+def benchmark_job_store(image_bytes: Optional[bytes] = None, jobs: int = 50) -> Dict[str, Any]:
+    """
+    Enqueue-Latenz und Haltbarkeit des Job-Journals: Commit je Job vs. gesammelt
+
+    Jobs werden im Takt eines Bursts (Nutzer schicken alles auf einmal)
+    eingereiht und abgeschlossen; gemessen in einer temporären Datenbank.
+
+    Returns:
+        dict: je Variante Enqueue-Latenz (µs), Zeit bis auf der Platte (ms),
+        Transaktionen (fsyncs) und Gesamtdauer bis flush()
+    """
+    import tempfile
+    from job_store import JobStore
+    from printer_controller import PrintJob
+    from config import JOB_STORE_FLUSH_MS, JOB_STORE_BATCH_MAX
+
+    if image_bytes is None:
+        image_bytes = create_sample_image()
+
+    results = {}
+    variants = {'per_job': (0.0, 1), 'batched': (JOB_STORE_FLUSH_MS / 1000.0, JOB_STORE_BATCH_MAX)}
+    with tempfile.TemporaryDirectory() as tmp:
+        for variant, (flush_interval, batch_max) in variants.items():
+            store = JobStore(os.path.join(tmp, f'{variant}.db'), flush_interval, batch_max)
+            store.open()
+            try:
+                start = time.perf_counter()
+                for index in range(jobs):
+                    job = PrintJob(f'image_{index}', 'image', {'image_data': image_bytes, 'fit_to_label': True},
+                                   time.time())
+                    store.add(job)
+                store.flush()
+                total_s = time.perf_counter() - start
+                status = store.get_status()
+                results[variant] = {
+                    'ok': status['stored_jobs'] == jobs and status['errors'] == 0,
+                    'total_s': round(total_s, 3),
+                    'commits': status['batches'],
+                    'enqueue_us_p50': status['enqueue_us_p50'],
+                    'enqueue_us_max': status['enqueue_us_max'],
+                    'durable_ms_p50': status['durable_ms_p50'],
+                    'durable_ms_max': status['durable_ms_max'],
+                }
+            finally:
+                store.close()
+
+    return results
+
+
+def print_store_report(results: Dict[str, Any]):
+    """Gibt den Job-Journal-Vergleich aus"""
+    print(f"{'Variante':<9} {'Commits':>8} {'Gesamt s':>9} {'Enq p50 µs':>11} {'Enq max µs':>11} "
+          f"{'Platte p50 ms':>14} {'Platte max ms':>14} {'OK':>4}")
+    for variant, entry in results.items():
+        print(f"{variant:<9} {entry['commits']:>8} {entry['total_s']:>9.3f} {entry['enqueue_us_p50']:>11.1f} "
+              f"{entry['enqueue_us_max']:>11.1f} {entry['durable_ms_p50']:>14.2f} {entry['durable_ms_max']:>14.2f} "
+              f"{str(entry['ok']):>4}")
+
+
+def print_queue_report(results: Dict[str, Any]):
+    """Gibt den Queue-Vergleich aus"""
+    print(f"{'Variante':<9} {'Gesamt s':>9} {'Senden s':>9} {'Overhead s':>11} {'OK':>4}")
+    for variant, entry in results.items():
+        print(f"{variant:<9} {entry['total_s']:>9.3f} {entry['transmit_s']:>9.3f} {entry['overhead_s']:>11.3f} "
+              f"{str(entry['ok']):>4}")
+
+
+def print_engine_report(results: Dict[str, Any]):
+    """Gibt den Engine-Vergleich aus"""
+    print(f"{'Engine':<8} {'Senden s':>9} {'Threads':>8} {'Kommandos':>10} {'Bytes':>8} {'Writer-Waits':>13}")
+    for engine, entry in results.items():
+        print(f"{engine:<8} {entry['send_s']:>9.3f} {entry['peak_threads']:>8} {entry['commands_ok']:>10} "
+              f"{entry['bytes']:>8} {entry['writer_waits']:>13}")
+
+
+def print_scheduler_report(results: Dict[str, Any]):
+    """Gibt den Scheduler-Vergleich aus"""
+    print(f"{'Verfahren':<10} {'Geplant s':>10} {'Tatsächl. s':>12} {'Drift ms':>9}")
+    for method, entry in results.items():
+        print(f"{method:<10} {entry['planned_s']:>10.3f} {entry['actual_s']:>12.3f} {entry['drift_ms']:>9.1f}")
+
+
+def print_flow_report(results: Dict[str, Any]):
+    """Gibt den Pacing-Vergleich als Tabelle aus"""
+    print(f"{'Modus':<8} {'Senden s':>9} {'Fertig s':>9} {'Overruns':>9} {'Max. Rückstau':>14} {'Bytes gleich':>13}")
+    for mode, entry in results.items():
+        print(f"{mode:<8} {entry['send_s']:>9.3f} {entry['done_s']:>9.3f} {entry['overruns']:>9} "
+              f"{entry['max_backlog']:>14} {str(entry['identical']):>13}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Phomemo M110 Benchmark-Tool')
+    parser.add_argument('--mode', choices=['pipeline', 'dither', 'flow', 'calibrate', 'schedule', 'engine', 'queue',
+                                           'renderpool', 'store'],
+                        default='pipeline',
+                        help='Benchmark-Art')
+    parser.add_argument('--image', help='Eigenes Testbild (Standard: generiertes Foto-Muster)')
+    parser.add_argument('--alpha', action='store_true', help='Generiertes Testbild mit Transparenz')
+    parser.add_argument('--label-size', default='40x30', choices=list(LABEL_SIZES.keys()),
+                        help='Label-Größe')
+    parser.add_argument('--repeat', type=int, default=5, help='Wiederholungen je Messung')
+    parser.add_argument('--drain-rate', type=float, default=8000.0,
+                        help='Attrappe: abgearbeitete Bytes pro Sekunde (--mode flow/engine)')
+    parser.add_argument('--buffer-capacity', type=int, default=4096,
+                        help='Attrappe: Empfangspuffer in Bytes (--mode flow/engine)')
+    parser.add_argument('--load-threads', type=int, default=2,
+                        help='CPU-Lastthreads während der Messung (--mode schedule)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Render-Prozesse (--mode renderpool, Standard: CPU-Kerne)')
+    parser.add_argument('--mac', default='00:00:00:00:00:00',
+                        help='Drucker-MAC für das Kalibrierergebnis (--mode calibrate)')
+    parser.add_argument('--save', action='store_true',
+                        help='Kalibrierergebnis unter --mac speichern (--mode calibrate)')
+
+    args = parser.parse_args()
+
+    if args.mode == 'calibrate':
+        print(f"📏 Token-Bucket-Kalibrierung (Attrappe {args.drain_rate:.0f} B/s, Puffer {args.buffer_capacity} B)")
+        print_calibration_report(benchmark_pacing_calibration(args.drain_rate, args.buffer_capacity,
+                                                              args.mac, args.save))
+        return
+
+    if args.mode == 'schedule':
+        print(f"⏱️ Zeilen-Pacing sleep() vs. Deadlines (640 Zeilen à 2ms, {args.load_threads} Lastthreads)")
+        print_scheduler_report(benchmark_line_scheduler(load_threads=args.load_threads))
+        return
+
+    if args.image:
+        with open(args.image, 'rb') as f:
+            image_bytes = f.read()
+    else:
+        image_bytes = create_sample_image(alpha=args.alpha)
+
+    if args.mode == 'pipeline':
+        print(f"📊 Graustufen-Pipeline vs. RGB ({args.label_size}, {args.repeat}x)")
+        print_pipeline_report(benchmark_grayscale_pipeline(image_bytes, args.label_size, args.repeat))
+    elif args.mode == 'dither':
+        print(f"📊 Dithering-Engines ({args.label_size}, {args.repeat}x)")
+        print_dither_report(benchmark_dither_algorithms(image_bytes, args.label_size, args.repeat))
+    elif args.mode == 'queue':
+        print(f"📋 Print-Queue seriell vs. Render/Sende-Pipeline ({args.repeat} Bild-Jobs)")
+        print_queue_report(benchmark_queue_pipeline(image_bytes, args.repeat, args.drain_rate, args.buffer_capacity))
+    elif args.mode == 'store':
+        print(f"💾 Job-Journal: Commit je Job vs. gesammelte fsyncs ({args.repeat * 10} Jobs)")
+        print_store_report(benchmark_job_store(image_bytes, args.repeat * 10))
+    elif args.mode == 'renderpool':
+        print(f"🧮 Vorschau-Rendern in Threads vs. Prozesspool ({args.repeat} parallele Anfragen)")
+        print_render_pool_report(benchmark_render_pool(image_bytes, args.repeat, args.workers))
+    elif args.mode == 'engine':
+        print(f"📡 Sende-Thread vs. Asyncio-Engine ({args.label_size}, 8 parallele Kommandos)")
+        print_engine_report(benchmark_transmit_engine(image_bytes, args.label_size, args.drain_rate,
+                                                      args.buffer_capacity))
+    elif args.mode == 'flow':
+        print(f"📊 Pacing-Modi fest / TIOCOUTQ / Token-Bucket ({args.label_size}, Attrappe {args.drain_rate:.0f} B/s, "
+              f"Puffer {args.buffer_capacity} B)")
+        print_flow_report(benchmark_flow_control(image_bytes, args.label_size, args.drain_rate,
+                                                 args.buffer_capacity))
+
+
+if __name__ == '__main__':
+    main()
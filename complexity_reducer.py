@@ -3,105 +3,116 @@ Automatische Komplexitäts-Reduktion für Phomemo M110
 Wird von printer_controller.py verwendet
 """
 
+import hashlib
 import logging
-from PIL import Image, ImageEnhance, ImageFilter
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any
+from PIL import Image
+
+from config import TONE_SEARCH_ITERATIONS, TONE_SEARCH_CACHE_SIZE
+from image_pipeline import image_tone_lut, make_density_proxy, measure_proxy_density
 
 logger = logging.getLogger(__name__)
 
 
-def auto_reduce_complexity_if_needed(img: Image.Image, settings: dict) -> Image.Image:
+# Bereits gefundene Tonwert-Parameter je Probe (Wiederholdrucke überspringen die Suche)
+_tone_search_cache: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+_tone_search_lock = threading.Lock()
+
+
+def reduce_to_density_budget(img: Image.Image, target: float, metric: str = 'bit_density',
+                             enable_dither: bool = True, dither_threshold: int = 128,
+                             contrast: float = 1.0, dither_strength: float = 1.0,
+                             curve: str = 'brightness', max_value: float = 1.8,
+                             iterations: int = TONE_SEARCH_ITERATIONS,
+                             dither_algorithm: Optional[str] = None) -> Dict[str, Any]:
     """
-    Automatische Komplexitäts-Reduktion wenn Bild zu komplex
-    
+    Geschlossene Regelung: sucht die schwächste Aufhellung, mit der das Bild das Dichte-Budget einhält
+
+    Binärsuche über die Tonkurve (Brightness oder Gamma, fusioniert mit Kontrast und
+    Dithering-Stärke zu einer 256er-LUT) auf der günstigen Dichte-Probe statt fester
+    Helligkeitsstufen. Die gefundenen Parameter werden für identische Proben gecacht.
+
     Args:
-        img: Schwarz-Weiß PIL Image (mode '1')
-        settings: Dictionary mit Einstellungen
-        
+        img: 'L'-Bild nach Geometrie-Anpassung, vor dem Dithering
+        target: Budget, z.B. 0.10 Bit-Dichte oder die Komplexitätsgrenze eines Speed-Tiers
+        metric: 'bit_density' oder 'complexity' (Anteil non-zero Bytes)
+        enable_dither / dither_threshold: wie beim echten Dithering
+        contrast / dither_strength: übrige Tonwert-Parameter der finalen LUT
+        curve: 'brightness' oder 'gamma'
+        max_value: Obergrenze für Faktor/Gamma (Schutz vor ausgewaschenen Bildern)
+        iterations: Anzahl Halbierungsschritte
+        dither_algorithm: Verfahren des echten Ditherings (siehe dither_engine)
+
     Returns:
-        Optimiertes Image mit reduzierter Komplexität (falls nötig)
+        dict: Gewählte Parameter ('curve', 'value', geschätzte Dichte, ...) -
+              anzuwenden über image_pipeline.image_tone_lut
     """
-    try:
-        # Aktuelle Komplexität schätzen
-        pixels = list(img.getdata())
-        black_pixels = pixels.count(0)
-        complexity = black_pixels / len(pixels)
-        
-        threshold = settings.get('auto_reduce_threshold', 0.10)
-        
-        if complexity < threshold:
-            # Komplexität OK - keine Reduktion nötig
-            logger.info(f"✅ Complexity OK: {complexity*100:.1f}% < {threshold*100:.1f}% threshold")
-            return img
-        
-        # Komplexität zu hoch - Reduktion durchführen
-        logger.warning(f"⚠️ High complexity detected: {complexity*100:.1f}%")
-        logger.info(f"🔧 AUTO-REDUCING complexity...")
-        
-        method = settings.get('auto_reduce_method', 'adaptive')
-        
-        if method == 'adaptive':
-            # Adaptive Reduktion basierend auf Komplexität
-            if complexity < 0.12:  # 10-12%: Leichte Reduktion
-                logger.info("   → Using: Brightness +20%")
-                # Zurück zu RGB für Bearbeitung
-                rgb_img = img.convert('RGB')
-                enhancer = ImageEnhance.Brightness(rgb_img)
-                rgb_img = enhancer.enhance(1.2)
-                # Wieder zu S/W mit Dithering
-                result = rgb_img.convert('1', dither=Image.Dither.FLOYDSTEINBERG)
-                
-            elif complexity < 0.15:  # 12-15%: Mittlere Reduktion
-                logger.info("   → Using: Brightness +30% + Blur")
-                rgb_img = img.convert('RGB')
-                # Helligkeit
-                enhancer = ImageEnhance.Brightness(rgb_img)
-                rgb_img = enhancer.enhance(1.3)
-                # Leichtes Blur
-                rgb_img = rgb_img.filter(ImageFilter.GaussianBlur(radius=0.8))
-                result = rgb_img.convert('1', dither=Image.Dither.FLOYDSTEINBERG)
-                
-            else:  # >15%: Aggressive Reduktion
-                logger.info("   → Using: Threshold (no dithering)")
-                # Threshold ohne Dithering
-                rgb_img = img.convert('RGB')
-                enhancer = ImageEnhance.Brightness(rgb_img)
-                rgb_img = enhancer.enhance(1.4)
-                gray_img = rgb_img.convert('L')
-                threshold_val = settings.get('auto_reduce_threshold_value', 140)
-                result = gray_img.point(lambda x: 0 if x < threshold_val else 255, '1')
-        
-        elif method == 'threshold':
-            # Einfacher Threshold
-            logger.info("   → Using: Threshold method")
-            gray_img = img.convert('L')
-            threshold_val = settings.get('auto_reduce_threshold_value', 140)
-            result = gray_img.point(lambda x: 0 if x < threshold_val else 255, '1')
-        
-        elif method == 'brightness':
-            # Helligkeit erhöhen
-            logger.info("   → Using: Brightness method")
-            rgb_img = img.convert('RGB')
-            factor = settings.get('auto_reduce_brightness_factor', 1.3)
-            enhancer = ImageEnhance.Brightness(rgb_img)
-            rgb_img = enhancer.enhance(factor)
-            result = rgb_img.convert('1', dither=Image.Dither.FLOYDSTEINBERG)
-        
+    if img.mode != 'L':
+        img = img.convert('L')
+    histogram = img.histogram()
+    proxy = make_density_proxy(img)
+
+    def measure(value: float) -> float:
+        lut = image_tone_lut(histogram, curve, value, contrast, dither_strength)
+        stats = measure_proxy_density(proxy, enable_dither, dither_threshold, lut, dither_algorithm)
+        return getattr(stats, metric)
+
+    cache_key = (
+        hashlib.blake2b(proxy.tobytes(), digest_size=16).hexdigest(),
+        proxy.size, round(target, 4), metric, enable_dither, dither_threshold,
+        round(contrast, 4), round(dither_strength, 4), curve, max_value, dither_algorithm
+    )
+    with _tone_search_lock:
+        cached = _tone_search_cache.get(cache_key)
+        if cached is not None:
+            _tone_search_cache.move_to_end(cache_key)
+
+    if cached is not None:
+        logger.info(f"♻️ Reusing tone parameters: {curve}={cached['value']:.3f}")
+        return {**cached, 'cached': True}
+
+    start_density = measure(1.0)
+    value = 1.0
+    density = start_density
+    steps = 0
+
+    if start_density > target:
+        density = measure(max_value)
+        value = max_value
+        steps = 1
+        if density <= target:
+            # Kleinsten Wert suchen, der das Budget noch einhält
+            low, high = 1.0, max_value
+            for _ in range(iterations):
+                mid = (low + high) / 2.0
+                mid_density = measure(mid)
+                steps += 1
+                if mid_density <= target:
+                    high, density = mid, mid_density
+                else:
+                    low = mid
+            value = high
         else:
-            logger.warning(f"Unknown method '{method}', skipping reduction")
-            return img
-        
-        # Neue Komplexität prüfen
-        new_pixels = list(result.getdata())
-        new_black = new_pixels.count(0)
-        new_complexity = new_black / len(new_pixels)
-        
-        reduction = (complexity - new_complexity) * 100
-        logger.info(f"✅ Complexity reduced: {complexity*100:.1f}% → {new_complexity*100:.1f}% (-{reduction:.1f}%)")
-        
-        return result
-        
-    except Exception as e:
-        logger.error(f"❌ Auto-reduce complexity error: {e}")
-        import traceback
-        logger.error(traceback.format_exc())
-        return img  # Fallback: Original zurückgeben
+            logger.warning(f"⚠️ Density budget {target*100:.1f}% not reachable, capping {curve} at {max_value}")
+
+    params = {
+        'curve': curve,
+        'value': round(value, 4),
+        'metric': metric,
+        'target': target,
+        'start_density': round(start_density, 4),
+        'estimated_density': round(density, 4),
+        'met_budget': density <= target,
+        'iterations': steps,
+        'cached': False
+    }
+    with _tone_search_lock:
+        _tone_search_cache[cache_key] = params
+        while len(_tone_search_cache) > TONE_SEARCH_CACHE_SIZE:
+            _tone_search_cache.popitem(last=False)
+
+    logger.info(f"🎯 Density budget search: {metric} {start_density*100:.1f}% → {density*100:.1f}% "
+                f"(target {target*100:.1f}%) with {curve}={value:.3f} in {steps} steps")
+    return params
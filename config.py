@@ -38,6 +38,72 @@ ADAPTIVE_LINE_BASE_DELAY_MS = 2    # Base delay per line (ms)
 ADAPTIVE_LINE_MAX_EXTRA_MS = 15    # Max extra delay at 100% black (ms)
 ADAPTIVE_LINE_DENSITY_THRESHOLD = 0.30  # Density above which extra delay kicks in
 
+# Write-Plan: Init, Header und Raster als wenige writev-Segmente statt
+# einzelner Writes mit festen Pausen. Pausen nur nach dichten Zeilen bzw. am
+# Segmentende (aufgelaufene Grundpausen), header_delay entfällt.
+WRITE_PLAN_ENABLED = True
+WRITE_PLAN_MAX_SEGMENT_BYTES = 672  # Max. Bytes je writev-Segment (wie CHUNK_SIZE_BYTES)
+WRITE_PLAN_KEEP_INIT_DELAY = True   # Pause nach ESC @ beibehalten (Drucker-Reset)
+WRITE_PLAN_MIN_PAUSE_MS = 1.0       # Kürzere Pausen werden ins nächste Segment übertragen
+
+# Leerband-Auslassung: Runs weißer Zeilen werden nicht gesendet, sondern per
+# ESC J (Vorschub in Punktzeilen) überbrückt; das Bild wird dafür in mehrere
+# GS v 0 Bänder geteilt. Nur mit vollständigem Raster (send_bitmap), nicht
+# beim Streaming.
+BLANK_ELISION_ENABLED = True
+BLANK_ELISION_MIN_LINES = 8         # Kürzere Runs werden normal gesendet
+
+# Bandweise Übertragung: große Raster als Folge eigenständiger GS v 0 Bänder.
+# Ein Schreibfehler wiederholt nur das betroffene Band (nach Back-off und
+# Neuöffnen der Sitzung) statt das ganze Label.
+TRANSMIT_BAND_LINES = 64            # Zeilen je Band (0 = ein Band je Druckbereich)
+TRANSMIT_BAND_RETRIES = 2           # Wiederholungen je Band
+TRANSMIT_BAND_BACKOFF_MS = 200      # Erste Wartezeit, verdoppelt sich je Versuch
+
+# Pacing-Modus der Übertragung (Einstellung 'pacing_mode')
+PACING_MODES = {
+    'fixed': 'Feste Pausen (Zeilen-Timing / Speed-Tiers)',
+    'outq': 'Flusskontrolle über Kernel-Ausgabepuffer (TIOCOUTQ)',
+    'bucket': 'Token-Bucket (kalibrierte Byte-Rate, ersetzt die Speed-Tiers)',
+}
+DEFAULT_PACING_MODE = 'fixed'
+# TIOCOUTQ-Flusskontrolle: geschrieben wird nur unterhalb der Hochwassermarke,
+# nach Erreichen wird bis zur Niedrigwassermarke gewartet. Hinweis: rfcomm
+# meldet nur grob (0 oder eine MTU, solange die TX-Queue nicht leer ist).
+OUTQ_HIGH_WATER_BYTES = 2048
+OUTQ_LOW_WATER_BYTES = 512
+OUTQ_POLL_INTERVAL_MS = 2
+OUTQ_STALL_TIMEOUT = 5.0            # Sekunden ohne Abfluss -> Übertragung abbrechen
+
+# Token-Bucket-Pacing: Byte-Rate und Burst je Drucker-MAC aus der Kalibrierung,
+# ohne Kalibrierung gelten die Standardwerte
+PACING_CALIBRATION_FILE = "pacing_calibration.json"
+BUCKET_DEFAULT_RATE_BPS = 6000      # Bytes/s (~125 Zeilen/s)
+BUCKET_DEFAULT_BURST_BYTES = 1024
+PACING_CALIBRATION_RATES = [2000, 3000, 4000, 6000, 8000, 12000, 16000, 24000]  # Sweep in Bytes/s
+PACING_CALIBRATION_MAX_BACKLOG = 2048   # Bestanden, solange der Rückstau darunter bleibt
+PACING_CALIBRATION_MARGIN = 0.85        # Sicherheitsabschlag auf die beste Rate
+
+# Sende-Thread: Übertragungen laufen in einem eigenen Thread mit Deadline-Pacing
+# (perf_counter). Priorität optional anheben - negative nice-Werte bzw. SCHED_FIFO
+# brauchen CAP_SYS_NICE (z.B. systemd: AmbientCapabilities=CAP_SYS_NICE)
+TRANSMIT_THREAD_ENABLED = True
+TRANSMIT_THREAD_NICE = None                 # z.B. -5
+TRANSMIT_THREAD_REALTIME_PRIORITY = None    # z.B. 10 (SCHED_FIFO), hat Vorrang vor nice
+TRANSMIT_HISTORY_SIZE = 20                  # Jobs mit geplanter vs. tatsächlicher Dauer
+
+# Asyncio-Engine: ein Event-Loop-Thread übernimmt Sende-Jobs, Kommandos,
+# Heartbeats und Verbindungsüberwachung (nicht-blockierender fd, Timer-Pacing).
+# Ersetzt dann Sende- und Monitor-Thread; Flask ruft über eine Brücke auf.
+ASYNC_ENGINE_ENABLED = False
+
+# Streaming-Rasterisierung: Bilder werden bandweise gepackt und gesendet, statt
+# erst den kompletten Rasterpuffer aufzubauen. Spart Time-to-first-dot und
+# Speicher bei hohen Labels (z.B. 50x80).
+STREAM_RASTER_TRANSMISSION = True
+RASTER_STREAM_BAND_LINES = 32      # Zeilen pro gepacktem Band
+STREAM_RASTER_MIN_LINES = 400      # Ab dieser Bildhöhe wird gestreamt
+
 # DEFAULT_BLOCK_DELAY_MS: additional delay (ms) to wait after each block is
 # written. The adaptive speed controller may override this via timing_multiplier.
 DEFAULT_BLOCK_DELAY_MS = 0
@@ -134,9 +200,61 @@ DEFAULT_DITHER_THRESHOLD = 128  # Schwellenwert für SW-Konvertierung
 DEFAULT_DITHER_ENABLED = True   # Floyd-Steinberg Dithering aktiviert
 DEFAULT_DITHER_STRENGTH = 1.0   # Dithering-Stärke (0.1 - 2.0)
 DEFAULT_CONTRAST_BOOST = 1.0    # Kontrast-Verstärkung (0.5 - 2.0)
+
+# Dithering-Verfahren (siehe dither_engine.py)
+DITHER_ALGORITHMS = {
+    'floyd_steinberg': 'Floyd-Steinberg (fein, viele Einzelpunkte)',
+    'atkinson': 'Atkinson (heller, weniger Punkte)',
+    'bayer': 'Bayer 8x8 (geordnetes Raster)',
+    'blue_noise': 'Blue Noise (gleichmäßig, ohne Muster)',
+    'auto': 'Automatisch (bestes Verfahren im Dichte-Budget)'
+}
+DEFAULT_DITHER_ALGORITHM = 'floyd_steinberg'
+# Qualitäts-Reihenfolge für 'auto' (jeder Kandidat dithert eine Dichte-Probe).
+# Atkinson fehlt bewusst: Fehlerdiffusion ohne native Engine, ~30x langsamer als Floyd-Steinberg
+DITHER_AUTO_CANDIDATES = ['floyd_steinberg', 'blue_noise', 'bayer']
+BLUE_NOISE_MAP_SIZE = 64        # Kantenlänge der Blue-Noise-Schwellwert-Karte
 SUPPORTED_IMAGE_FORMATS = ['PNG', 'JPEG', 'JPG', 'BMP', 'GIF', 'WEBP']
 MAX_UPLOAD_SIZE = 10 * 1024 * 1024  # 10MB max Upload
 
+# Dekodier-Planung für große Uploads: JPEG-DCT-Skalierung (draft) und ganzzahliges
+# Image.reduce vor dem LANCZOS-Resample. Quelle bleibt mindestens um diesen Faktor
+# größer als das Ziel, damit das finale Resample genug Pixel zum Filtern hat.
+DECODE_DRAFT_ENABLED = True
+DECODE_REDUCING_GAP = 2.0
+
+# Render-Cache: fertige 1-Bit-Bilder je Upload-Inhalt + Parameter (Vorschau -> Druck)
+RENDER_CACHE_ENABLED = True
+RENDER_CACHE_MAX_BYTES = 8 * 1024 * 1024   # Budget inkl. Vorschau-PNG
+
+# Stufen-Cache je Upload (dekodiert, skaliertes Graubild, Tonwert, gedithert):
+# Regler-Änderungen setzen bei der letzten gültigen Stufe wieder auf
+STAGE_CACHE_ENABLED = True
+STAGE_CACHE_MAX_SESSIONS = 4                 # Gleichzeitig gemerkte Uploads
+STAGE_CACHE_SESSION_MAX_ENTRIES = 12         # Zwischenbilder je Upload
+STAGE_CACHE_SESSION_MAX_BYTES = 24 * 1024 * 1024
+
+# Render-Prozesspool: Dekodieren, Skalieren, Dithern und Text-/Code-Bilder in
+# Worker-Prozessen statt unter dem GIL der Flask-/Queue-Threads
+# (Ergebnis kommt als gepacktes 1-Bit-Raster zurück; Stufen-Cache je Worker)
+RENDER_PROCESS_POOL_ENABLED = False
+RENDER_PROCESS_WORKERS = None        # None = Anzahl CPU-Kerne
+RENDER_PROCESS_TIMEOUT = 60          # Sekunden je Render-Auftrag
+
+# Vorschau-Tokens: /api/preview-image liefert ein Token auf das fertige Raster,
+# /api/print-token druckt es ohne erneuten Upload und ohne erneutes Dithering
+PREVIEW_TOKEN_TTL = 600      # Sekunden
+PREVIEW_TOKEN_MAX = 32       # Gleichzeitig gültige Tokens
+
+# Dichte-Schätzung vor dem Dithering: Probe-Dithering auf jeder n-ten Zeile
+# (volle Drucker-Breite, damit die Byte-Struktur erhalten bleibt)
+DENSITY_ESTIMATE_ROW_STEP = 4
+
+# Geschlossene Komplexitäts-Reduktion: Binärsuche über die Tonkurve
+TONE_SEARCH_ITERATIONS = 7     # Halbierungsschritte (Genauigkeit ~1% des Bereichs)
+TONE_SEARCH_CACHE_SIZE = 64    # Gemerkte Parameter für Wiederholdrucke
+TONE_LUT_CACHE_SIZE = 128      # Gecachte Tonwert-LUTs (Kontrast/Helligkeit/Gamma fusioniert)
+
 # Bildanpassungs-Modi
 IMAGE_SCALING_MODES = {
     'fit_aspect': 'An Label anpassen (Seitenverhältnis beibehalten)',
@@ -149,6 +267,8 @@ IMAGE_SCALING_MODES = {
 PREVIEW_MAX_WIDTH = 400   # Max Breite für Web-Vorschau
 PREVIEW_MAX_HEIGHT = 300  # Max Höhe für Web-Vorschau
 PREVIEW_FORMAT = 'PNG'    # Format für Vorschau-Bilder
+PREVIEW_STORE_MAX_BYTES = 4 * 1024 * 1024   # 1-Bit-PNG-Vorschauen für GET /api/preview/<id>.png
+PREVIEW_CACHE_MAX_AGE = 86400               # Cache-Control max-age (Inhalts-Hash als URL -> unveränderlich)
 
 # Connection Management
 MAX_CONNECTION_ATTEMPTS = 5
@@ -156,9 +276,30 @@ BASE_RETRY_DELAY = 2  # Sekunden
 MAX_RETRY_DELAY = 30  # Sekunden
 HEARTBEAT_INTERVAL = 30  # Sekunden
 
+# Status-Rückkanal: ein Lesethread wertet Meldungen des Druckers aus (Papier,
+# Deckel, Überhitzung). Meldet der Drucker einen Fehler, pausiert die Queue,
+# ohne Versuche der Jobs zu verbrauchen, und fragt den Status regelmäßig ab
+STATUS_READER_ENABLED = True
+STATUS_QUERY_TIMEOUT = 1.0          # Sekunden je Statusabfrage
+STATUS_ERROR_POLL_INTERVAL = 5      # Sekunden zwischen Abfragen während der Pause
+STATUS_ERROR_STALE_AFTER = 120      # Sekunden ohne erneute Meldung -> Fehler verfällt (z.B. Überhitzung)
+
 # Print Job Settings
 MAX_RETRIES_PER_JOB = 3
 
+# Queue-Pipeline: Render-Worker bereiten die nächsten Jobs als gepacktes Raster
+# vor, während der aktuelle Job gesendet wird (Puffer begrenzt den Vorlauf)
+QUEUE_PIPELINE_ENABLED = True
+QUEUE_RENDER_WORKERS = 1            # Threads für Dekodieren/Dithern/Packen (GIL: mehr hilft kaum)
+QUEUE_PREPARED_MAX = 2              # vorbereitete Jobs im Puffer (k)
+
+# Job-Journal: wartende Jobs in SQLite (WAL), beim Start werden unfertige Jobs
+# wieder eingereiht (Absturz, systemd-Neustart, Stromausfall)
+JOB_STORE_ENABLED = True
+JOB_STORE_FILE = "print_queue.db"   # relativ: neben CONFIG_FILE (dazu -wal/-shm)
+JOB_STORE_FLUSH_MS = 50             # Sammelfenster: ein fsync je Stapel statt je Job
+JOB_STORE_BATCH_MAX = 64            # Operationen je Transaktion
+
 # Font-Pfade (in Prioritätsreihenfolge)
 FONT_PATHS = [
     "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
@@ -204,6 +345,7 @@ DEFAULT_SETTINGS = {
     'dither_threshold': DEFAULT_DITHER_THRESHOLD,
     'dither_enabled': DEFAULT_DITHER_ENABLED,
     'dither_strength': DEFAULT_DITHER_STRENGTH,
+    'dither_algorithm': DEFAULT_DITHER_ALGORITHM,
     'contrast_boost': DEFAULT_CONTRAST_BOOST,
     'fit_to_label_default': True,
     'maintain_aspect_default': True,
@@ -218,14 +360,20 @@ DEFAULT_SETTINGS = {
     'max_complexity_for_fast': 0.02,      # Komplexitäts-Schwellenwert für schnelle Übertragung (2%)
     'force_slow_for_complex': True,       # Immer langsam bei sehr komplexen Bildern (>12%)
     'timing_multiplier': 1.0,             # Globaler Timing-Multiplikator (1.0 = normal, 1.5 = 50% langsamer)
+    # Pacing: 'fixed' (Pausen), 'outq' (TIOCOUTQ-Flusskontrolle) oder 'bucket'
+    # (Token-Bucket). 'bucket' liest Rate und Burst je Drucker-MAC aus
+    # PACING_CALIBRATION_FILE; die Datei schreibt calibrate_pacing() (z.B.
+    # benchmark_tool.py --mode calibrate --mac <MAC> --save). Ohne Eintrag gelten
+    # BUCKET_DEFAULT_RATE_BPS / BUCKET_DEFAULT_BURST_BYTES, timing_multiplier skaliert die Rate.
+    'pacing_mode': DEFAULT_PACING_MODE,
     # =================== END ADAPTIVE SPEED CONFIG =================
     'anti_drift_interval': 2.0,  # Anti-Drift-Pause in Sekunden (basierend auf erfolgreichen Tests)
     
     # =================== AUTOMATISCHE KOMPLEXITÄTS-REDUKTION ===================
     'auto_reduce_complexity': True,           # Aktiviert automatische Reduktion bei hoher Komplexität
-    'auto_reduce_threshold': 0.10,            # Schwellwert: Ab 10% Komplexität reduzieren
-    'auto_reduce_method': 'adaptive',         # Methode: 'adaptive', 'threshold', 'brightness'
-    'auto_reduce_threshold_value': 140,       # Threshold-Wert für threshold-Methode (80-200)
-    'auto_reduce_brightness_factor': 1.3,     # Helligkeitsfaktor für brightness-Methode (1.0-2.0)
+    'auto_reduce_target_density': 0.10,       # Ziel-Bit-Dichte nach Dithering (Budget und Auslöser der Regelung)
+    'auto_reduce_target_speed': None,         # Alternativ: Speed-Tier halten, z.B. 'fast' (überschreibt Dichte-Ziel)
+    'auto_reduce_curve': 'brightness',        # Tonkurve der Suche: 'brightness' oder 'gamma'
+    'auto_reduce_max_value': 1.8,             # Maximaler Helligkeitsfaktor / Gamma
     # =================== END AUTO-REDUCE CONFIG ===================
 }
@@ -0,0 +1,238 @@
+"""
+Dithering-Engines für Phomemo M110
+Wandelt 8-Bit-Graustufenbilder ('L') in 1-Bit-Bilder ('1')
+Wird von image_pipeline.py und printer_controller.py verwendet
+"""
+
+import logging
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional
+from PIL import Image
+
+# Optional numpy import für vektorisierte Schwellwert-Karten und Atkinson
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+from config import DITHER_ALGORITHMS, DEFAULT_DITHER_ALGORITHM, BLUE_NOISE_MAP_SIZE
+
+logger = logging.getLogger(__name__)
+
+# 8x8 Bayer-Matrix (Rangfolge 0-63)
+BAYER_8X8 = (
+    (0, 32, 8, 40, 2, 34, 10, 42),
+    (48, 16, 56, 24, 50, 18, 58, 26),
+    (12, 44, 4, 36, 14, 46, 6, 38),
+    (60, 28, 52, 20, 62, 30, 54, 22),
+    (3, 35, 11, 43, 1, 33, 9, 41),
+    (51, 19, 59, 27, 49, 17, 57, 25),
+    (15, 47, 7, 39, 13, 45, 5, 37),
+    (63, 31, 55, 23, 61, 29, 53, 21),
+)
+
+
+def _floyd_steinberg(img: Image.Image, threshold: int) -> Image.Image:
+    """PILs native Floyd-Steinberg-Fehlerdiffusion"""
+    return img.convert('1', dither=Image.Dither.FLOYDSTEINBERG)
+
+
+def _threshold(img: Image.Image, threshold: int) -> Image.Image:
+    """Einfacher Schwellenwert ohne Dithering"""
+    return img.point(lambda x: 0 if x < threshold else 255, '1')
+
+
+def _apply_threshold_map(img: Image.Image, rank_map) -> Image.Image:
+    """
+    Vergleicht das Bild mit einer gekachelten Rang-Karte (vektorisiert)
+
+    Ränge 0..n-1 werden auf Schwellen (rang + 0.5) / n * 255 abgebildet -
+    mittleres Grau wird so zu genau 50% schwarzen Pixeln.
+    """
+    ranks = np.asarray(rank_map, dtype=np.float32)
+    thresholds = (ranks + 0.5) * (255.0 / ranks.size)
+    pixels = np.asarray(img, dtype=np.uint8)
+    height, width = pixels.shape
+    reps = (-(-height // thresholds.shape[0]), -(-width // thresholds.shape[1]))
+    tiled = np.tile(thresholds, reps)[:height, :width]
+    return Image.fromarray(pixels > tiled)
+
+
+def _bayer(img: Image.Image, threshold: int) -> Image.Image:
+    """Geordnetes Dithering mit 8x8-Bayer-Matrix - regelmäßiges Raster, wenige Einzelpunkte"""
+    if not HAS_NUMPY:
+        logger.warning("⚠️ numpy not available, falling back to Floyd-Steinberg")
+        return _floyd_steinberg(img, threshold)
+    return _apply_threshold_map(img, BAYER_8X8)
+
+
+@lru_cache(maxsize=2)
+def blue_noise_ranks(size: int = BLUE_NOISE_MAP_SIZE, sigma: float = 1.5):
+    """
+    Erzeugt eine kachelbare Blue-Noise-Rangkarte (Void-and-Cluster, deterministisch)
+
+    Jeder Schritt belegt die "größte Lücke" - das Pixel mit der geringsten
+    Gauß-gewichteten Nähe zu bereits belegten Pixeln (toroidal). Die
+    Reihenfolge der Belegung ist der Rang. Einmalig ~0.1s, danach gecacht.
+    """
+    coords = np.arange(size)
+    dist = np.minimum(coords, size - coords)
+    kernel = np.exp(-(dist[:, None] ** 2 + dist[None, :] ** 2) / (2.0 * sigma ** 2))
+
+    energy = np.zeros((size, size))
+    occupied = np.zeros((size, size), dtype=bool)
+    ranks = np.zeros((size, size), dtype=np.int32)
+
+    for rank in range(size * size):
+        idx = int(np.argmin(np.where(occupied, np.inf, energy)))
+        y, x = divmod(idx, size)
+        occupied[y, x] = True
+        ranks[y, x] = rank
+        energy += np.roll(np.roll(kernel, y, axis=0), x, axis=1)
+
+    return ranks
+
+
+def _blue_noise(img: Image.Image, threshold: int) -> Image.Image:
+    """Schwellwert-Karte mit Blue Noise - unregelmäßig wie FS, aber ohne Fehlerketten"""
+    if not HAS_NUMPY:
+        logger.warning("⚠️ numpy not available, falling back to Floyd-Steinberg")
+        return _floyd_steinberg(img, threshold)
+    return _apply_threshold_map(img, blue_noise_ranks())
+
+
+def _atkinson_python(img: Image.Image, threshold: int) -> Image.Image:
+    """Atkinson zeilenweise in reinem Python (Referenz und Fallback ohne numpy, ~0.15s für 384x640)"""
+    width, height = img.size
+    src = img.tobytes()
+    out = bytearray(width * height)
+
+    # Fehlerpuffer für aktuelle und die zwei folgenden Zeilen (+2 Rand rechts, +1 links)
+    cur = [0] * (width + 3)
+    nxt = [0] * (width + 3)
+    nxt2 = [0] * (width + 3)
+
+    for y in range(height):
+        row = y * width
+        for x in range(width):
+            value = src[row + x] + cur[x + 1]
+            if value < threshold:
+                err = value >> 3 if value > 0 else -((-value) >> 3)
+            else:
+                out[row + x] = 255
+                err = (value - 255) >> 3 if value > 255 else -((255 - value) >> 3)
+            if err:
+                cur[x + 2] += err
+                cur[x + 3] += err
+                nxt[x] += err
+                nxt[x + 1] += err
+                nxt[x + 2] += err
+                nxt2[x + 1] += err
+        cur, nxt, nxt2 = nxt, nxt2, [0] * (width + 3)
+
+    return Image.frombytes('L', (width, height), bytes(out)).convert('1', dither=Image.Dither.NONE)
+
+
+def _atkinson_numpy(img: Image.Image, threshold: int) -> Image.Image:
+    """
+    Atkinson als Wellenfront über die Diagonalen x + 2y = t (vektorisiert)
+
+    Ein Pixel hängt nur von (y, x-1), (y, x-2), (y-1, x-1..x+1) und (y-2, x)
+    ab - alle Pixel einer Diagonale sind unabhängig und werden gemeinsam
+    quantisiert. Jede Diagonale ist in den flachen Puffern ein Slice mit
+    fester Schrittweite. Bit-identisch zu _atkinson_python, aber weiterhin
+    width + 2 * height numpy-Schritte (~0.06s für 384x640).
+    """
+    width, height = img.size
+    stride = width + 3  # Fehlerpuffer: 1 Spalte links, 2 rechts, 2 Zeilen unten
+    src = np.asarray(img, dtype=np.int32).ravel()
+    acc = np.zeros((height + 2) * stride + 2, dtype=np.int32)
+    out = np.zeros(width * height, dtype=bool)
+    targets = (1, 2, stride - 1, stride, stride + 1, 2 * stride)
+
+    for t in range(width + 2 * (height - 1)):
+        y0 = max(0, (t - width + 2) // 2)
+        count = min(height - 1, t // 2) - y0 + 1
+        pixel = y0 * width + t - 2 * y0           # Pixel (y0, t - 2*y0)
+        cell = y0 * stride + t - 2 * y0 + 1       # derselbe Pixel im Fehlerpuffer
+        pixel_step, cell_step = (width - 2, stride - 2) if count > 1 else (1, 1)
+        pixels = slice(pixel, pixel + (count - 1) * pixel_step + 1, pixel_step)
+        cell_end = cell + (count - 1) * cell_step + 1
+
+        value = src[pixels] + acc[cell:cell_end:cell_step]
+        white = value >= threshold
+        out[pixels] = white
+        error = value - 255 * white
+        # Achtel des Fehlers, zur Null hin gerundet (wie die Referenz)
+        error = (error + ((error >> 31) & 7)) >> 3
+        for offset in targets:
+            acc[cell + offset:cell_end + offset:cell_step] += error
+
+    return Image.fromarray(out.reshape(height, width))
+
+
+def _atkinson(img: Image.Image, threshold: int) -> Image.Image:
+    """
+    Atkinson-Fehlerdiffusion
+
+    Verteilt nur 6/8 des Quantisierungsfehlers (je 1/8 an sechs Nachbarn) -
+    helle Flächen werden weiß statt gesprenkelt, das Ergebnis ist heller
+    und deutlich dünner besetzt als Floyd-Steinberg. Auch vektorisiert etwa
+    30x langsamer als PILs Floyd-Steinberg, daher nicht unter den 'auto'-Kandidaten.
+    """
+    if HAS_NUMPY:
+        return _atkinson_numpy(img, threshold)
+    return _atkinson_python(img, threshold)
+
+
+_ENGINES: Dict[str, Callable[[Image.Image, int], Image.Image]] = {
+    'floyd_steinberg': _floyd_steinberg,
+    'bayer': _bayer,
+    'atkinson': _atkinson,
+    'blue_noise': _blue_noise,
+    'threshold': _threshold,
+}
+
+
+def register_dither_algorithm(name: str, engine: Callable[[Image.Image, int], Image.Image]):
+    """Registriert eine zusätzliche Engine: engine(img_L, threshold) -> Mode-'1'-Bild"""
+    _ENGINES[name] = engine
+
+
+def available_dither_algorithms() -> List[str]:
+    """Namen aller registrierten Engines"""
+    return list(_ENGINES.keys())
+
+
+def resolve_dither_algorithm(algorithm: Optional[str], enable_dither: bool = True) -> str:
+    """
+    Normalisiert die Auswahl: ohne Dithering immer 'threshold', unbekannte Namen
+    fallen mit Warnung auf den Standard zurück
+    """
+    if not enable_dither:
+        return 'threshold'
+    if not algorithm:
+        return DEFAULT_DITHER_ALGORITHM
+    if algorithm not in _ENGINES:
+        logger.warning(f"⚠️ Unknown dither algorithm '{algorithm}', using {DEFAULT_DITHER_ALGORITHM}")
+        return DEFAULT_DITHER_ALGORITHM
+    return algorithm
+
+
+def dither_image(img: Image.Image, algorithm: str = DEFAULT_DITHER_ALGORITHM, threshold: int = 128) -> Image.Image:
+    """
+    Dithert ein Graustufenbild mit der gewählten Engine
+
+    Args:
+        img: Bild (wird bei Bedarf nach 'L' konvertiert)
+        algorithm: Name aus DITHER_ALGORITHMS bzw. register_dither_algorithm
+        threshold: Schwellenwert (threshold, atkinson; Map-Verfahren ignorieren ihn)
+
+    Returns:
+        Image.Image: Mode-'1'-Bild gleicher Größe
+    """
+    if img.mode != 'L':
+        img = img.convert('L')
+    engine = _ENGINES.get(algorithm) or _ENGINES[DEFAULT_DITHER_ALGORITHM]
+    return engine(img, threshold)
@@ -0,0 +1,329 @@
+"""
+Flusskontrolle für Phomemo M110
+Pacing anhand der Ausgabe-Warteschlange des Kernels (TIOCOUTQ) oder eines
+kalibrierten Token-Buckets statt fester Pausen
+Wird von printer_controller.py verwendet
+"""
+
+import os
+import json
+import time
+import asyncio
+import struct
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterator, Optional
+
+# fcntl/termios gibt es nur unter Unix
+try:
+    import fcntl
+    import termios
+    HAS_TIOCOUTQ = hasattr(termios, 'TIOCOUTQ')
+except ImportError:
+    HAS_TIOCOUTQ = False
+
+logger = logging.getLogger(__name__)
+
+
+def output_queue_depth(fd: int) -> Optional[int]:
+    """
+    Noch nicht gesendete Bytes im Kernel-Puffer eines tty/Sockets (TIOCOUTQ)
+
+    Auf RFCOMM-Sockets entspricht TIOCOUTQ SIOCOUTQ. Liefert None, wenn das
+    ioctl nicht unterstützt wird.
+    """
+    if not HAS_TIOCOUTQ:
+        return None
+    try:
+        raw = fcntl.ioctl(fd, termios.TIOCOUTQ, b'\0' * 4)
+        return struct.unpack('i', raw)[0]
+    except OSError:
+        return None
+
+
+class OutputQueuePacer:
+    """
+    Schreibt nur, solange der Rückstau unter der Hochwassermarke liegt
+
+    Vor jedem Schreibvorgang wird die Warteschlangentiefe abgefragt. Liegt sie
+    bei oder über high_water, wird gepollt, bis sie auf low_water gefallen ist
+    (Hysterese, verhindert Pendeln um die Marke). Bleibt die Queue länger als
+    stall_timeout voll, gilt der Drucker als hängend.
+
+    Args:
+        queue_depth: Callable -> Bytes im Rückstau (None = unbekannt, nicht warten)
+    """
+
+    def __init__(self, queue_depth: Callable[[], Optional[int]], high_water: int, low_water: int,
+                 poll_interval: float, stall_timeout: float):
+        self.queue_depth = queue_depth
+        self.high_water = int(high_water)
+        self.low_water = min(int(low_water), self.high_water)
+        self.poll_interval = float(poll_interval)
+        self.stall_timeout = float(stall_timeout)
+        self.waits = 0
+        self.polls = 0
+        self.waited_seconds = 0.0
+        self.max_depth = 0
+
+    def _depth(self) -> Optional[int]:
+        depth = self.queue_depth()
+        self.polls += 1
+        if depth is not None and depth > self.max_depth:
+            self.max_depth = depth
+        return depth
+
+    def _room_polls(self) -> Iterator[float]:
+        """
+        Poll-Pausen bis wieder geschrieben werden darf (leer: sofort)
+
+        Gemeinsamer Ablauf für wait_for_room (sleep) und pace_async (Timer).
+        """
+        depth = self._depth()
+        if depth is None or depth < self.high_water:
+            return
+
+        self.waits += 1
+        start = time.monotonic()
+        deadline = start + self.stall_timeout
+        try:
+            while depth is not None and depth > self.low_water:
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"output queue stuck at {depth} bytes for {self.stall_timeout:.1f}s")
+                yield self.poll_interval
+                depth = self._depth()
+        finally:
+            self.waited_seconds += time.monotonic() - start
+
+    def wait_for_room(self) -> float:
+        """
+        Blockiert, bis wieder geschrieben werden darf
+
+        Returns:
+            float: gewartete Sekunden
+
+        Raises:
+            TimeoutError: Rückstau baut sich nicht innerhalb von stall_timeout ab
+        """
+        start = time.monotonic()
+        for interval in self._room_polls():
+            time.sleep(interval)
+        return time.monotonic() - start
+
+    def pace(self, nbytes: int) -> float:
+        """Gemeinsame Pacer-Schnittstelle: vor dem Schreiben von nbytes aufrufen"""
+        return self.wait_for_room()
+
+    async def pace_async(self, nbytes: int) -> float:
+        """Wie pace(), wartet aber per Event-Loop-Timer statt den Thread zu blockieren"""
+        start = time.monotonic()
+        for interval in self._room_polls():
+            await asyncio.sleep(interval)
+        return time.monotonic() - start
+
+    def wait_drained(self, timeout: Optional[float] = None) -> bool:
+        """Wartet, bis die Queue leer ist (z.B. vor dem Abschluss eines Jobs)"""
+        deadline = time.monotonic() + (self.stall_timeout if timeout is None else timeout)
+        depth = self._depth()
+        while depth:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(self.poll_interval)
+            depth = self._depth()
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'high_water': self.high_water,
+            'low_water': self.low_water,
+            'waits': self.waits,
+            'polls': self.polls,
+            'waited_s': round(self.waited_seconds, 4),
+            'max_depth': self.max_depth,
+        }
+
+
+class TokenBucketPacer:
+    """
+    Byte-Raten-Pacing nach Token-Bucket-Modell
+
+    Tokens (Bytes) laufen mit rate_bps nach, höchstens burst_bytes werden
+    angespart. Ein Schreibvorgang von n Bytes wartet, bis n Tokens vorhanden
+    sind; größere Writes als der Burst laufen ins Minus und bremsen die
+    folgenden. Die Wartezeit richtet sich nach der Uhr, nicht nach Summen von
+    sleep() - Verschlafen wird so automatisch ausgeglichen.
+
+    Args:
+        queue_depth: optionale Queue-Abfrage, nur zur Messung (max_depth)
+    """
+
+    def __init__(self, rate_bps: float, burst_bytes: int,
+                 queue_depth: Optional[Callable[[], Optional[int]]] = None):
+        self.rate_bps = max(1.0, float(rate_bps))
+        self.burst_bytes = max(1, int(burst_bytes))
+        self.queue_depth = queue_depth
+        self._tokens = float(self.burst_bytes)
+        self._last = time.monotonic()
+        self.bytes = 0
+        self.waits = 0
+        self.waited_seconds = 0.0
+        self.max_depth = 0
+
+    def _refill(self, now: float):
+        self._tokens = min(float(self.burst_bytes), self._tokens + (now - self._last) * self.rate_bps)
+        self._last = now
+
+    def reserve(self, nbytes: int) -> float:
+        """
+        Bucht nbytes ab und liefert die Wartezeit bis zum Senden (ohne zu schlafen)
+
+        Der Bucket läuft dabei ins Minus; die Wartezeit füllt ihn wieder auf.
+        """
+        if self.queue_depth is not None:
+            depth = self.queue_depth()
+            if depth is not None and depth > self.max_depth:
+                self.max_depth = depth
+
+        self._refill(time.monotonic())
+        waited = 0.0
+        needed = min(nbytes, self.burst_bytes)
+        if self._tokens < needed:
+            waited = (needed - self._tokens) / self.rate_bps
+            self.waits += 1
+            self.waited_seconds += waited
+        self._tokens -= nbytes
+        self.bytes += nbytes
+        return waited
+
+    def pace(self, nbytes: int) -> float:
+        """Wartet, bis nbytes gesendet werden dürfen, und bucht sie ab"""
+        waited = self.reserve(nbytes)
+        if waited > 0:
+            time.sleep(waited)
+        return waited
+
+    async def pace_async(self, nbytes: int) -> float:
+        """Wie pace(), wartet aber per Event-Loop-Timer"""
+        waited = self.reserve(nbytes)
+        if waited > 0:
+            await asyncio.sleep(waited)
+        return waited
+
+    def transfer_time(self, nbytes: int) -> float:
+        """Geplante Dauer für nbytes bei vollem Bucket (für Schätzungen)"""
+        return max(0.0, (nbytes - self.burst_bytes) / self.rate_bps)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'rate_bps': round(self.rate_bps, 1),
+            'burst_bytes': self.burst_bytes,
+            'bytes': self.bytes,
+            'waits': self.waits,
+            'waited_s': round(self.waited_seconds, 4),
+            'max_depth': self.max_depth,
+        }
+
+
+class PacingCalibrationStore:
+    """
+    Kalibrierte Token-Bucket-Parameter je Drucker-MAC (JSON-Datei)
+
+    Eintrag: rate_bps, burst_bytes, measured_bps, calibrated_at, sweep
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _load_all(self) -> Dict[str, Any]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not read pacing calibration {self.path}: {e}")
+            return {}
+
+    def get(self, mac_address: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._load_all().get(mac_address.upper())
+
+    def put(self, mac_address: str, record: Dict[str, Any]) -> bool:
+        with self._lock:
+            data = self._load_all()
+            data[mac_address.upper()] = record
+            try:
+                with open(self.path, 'w') as f:
+                    json.dump(data, f, indent=2)
+                return True
+            except Exception as e:
+                logger.error(f"Error saving pacing calibration: {e}")
+                return False
+
+
+class DeadlineClock:
+    """
+    Pausen als absolute Deadlines auf time.perf_counter
+
+    Statt nach jeder Zeile sleep(pause) aufzurufen, wird die nächste Deadline
+    um die Arbeitszeit seit dem letzten Aufwachen (Writes) plus pause
+    verschoben und nur bis dorthin geschlafen. Verschlafen oder Scheduler-
+    Jitter einer Pause verschiebt den Plan nicht und wird bei der nächsten
+    Pause wieder eingeholt, statt sich über hunderte Zeilen aufzusummieren.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.deadline = self.start
+        self._last_wake = self.start
+        self.planned = 0.0          # Summe der geplanten Pausen
+        self.work = 0.0             # Zeit zwischen den Pausen (Writes, Pacer)
+        self.max_lateness = 0.0     # größter Rückstand gegenüber einer Deadline
+
+    def _advance(self, pause: float) -> float:
+        """Plant pause Sekunden nach der bisherigen Arbeit ein, liefert die Restzeit bis zur Deadline"""
+        now = time.perf_counter()
+        work = now - self._last_wake
+        self.work += work
+        self.planned += pause
+        self.deadline += work + pause
+        remaining = self.deadline - now
+        if remaining <= 0:
+            # Vorher verschlafen - diese Pause entfällt (teilweise)
+            self.max_lateness = max(self.max_lateness, -remaining)
+        return remaining
+
+    def wait(self, pause: float):
+        """Plant pause Sekunden nach der bisherigen Arbeit ein und wartet bis zur Deadline"""
+        if pause <= 0:
+            return
+        remaining = self._advance(pause)
+        if remaining > 0:
+            time.sleep(remaining)
+        self._last_wake = time.perf_counter()
+
+    async def wait_async(self, pause: float):
+        """Wie wait(), die Deadline wird aber per Event-Loop-Timer abgewartet"""
+        if pause <= 0:
+            return
+        remaining = self._advance(pause)
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+        self._last_wake = time.perf_counter()
+
+    def finish(self) -> Dict[str, float]:
+        """Abschluss: geplante vs. tatsächliche Dauer"""
+        now = time.perf_counter()
+        self.work += now - self._last_wake
+        self._last_wake = now
+        actual = now - self.start
+        planned = self.planned + self.work
+        return {
+            'planned_s': round(planned, 4),
+            'actual_s': round(actual, 4),
+            'drift_ms': round((actual - planned) * 1000, 2),
+            'pause_s': round(self.planned, 4),
+            'work_s': round(self.work, 4),
+            'max_lateness_ms': round(self.max_lateness * 1000, 2),
+        }
@@ -0,0 +1,336 @@
+"""
+Bildverarbeitungs-Pipeline für Phomemo M110
+Graustufen-Geometrie, Tonwert und Dichte-Schätzung (Dithering selbst: dither_engine.py)
+Wird von printer_controller.py verwendet
+"""
+
+import io
+import time
+import logging
+from functools import lru_cache
+from typing import Optional, Sequence, Tuple, Dict, Any, Union
+from PIL import Image
+
+# resource gibt es nur auf Unix (Raspberry Pi) - ohne wird kein RSS berichtet
+try:
+    import resource
+    HAS_RESOURCE = True
+except ImportError:
+    HAS_RESOURCE = False
+
+from config import (PRINTER_WIDTH_PIXELS, PRINTER_BYTES_PER_LINE, DENSITY_ESTIMATE_ROW_STEP, TONE_LUT_CACHE_SIZE,
+                    DECODE_DRAFT_ENABLED, DECODE_REDUCING_GAP, DITHER_AUTO_CANDIDATES)
+from raster_engine import RasterStats, compute_raster_stats, pack_image_to_raster
+from dither_engine import dither_image, resolve_dither_algorithm
+
+logger = logging.getLogger(__name__)
+
+IDENTITY_LUT = tuple(range(256))
+
+
+def flatten_to_grayscale(img: Image.Image) -> Image.Image:
+    """
+    Wandelt ein frisch dekodiertes Bild in 8-Bit-Graustufen ('L')
+
+    Transparenz (RGBA, LA, PA, P mit transparency) wird auf Weiß geflacht -
+    Labelpapier ist weiß, ein einfaches convert() würde transparente Flächen
+    dagegen je nach Farbwert schwarz drucken.
+    """
+    if img.mode == 'L':
+        return img
+
+    has_alpha = 'A' in img.getbands() or (img.mode == 'P' and 'transparency' in img.info)
+    if not has_alpha:
+        return img.convert('L')
+
+    if img.mode == 'P':
+        img = img.convert('RGBA')
+    la = img.convert('LA')
+    flattened = Image.new('L', la.size, 255)
+    flattened.paste(la.getchannel('L'), mask=la.getchannel('A'))
+    return flattened
+
+
+def peak_rss_kb() -> Optional[int]:
+    """Höchststand des Resident Set Size dieses Prozesses in KB (None ohne resource-Modul)"""
+    if not HAS_RESOURCE:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def required_source_scale(source_size: Tuple[int, int], target_width: int, target_height: int,
+                          scaling_mode: str = 'fit_aspect', maintain_aspect: bool = True) -> float:
+    """
+    Kleinster Skalierungsfaktor, den fit_image_to_label auf die Quelle anwenden wird
+
+    Modi, die das Label füllen (crop_center, stretch_full, fit_aspect ohne
+    Seitenverhältnis), brauchen die größere der beiden Achs-Skalierungen,
+    alle anderen die kleinere.
+    """
+    width, height = source_size
+    if not width or not height:
+        return 1.0
+    scale_w = target_width / width
+    scale_h = target_height / height
+    if scaling_mode in ('crop_center', 'stretch_full') or (scaling_mode == 'fit_aspect' and not maintain_aspect):
+        return max(scale_w, scale_h)
+    return min(scale_w, scale_h)
+
+
+def decode_for_label(image_data: Union[bytes, Image.Image], target_size: Optional[Tuple[int, int]] = None,
+                     scaling_mode: str = 'fit_aspect', maintain_aspect: bool = True,
+                     reducing_gap: float = DECODE_REDUCING_GAP) -> Tuple[Image.Image, Dict[str, Any]]:
+    """
+    Dekodiert ein Upload-Bild direkt in passender Größe als 'L'-Bild
+
+    Mit target_size wird vor dem Laden geplant: JPEGs werden per Image.draft
+    bereits beim Dekodieren per DCT verkleinert (1/2, 1/4, 1/8) und nur als
+    Luminanz dekodiert, danach schrumpft Image.reduce ganzzahlig weiter. Die
+    Quelle bleibt dabei mindestens reducing_gap-mal größer als das Ziel - das
+    abschließende LANCZOS in fit_image_to_label bestimmt weiterhin die Qualität.
+
+    Returns:
+        (img, info): info enthält decoded_size, draft/reduce-Faktoren,
+                     decode_time_ms und peak_rss_kb
+    """
+    start = time.perf_counter()
+    rss_before = peak_rss_kb()
+
+    img = Image.open(io.BytesIO(image_data)) if isinstance(image_data, (bytes, bytearray)) else image_data
+    source_size = img.size
+    draft_scale = 1
+    reduce_factor = 1
+
+    if target_size and DECODE_DRAFT_ENABLED:
+        scale = required_source_scale(source_size, target_size[0], target_size[1], scaling_mode, maintain_aspect)
+        wanted = (max(1, int(source_size[0] * scale * reducing_gap + 0.5)),
+                  max(1, int(source_size[1] * scale * reducing_gap + 0.5)))
+
+        # draft wirkt nur vor dem Laden und nur bei JPEG (andere Formate: None)
+        if img.format == 'JPEG' and wanted[0] < source_size[0] and wanted[1] < source_size[1]:
+            draft_mode = 'L' if img.mode in ('RGB', 'L') else None
+            if img.draft(draft_mode, wanted) is not None:
+                draft_scale = max(1, source_size[0] // img.size[0])
+
+        img = flatten_to_grayscale(img)
+
+        reduce_factor = max(1, min(img.width // wanted[0], img.height // wanted[1]))
+        if reduce_factor > 1:
+            img = img.reduce(reduce_factor)
+    else:
+        img = flatten_to_grayscale(img)
+
+    # Lazy-Dekodierung erzwingen, damit Zeit und RSS den echten Decode enthalten
+    img.load()
+    rss_after = peak_rss_kb()
+    info = {
+        'source_size': source_size,
+        'decoded_size': img.size,
+        'draft_scale': draft_scale,
+        'reduce_factor': reduce_factor,
+        'decode_time_ms': round((time.perf_counter() - start) * 1000, 2),
+        'peak_rss_kb': rss_after,
+        'peak_rss_growth_kb': (rss_after - rss_before) if rss_after is not None else None,
+    }
+    return img, info
+
+
+def fit_image_to_label(img: Image.Image, target_width: int, target_height: int,
+                       scaling_mode: str = 'fit_aspect', maintain_aspect: bool = True) -> Image.Image:
+    """
+    Bringt ein Bild gemäß Skalierungsmodus auf Label-Größe (modusunabhängig, Rand weiß)
+
+    Modi siehe config.IMAGE_SCALING_MODES. Das Eingabebild wird nicht verändert.
+    """
+    background = 255 if img.mode in ('L', '1') else 'white'
+
+    if scaling_mode == 'fit_aspect':
+        # Original-Verhalten: Seitenverhältnis beibehalten
+        if maintain_aspect:
+            # Wie thumbnail(): nur verkleinern, nie vergrößern - aber ohne das Eingabebild zu verändern
+            if img.width > target_width or img.height > target_height:
+                scale = min(target_width / img.width, target_height / img.height)
+                size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+                img = img.resize(size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+            # Zentrieren auf Label-Größe
+            new_img = Image.new(img.mode, (target_width, target_height), background)
+            paste_x = (target_width - img.width) // 2
+            paste_y = (target_height - img.height) // 2
+            new_img.paste(img, (paste_x, paste_y))
+            img = new_img
+        else:
+            # Direkt auf Label-Größe skalieren
+            img = img.resize((target_width, target_height), Image.Resampling.LANCZOS)
+
+    elif scaling_mode == 'stretch_full':
+        # Volle Label-Größe (stretchen/verzerren falls nötig)
+        img = img.resize((target_width, target_height), Image.Resampling.LANCZOS)
+
+    elif scaling_mode == 'crop_center':
+        # Zentriert zuschneiden für volle Label-Größe
+        # Berechne Skalierung um kleinste Dimension zu füllen
+        scale = max(target_width / img.width, target_height / img.height)
+
+        new_width = int(img.width * scale)
+        new_height = int(img.height * scale)
+        img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+
+        left = (new_width - target_width) // 2
+        top = (new_height - target_height) // 2
+        img = img.crop((left, top, left + target_width, top + target_height))
+
+    elif scaling_mode == 'pad_center':
+        # Zentriert mit Rand für volle Label-Größe
+        # Berechne Skalierung um größte Dimension zu füllen
+        scale = min(target_width / img.width, target_height / img.height)
+
+        new_width = int(img.width * scale)
+        new_height = int(img.height * scale)
+        img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+
+        new_img = Image.new(img.mode, (target_width, target_height), background)
+        paste_x = (target_width - new_width) // 2
+        paste_y = (target_height - new_height) // 2
+        new_img.paste(img, (paste_x, paste_y))
+        img = new_img
+
+    return img
+
+
+def encode_preview_png(img: Image.Image, max_size: Optional[Tuple[int, int]] = None) -> bytes:
+    """
+    Kodiert eine Vorschau als 1-Bit-PNG (Mode '1', ohne Palette)
+
+    Das Bild bleibt 1-Bit - kein RGB-Umweg, der Browser dekodiert ein
+    kleines natives Bild. max_size verkleinert per NEAREST (Dither-Muster bleibt).
+    """
+    if img.mode != '1':
+        img = img.convert('1')
+    if max_size and (img.width > max_size[0] or img.height > max_size[1]):
+        img = img.copy()
+        img.thumbnail(max_size, Image.Resampling.NEAREST)
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG', optimize=False)
+    return buffer.getvalue()
+
+
+@lru_cache(maxsize=TONE_LUT_CACHE_SIZE)
+def tone_curve_lut(curve: str, value: float) -> Tuple[int, ...]:
+    """
+    256-Einträge-Lookup-Tabelle für eine Aufhellungskurve
+
+    Args:
+        curve: 'brightness' (linear wie ImageEnhance.Brightness) oder 'gamma'
+        value: Faktor bzw. Gamma (1.0 = unverändert, größer = heller)
+    """
+    if curve == 'gamma':
+        return tuple(min(255, int(round(255.0 * (v / 255.0) ** (1.0 / value)))) for v in range(256))
+    return tuple(min(255, int(round(v * value))) for v in range(256))
+
+
+@lru_cache(maxsize=TONE_LUT_CACHE_SIZE)
+def build_tone_lut(curve: str = 'brightness', curve_value: float = 1.0, contrast: float = 1.0,
+                   contrast_mean: int = 128, dither_strength: float = 1.0) -> Tuple[int, ...]:
+    """
+    Fasst alle Tonwert-Schritte vor dem Dithering in einer 256er-LUT zusammen
+
+    Reihenfolge wie in der bisherigen Pipeline:
+    1. Aufhellung der Komplexitäts-Reduktion (Brightness/Gamma)
+    2. Kontrast-Boost um den Bildmittelwert (wie ImageEnhance.Contrast)
+    3. Dithering-Stärke als Gamma-Korrektur (v/255) ** (1/strength)
+
+    Gecacht nach Parameter-Tupel - ein Druck kostet damit nur noch einen Image.point-Durchlauf.
+    """
+    lut = tone_curve_lut(curve, curve_value) if curve_value != 1.0 else IDENTITY_LUT
+
+    if contrast != 1.0:
+        lut = tuple(max(0, min(255, int(contrast_mean + contrast * (v - contrast_mean)))) for v in lut)
+
+    if dither_strength != 1.0:
+        gamma = 1.0 / dither_strength
+        lut = tuple(min(255, int(255.0 * (v / 255.0) ** gamma)) for v in lut)
+
+    return lut
+
+
+def image_tone_lut(histogram: Sequence[int], curve: str = 'brightness', curve_value: float = 1.0,
+                   contrast: float = 1.0, dither_strength: float = 1.0) -> Tuple[int, ...]:
+    """
+    Liefert die fusionierte Tonwert-LUT für ein konkretes Bild
+
+    Der Kontrast-Mittelwert wird aus dem Histogramm des 'L'-Bildes (nach der Aufhellung)
+    berechnet - kein zusätzlicher Bilddurchlauf nötig.
+    """
+    contrast_mean = 128
+    if contrast != 1.0:
+        pixel_count = sum(histogram)
+        pre = tone_curve_lut(curve, curve_value) if curve_value != 1.0 else range(256)
+        if pixel_count:
+            contrast_mean = int(sum(pre[v] * n for v, n in enumerate(histogram[:256])) / pixel_count + 0.5)
+    return build_tone_lut(curve, round(curve_value, 4), round(contrast, 4), contrast_mean, round(dither_strength, 4))
+
+
+def make_density_proxy(img: Image.Image, row_step: int = DENSITY_ESTIMATE_ROW_STEP) -> Image.Image:
+    """
+    Erstellt die günstige Graustufen-Probe für Dichte-Schätzungen
+
+    Es wird nur jede row_step-te Zeile übernommen, bei voller Drucker-Breite - so
+    bleibt die horizontale Byte-Struktur erhalten und auch der Anteil non-zero
+    Bytes lässt sich auf wenige Prozent genau vorhersagen. Zeilen werden gesampelt
+    statt gemittelt: Mittelung glättet Rauschen weg, das nach Kontrast-/Helligkeits-
+    LUTs (Clipping) und beim Threshold die Dichte bestimmt.
+    """
+    trial_height = max(1, img.height // max(1, int(row_step)))
+    trial = img.convert('L') if img.mode != 'L' else img
+    return trial.resize((PRINTER_WIDTH_PIXELS, trial_height), Image.Resampling.NEAREST)
+
+
+def measure_proxy_density(proxy: Image.Image, enable_dither: bool = True, dither_threshold: int = 128,
+                          lut: Optional[Sequence[int]] = None, algorithm: Optional[str] = None) -> RasterStats:
+    """Dithert die Probe (optional mit vorgeschalteter Tonwert-LUT) und misst das Ergebnis"""
+    trial = proxy.point(lut) if lut is not None else proxy
+    trial_bw = dither_image(trial, resolve_dither_algorithm(algorithm, enable_dither), dither_threshold)
+    return compute_raster_stats(pack_image_to_raster(trial_bw, PRINTER_BYTES_PER_LINE), PRINTER_BYTES_PER_LINE)
+
+
+def estimate_dither_density(img: Image.Image, enable_dither: bool = True, dither_threshold: int = 128,
+                            lut: Optional[Sequence[int]] = None,
+                            row_step: int = DENSITY_ESTIMATE_ROW_STEP,
+                            algorithm: Optional[str] = None) -> RasterStats:
+    """
+    Schätzt Bit-Dichte und Komplexität des fertigen 1-Bit-Bildes vor dem eigentlichen Dithering
+
+    Args:
+        img: Bild nach Geometrie-Anpassung (beliebiger Modus)
+        enable_dither: Dithering (True) oder einfacher Threshold (False)
+        dither_threshold: Schwellenwert für den Threshold-Modus
+        lut: Tonwert-LUT, die auch vor dem echten Dithering angewendet wird
+        row_step: Vertikaler Verkleinerungsfaktor
+        algorithm: Dithering-Verfahren (Standard: DEFAULT_DITHER_ALGORITHM)
+
+    Returns:
+        RasterStats des Probe-Rasters (bit_density, complexity)
+    """
+    proxy = make_density_proxy(img, row_step)
+    return measure_proxy_density(proxy, enable_dither, dither_threshold, lut, algorithm)
+
+
+def select_dither_algorithm(img: Image.Image, target: float, metric: str = 'bit_density',
+                            candidates: Sequence[str] = DITHER_AUTO_CANDIDATES,
+                            dither_threshold: int = 128, lut: Optional[Sequence[int]] = None) -> Tuple[str, Dict[str, float]]:
+    """
+    Dichte-bewusste Auswahl für 'auto': erstes Verfahren (Qualitäts-Reihenfolge), das das Budget einhält
+
+    Alle Kandidaten werden auf derselben Dichte-Probe gemessen. Hält keiner das
+    Budget ein, gewinnt das Verfahren mit der geringsten Dichte.
+
+    Returns:
+        (algorithm, {algorithm: geschätzter Metrik-Wert})
+    """
+    proxy = make_density_proxy(img)
+    estimates = {}
+    for name in candidates:
+        estimates[name] = round(getattr(measure_proxy_density(proxy, True, dither_threshold, lut, name), metric), 4)
+        if estimates[name] <= target:
+            return name, estimates
+    return min(estimates, key=estimates.get), estimates
@@ -0,0 +1,341 @@
+"""
+Job-Journal für Phomemo M110
+Hält die Print-Queue in einer SQLite-Datenbank (WAL) im Arbeitsverzeichnis,
+damit wartende Jobs Absturz, Neustart und Stromausfall überstehen
+Wird von printer_controller.py verwendet
+"""
+
+import io
+import json
+import time
+import logging
+import sqlite3
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    seq INTEGER PRIMARY KEY,
+    job_id TEXT NOT NULL,
+    job_type TEXT NOT NULL,
+    data TEXT NOT NULL,
+    created REAL NOT NULL,
+    retry_count INTEGER NOT NULL DEFAULT 0,
+    max_retries INTEGER NOT NULL,
+    raster BLOB,
+    raster_height INTEGER
+);
+CREATE TABLE IF NOT EXISTS job_blobs (
+    seq INTEGER NOT NULL,
+    key TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    value BLOB NOT NULL,
+    PRIMARY KEY (seq, key)
+);
+"""
+
+
+def encode_job_data(data: Dict[str, Any]) -> Tuple[str, List[Tuple[str, str, bytes]]]:
+    """
+    Zerlegt Job-Daten in JSON und Binärteile
+
+    Bytes (Uploads, Raster) und PIL-Bilder (als PNG) landen in job_blobs,
+    alles andere als JSON.
+
+    Returns:
+        (json, [(schlüssel, art, bytes)])
+    """
+    plain = {}
+    blobs = []
+    for key, value in data.items():
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            blobs.append((key, 'bytes', bytes(value)))
+        elif isinstance(value, Image.Image):
+            buffer = io.BytesIO()
+            value.save(buffer, 'PNG')
+            blobs.append((key, 'image', buffer.getvalue()))
+        else:
+            plain[key] = value
+    return json.dumps(plain, default=str), blobs
+
+
+def decode_job_data(data_json: str, blobs: List[Tuple[str, str, bytes]]) -> Dict[str, Any]:
+    """Gegenstück zu encode_job_data"""
+    data = json.loads(data_json)
+    for key, kind, value in blobs:
+        if kind == 'image':
+            img = Image.open(io.BytesIO(value))
+            img.load()
+            data[key] = img
+        else:
+            data[key] = bytes(value)
+    return data
+
+
+def _percentile(samples, fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class JobStore:
+    """
+    Persistentes Journal der Print-Queue (SQLite im WAL-Modus)
+
+    add/update/finish nehmen nur eine Operation in eine Warteschlange auf
+    (Mikrosekunden, kein I/O im Aufrufer). Ein Schreib-Thread sammelt
+    Operationen bis zu flush_interval bzw. batch_max und schreibt sie in einer
+    Transaktion - ein fsync je Stapel statt je Job. Fallen Aufnahme und
+    Abschluss eines Jobs in denselben Stapel, erreicht er die Platte nie.
+
+    Jobs werden mindestens einmal gedruckt: ein Job, der beim Absturz gerade
+    gesendet wurde, steht nach dem Neustart wieder in der Queue.
+
+    Args:
+        path: Datenbankdatei
+        flush_interval: Sammelfenster für Operationen in Sekunden (0: sofort)
+        batch_max: höchstens so viele Operationen je Transaktion
+    """
+
+    def __init__(self, path: str, flush_interval: float = 0.05, batch_max: int = 64):
+        self.path = path
+        self.flush_interval = float(flush_interval)
+        self.batch_max = max(1, int(batch_max))
+        self._conn: Optional[sqlite3.Connection] = None
+        self._ops: deque = deque()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._next_seq = 1
+        self._submitted = 0
+        self._committed = 0
+        self._stored = 0
+        self._enqueue_us = deque(maxlen=256)
+        self._durable_ms = deque(maxlen=256)
+        self.stats = {
+            'ops': 0,
+            'batches': 0,
+            'coalesced': 0,
+            'replayed': 0,
+            'errors': 0,
+        }
+
+    # ------------------------------------------------------------------ Öffnen / Schließen
+
+    @property
+    def is_open(self) -> bool:
+        return self._running
+
+    def open(self) -> List[Dict[str, Any]]:
+        """
+        Öffnet die Datenbank, startet den Schreib-Thread und liefert unfertige Jobs
+
+        Returns:
+            Liste von Job-Datensätzen in Einreihungsreihenfolge (seq, job_id,
+            job_type, data, created, retry_count, max_retries, raster, raster_height)
+        """
+        if self._running:
+            return []
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        # FULL: fsync des WAL bei jedem Commit - ein Commit je Stapel
+        conn.execute('PRAGMA synchronous=FULL')
+        conn.executescript(SCHEMA)
+
+        blobs: Dict[int, List[Tuple[str, str, bytes]]] = {}
+        for seq, key, kind, value in conn.execute('SELECT seq, key, kind, value FROM job_blobs'):
+            blobs.setdefault(seq, []).append((key, kind, value))
+
+        records = []
+        rows = conn.execute('SELECT seq, job_id, job_type, data, created, retry_count, max_retries, '
+                            'raster, raster_height FROM jobs ORDER BY seq').fetchall()
+        for seq, job_id, job_type, data_json, created, retry_count, max_retries, raster, raster_height in rows:
+            try:
+                data = decode_job_data(data_json, blobs.get(seq, []))
+            except Exception as e:
+                logger.error(f"❌ Stored job {job_id} unreadable, dropping: {e}")
+                conn.execute('DELETE FROM jobs WHERE seq = ?', (seq,))
+                conn.execute('DELETE FROM job_blobs WHERE seq = ?', (seq,))
+                continue
+            records.append({
+                'seq': seq, 'job_id': job_id, 'job_type': job_type, 'data': data,
+                'created': created, 'retry_count': retry_count, 'max_retries': max_retries,
+                'raster': bytes(raster) if raster is not None else None,
+                'raster_height': raster_height,
+            })
+        last = conn.execute('SELECT MAX(seq) FROM jobs').fetchone()[0]
+
+        self._conn = conn
+        self._next_seq = (last or 0) + 1
+        self._stored = len(records)
+        self.stats['replayed'] = len(records)
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='phomemo-jobstore', daemon=True)
+        self._thread.start()
+        logger.info(f"💾 Job store {self.path} opened ({len(records)} unfinished job(s))")
+        return records
+
+    def close(self, timeout: float = 5.0):
+        """Schreibt ausstehende Operationen und schließt die Datenbank"""
+        if not self._running:
+            return
+        self.flush(timeout)
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+        self._thread = None
+        try:
+            self._conn.close()
+        except sqlite3.Error:
+            pass
+        self._conn = None
+        logger.info("💾 Job store closed")
+
+    # ------------------------------------------------------------------ Operationen
+
+    def _submit(self, op: tuple):
+        start = time.perf_counter()
+        with self._cond:
+            if not self._running:
+                return
+            self._ops.append((time.perf_counter(), op))
+            self._submitted += 1
+            self._cond.notify()
+        self._enqueue_us.append((time.perf_counter() - start) * 1e6)
+
+    def add(self, job):
+        """Nimmt einen neuen Job auf (setzt job.store_key)"""
+        if not self._running:
+            return
+        with self._cond:
+            job.store_key = self._next_seq
+            self._next_seq += 1
+        self._submit(('add', job.store_key, job.job_id, job.job_type, job.data, job.timestamp,
+                      job.retry_count, job.max_retries))
+
+    def update(self, job):
+        """Speichert Versuchszähler und - falls vorhanden - das vorbereitete Raster"""
+        if job.store_key is None:
+            return
+        prepared = job.prepared
+        self._submit(('update', job.store_key, job.retry_count,
+                      prepared.raster if prepared is not None else None,
+                      prepared.height if prepared is not None else None))
+
+    def finish(self, job):
+        """Entfernt einen abgeschlossenen (gedruckten oder verworfenen) Job"""
+        if job.store_key is None:
+            return
+        self._submit(('finish', job.store_key))
+
+    def clear(self):
+        """Entfernt alle Jobs"""
+        self._submit(('clear',))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wartet, bis alle bisher übergebenen Operationen auf der Platte sind"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            target = self._submitted
+            while self._running and self._committed < target:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return self._committed >= target
+
+    # ------------------------------------------------------------------ Schreib-Thread
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._ops:
+                    self._cond.wait()
+                if not self._ops and not self._running:
+                    return
+            # Sammelfenster: weitere Operationen in dieselbe Transaktion
+            if self.flush_interval > 0 and self._running and len(self._ops) < self.batch_max:
+                time.sleep(self.flush_interval)
+            with self._cond:
+                batch = [self._ops.popleft() for _ in range(min(len(self._ops), self.batch_max))]
+            try:
+                self._write_batch([op for _, op in batch])
+            except sqlite3.Error as e:
+                self.stats['errors'] += 1
+                logger.error(f"Job store write error: {e}")
+            now = time.perf_counter()
+            for queued_at, _ in batch:
+                self._durable_ms.append((now - queued_at) * 1000)
+            with self._cond:
+                self._committed += len(batch)
+                self._cond.notify_all()
+
+    def _write_batch(self, ops: List[tuple]):
+        # Im selben Stapel abgeschlossene Jobs gar nicht erst schreiben
+        added = {op[1] for op in ops if op[0] == 'add'}
+        finished = {op[1] for op in ops if op[0] == 'finish'}
+        transient = added & finished
+
+        conn = self._conn
+        stored = self._stored
+        conn.execute('BEGIN')
+        try:
+            for op in ops:
+                kind = op[0]
+                if kind != 'clear' and op[1] in transient:
+                    self.stats['coalesced'] += 1
+                    continue
+                if kind == 'add':
+                    _, seq, job_id, job_type, data, created, retry_count, max_retries = op
+                    data_json, blobs = encode_job_data(data)
+                    conn.execute('INSERT OR REPLACE INTO jobs (seq, job_id, job_type, data, created, '
+                                 'retry_count, max_retries) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                 (seq, job_id, job_type, data_json, created, retry_count, max_retries))
+                    conn.executemany('INSERT OR REPLACE INTO job_blobs (seq, key, kind, value) VALUES (?, ?, ?, ?)',
+                                     [(seq, key, blob_kind, value) for key, blob_kind, value in blobs])
+                    stored += 1
+                elif kind == 'update':
+                    _, seq, retry_count, raster, raster_height = op
+                    conn.execute('UPDATE jobs SET retry_count = ?, raster = COALESCE(?, raster), '
+                                 'raster_height = COALESCE(?, raster_height) WHERE seq = ?',
+                                 (retry_count, raster, raster_height, seq))
+                elif kind == 'finish':
+                    stored -= conn.execute('DELETE FROM jobs WHERE seq = ?', (op[1],)).rowcount
+                    conn.execute('DELETE FROM job_blobs WHERE seq = ?', (op[1],))
+                elif kind == 'clear':
+                    conn.execute('DELETE FROM jobs')
+                    conn.execute('DELETE FROM job_blobs')
+                    stored = 0
+            conn.execute('COMMIT')
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        self._stored = stored
+        self.stats['ops'] += len(ops)
+        self.stats['batches'] += 1
+
+    # ------------------------------------------------------------------ Status
+
+    def get_status(self) -> Dict[str, Any]:
+        enqueue_us = list(self._enqueue_us)
+        durable_ms = list(self._durable_ms)
+        return {
+            'open': self.is_open,
+            'path': self.path,
+            'stored_jobs': self._stored,
+            'backlog': len(self._ops),
+            **self.stats,
+            'enqueue_us_p50': round(_percentile(enqueue_us, 0.5), 1),
+            'enqueue_us_max': round(max(enqueue_us, default=0.0), 1),
+            'durable_ms_p50': round(_percentile(durable_ms, 0.5), 2),
+            'durable_ms_max': round(max(durable_ms, default=0.0), 2),
+        }
@@ -7,34 +7,54 @@ Plus QR-Code und Barcode-Unterstützung
 
 import os
 import time
+import asyncio
 import logging
 import subprocess
 import threading
 import queue
 import io
 import json
-import base64
-from typing import Optional, Dict, Any, Tuple
-from dataclasses import dataclass
+import itertools
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Dict, Any, Tuple, Iterable, Iterator
+from dataclasses import dataclass, replace
 from enum import Enum
 from datetime import datetime
-from PIL import Image, ImageDraw, ImageFont, ImageEnhance
-import socket
+from PIL import Image, ImageDraw, ImageFont
 import errno
 
-# Optional numpy import für erweiterte Bildverarbeitung
-try:
-    import numpy as np
-    HAS_NUMPY = True
-except ImportError:
-    HAS_NUMPY = False
-    print("WARNING: Numpy not available, advanced dithering features disabled")
-
 # Konfiguration importieren
 from config import *
 
 # Komplexitäts-Reduktion importieren
-from complexity_reducer import auto_reduce_complexity_if_needed
+from complexity_reducer import reduce_to_density_budget
+
+# Bildverarbeitungs-Hilfen importieren
+from image_pipeline import (estimate_dither_density, image_tone_lut, IDENTITY_LUT,
+                            decode_for_label, fit_image_to_label, select_dither_algorithm,
+                            encode_preview_png)
+
+# Dithering-Engines importieren
+from dither_engine import dither_image, resolve_dither_algorithm
+
+# Render-Cache importieren
+from render_cache import ByteLRUCache, StagedImageCache, PreviewTokenStore, content_hash, image_nbytes
+
+# Persistente Transport-Sitzung (ein fd/Socket für alle Schreibzugriffe)
+from transport import PrinterTransport
+from write_plan import iter_write_plan, plan_raster_bands, split_bands, WritePlanSummary, BandTracker
+from flow_control import OutputQueuePacer, TokenBucketPacer, PacingCalibrationStore, DeadlineClock
+from transmit_worker import TransmitWorker
+from async_engine import AsyncPrinterEngine
+from printer_status import PrinterState, StatusReader, STATUS_QUERIES
+from render_pool import (RenderPool, RenderPoolUnavailable, in_render_worker,
+                         render_image_task, render_text_task, render_codes_task)
+from job_store import JobStore
+
+# Raster-Packing importieren
+from raster_engine import (pack_image_to_raster, iter_raster_bands, iter_raster_rows,
+                           RasterStats, compute_raster_stats, line_popcount)
 
 # Code Generator import mit Fallback
 try:
@@ -47,6 +67,13 @@ except ImportError as e:
 
 logger = logging.getLogger(__name__)
 
+# Settings, die das Ergebnis von process_image_for_preview beeinflussen (Teil des Cache-Schlüssels)
+RENDER_SETTINGS_KEYS = (
+    'contrast_boost', 'auto_reduce_complexity', 'auto_reduce_target_density',
+    'auto_reduce_target_speed', 'auto_reduce_curve', 'auto_reduce_max_value',
+    'adaptive_speed_enabled', 'max_complexity_for_fast', 'min_complexity_for_slow'
+)
+
 class ConnectionStatus(Enum):
     DISCONNECTED = "disconnected"
     CONNECTING = "connecting"
@@ -71,18 +98,29 @@ class PrintJob:
     timestamp: float
     retry_count: int = 0
     max_retries: int = 3
+    prepared: Optional['PreparedRaster'] = None  # Ergebnis der Render-Stufe (bleibt bei Wiederholung)
+    store_key: Optional[int] = None  # Zeile im Job-Journal (JobStore)
+
+@dataclass
+class PreparedRaster:
+    """Von der Render-Stufe vorbereiteter Job: gepacktes Raster samt Analyse"""
+    raster: bytes
+    height: int
+    stats: Optional[RasterStats] = None
+    render_s: float = 0.0
 
 @dataclass 
 class ImageProcessingResult:
     """Ergebnis der Bildverarbeitung"""
     processed_image: Image.Image
-    preview_base64: str
+    preview_id: str           # Inhalts-Hash, abrufbar über GET /api/preview/<id>.png
+    preview_png: bytes        # 1-Bit-PNG der Vorschau
     original_size: Tuple[int, int]
     processed_size: Tuple[int, int]
     info: Dict[str, Any]
 
 class EnhancedPhomemoM110:
-    def __init__(self, mac_address):
+    def __init__(self, mac_address, auto_start: bool = True):
         self.mac_address = mac_address
         self.rfcomm_device = RFCOMM_DEVICE
         self.width_pixels = PRINTER_WIDTH_PIXELS
@@ -99,8 +137,8 @@ class EnhancedPhomemoM110:
         self.settings = DEFAULT_SETTINGS.copy()
         self.load_settings()
         
-        # Label-Größe aus Settings laden
-        self.update_label_size(self.settings.get('label_size', DEFAULT_LABEL_SIZE))
+        # Label-Größe aus Settings laden (kommt aus der Datei - nicht zurückschreiben)
+        self.update_label_size(self.settings.get('label_size', DEFAULT_LABEL_SIZE), persist=False)
         
         # Connection Management
         self.connection_status = ConnectionStatus.DISCONNECTED
@@ -115,6 +153,21 @@ class EnhancedPhomemoM110:
         self.print_queue = queue.Queue()
         self.queue_processor_running = False
         self.queue_thread = None
+        # Pipeline: Render-Stufe füllt prepared_queue (begrenzt), Sende-Stufe leert sie
+        self.queue_pipeline = QUEUE_PIPELINE_ENABLED
+        self.prepared_queue = queue.Queue(maxsize=QUEUE_PREPARED_MAX)
+        self.render_thread = None
+        self.render_executor = None
+        self.pipeline_stats = {'rendered': 0, 'render_s': 0.0, 'render_wait_s': 0.0}
+        # Render-Prozesspool (nicht in dessen eigenen Worker-Prozessen)
+        self.render_pool = RenderPool(RENDER_PROCESS_WORKERS, RENDER_PROCESS_TIMEOUT) \
+            if RENDER_PROCESS_POOL_ENABLED and not in_render_worker() else None
+        # Job-Journal: wartende Jobs überstehen Neustarts (geöffnet in start_services),
+        # relative Pfade liegen neben der Einstellungsdatei
+        job_store_path = JOB_STORE_FILE if os.path.isabs(JOB_STORE_FILE) else \
+            os.path.join(os.path.dirname(os.path.abspath(CONFIG_FILE)), JOB_STORE_FILE)
+        self.job_store = JobStore(job_store_path, JOB_STORE_FLUSH_MS / 1000.0, JOB_STORE_BATCH_MAX) \
+            if JOB_STORE_ENABLED and not in_render_worker() else None
         
         # Code Generator für QR/Barcodes (falls verfügbar)
         if HAS_CODE_GENERATOR:
@@ -139,10 +192,51 @@ class EnhancedPhomemoM110:
             'text_jobs': 0
         }
         
+        # Fertig verarbeitete Bilder (Vorschau -> Druck desselben Uploads ohne Neuberechnung)
+        self.render_cache = ByteLRUCache(
+            RENDER_CACHE_MAX_BYTES,
+            lambda result: image_nbytes(result.processed_image) + len(result.preview_png),
+            name='render_cache'
+        )
+        
+        # Zwischenstufen je Upload (Regler-Änderungen ohne erneutes Dekodieren/Skalieren)
+        self.stage_cache = StagedImageCache(
+            STAGE_CACHE_MAX_SESSIONS, STAGE_CACHE_SESSION_MAX_ENTRIES, STAGE_CACHE_SESSION_MAX_BYTES
+        )
+        
+        # 1-Bit-PNG-Vorschauen nach Inhalts-Hash (GET-Endpoint mit ETag)
+        self.preview_images = ByteLRUCache(PREVIEW_STORE_MAX_BYTES, len, name='preview_images')
+        
+        # Vorschau-Tokens: Drucken des vorab verarbeiteten Rasters ohne erneuten Upload
+        self.preview_tokens = PreviewTokenStore(PREVIEW_TOKEN_TTL, PREVIEW_TOKEN_MAX)
+        
         self._lock = threading.Lock()
         # Lock for serializing writes to the rfcomm device
         self._comm_lock = threading.Lock()
-        self.start_services()
+        # Queue-Tiefe für 'outq'-Pacing (Standard: TIOCOUTQ der Sitzung, Tests: SimulatedPrinter.backlog)
+        self.output_queue_probe = None
+        # Kalibrierte Token-Bucket-Parameter je Drucker-MAC
+        self.pacing_calibration = PacingCalibrationStore(PACING_CALIBRATION_FILE)
+        # Kennzahlen des zuletzt gesendeten Write-Plans (Segmente, Pacing-Punkte)
+        self.last_write_plan = None
+        # Asyncio-Engine (ASYNC_ENGINE_ENABLED) oder eigener Sende-Thread (lazy gestartet)
+        self.async_engine = AsyncPrinterEngine() if ASYNC_ENGINE_ENABLED else None
+        self._monitor_backoff = 5
+        # Geplante vs. tatsächliche Dauer je Job
+        self.transmit_worker = TransmitWorker(TRANSMIT_THREAD_NICE, TRANSMIT_THREAD_REALTIME_PRIORITY) \
+            if TRANSMIT_THREAD_ENABLED and self.async_engine is None else None
+        self.transmit_history = deque(maxlen=TRANSMIT_HISTORY_SIZE)
+        # Eine Transport-Sitzung für Kommandos, Raster und Heartbeats (lazy geöffnet)
+        self.transport = PrinterTransport(self.rfcomm_device, mac_address, RFCOMM_CHANNEL,
+                                          use_socket=USE_SOCKET_TRANSPORT,
+                                          connect_timeout=SOCKET_CONNECT_TIMEOUT,
+                                          read_access=STATUS_READER_ENABLED)
+        # Rückkanal: Statusmeldungen des Druckers (Papier, Deckel, Überhitzung)
+        self.printer_state = PrinterState()
+        self.status_reader = StatusReader(self.transport, self.printer_state) if STATUS_READER_ENABLED else None
+        # auto_start=False: Offline-Instanz ohne Queue/Monitor (Benchmarks, Werkzeuge)
+        if auto_start:
+            self.start_services()
     
     def load_settings(self):
         """Lädt persistente Einstellungen aus Datei"""
@@ -182,6 +276,12 @@ class EnhancedPhomemoM110:
                 new_settings['dither_strength'] = max(0.1, min(2.0, float(new_settings['dither_strength'])))
             if 'contrast_boost' in new_settings:
                 new_settings['contrast_boost'] = max(0.5, min(2.0, float(new_settings['contrast_boost'])))
+            if 'pacing_mode' in new_settings and new_settings['pacing_mode'] not in PACING_MODES:
+                logger.warning(f"⚠️ Unknown pacing mode '{new_settings['pacing_mode']}', keeping {self.settings.get('pacing_mode')}")
+                del new_settings['pacing_mode']
+            if 'dither_algorithm' in new_settings and new_settings['dither_algorithm'] not in DITHER_ALGORITHMS:
+                logger.warning(f"⚠️ Unknown dither algorithm '{new_settings['dither_algorithm']}', keeping {self.settings.get('dither_algorithm')}")
+                del new_settings['dither_algorithm']
             
             self.settings.update(new_settings)
             return self.save_settings()
@@ -195,23 +295,29 @@ class EnhancedPhomemoM110:
     
     # =================== ADAPTIVE SPEED CONTROL ===================
     
-    def calculate_image_complexity(self, image_data: bytes) -> float:
+    def calculate_image_complexity(self, image_data: bytes, stats: Optional[RasterStats] = None) -> float:
         """
         Berechnet die Komplexität der Bilddaten als Prozentsatz non-zero bytes
         
         Args:
             image_data: Raw image bytes vom printer format
+            stats: Bereits berechnete RasterStats (spart die erneute Zählung)
             
         Returns:
             float: Komplexität als Dezimalzahl (0.0 = 0%, 1.0 = 100%)
         """
         try:
-            if not image_data:
+            if stats is not None:
+                total_bytes = stats.total_bytes
+                non_zero_bytes = stats.nonzero_bytes
+            elif image_data:
+                total_bytes = len(image_data)
+                non_zero_bytes = total_bytes - image_data.count(0)
+            else:
                 return 0.0
             
-            total_bytes = len(image_data)
-            zero_bytes = image_data.count(0)
-            non_zero_bytes = total_bytes - zero_bytes
+            if not total_bytes:
+                return 0.0
             
             complexity = non_zero_bytes / total_bytes
             
@@ -258,6 +364,33 @@ class EnhancedPhomemoM110:
             else:
                 return TransmissionSpeed.SLOW  # Weniger aggressiv, falls konfiguriert
     
+    def get_speed_complexity_limit(self, speed: TransmissionSpeed) -> float:
+        """
+        Obere Komplexitätsgrenze, unter der determine_transmission_speed noch `speed` wählt
+        (Budget für die Komplexitäts-Reduktion, z.B. "im FAST-Tier bleiben")
+        """
+        limits = {
+            TransmissionSpeed.ULTRA_FAST: self.settings.get('max_complexity_for_fast', 0.02),
+            TransmissionSpeed.FAST: 0.05,
+            TransmissionSpeed.NORMAL: self.settings.get('min_complexity_for_slow', 0.08),
+            TransmissionSpeed.SLOW: 0.12,
+            TransmissionSpeed.ULTRA_SLOW: 1.0
+        }
+        return limits.get(speed, 1.0)
+    
+    def get_density_budget(self) -> Tuple[str, float]:
+        """
+        Dichte-Budget aus den Settings: entweder ein Speed-Tier halten ('complexity')
+        oder eine Ziel-Bit-Dichte ('bit_density')
+        
+        Returns:
+            Tuple[str, float]: (Metrik, Zielwert)
+        """
+        target_speed = self.settings.get('auto_reduce_target_speed')
+        if target_speed:
+            return 'complexity', self.get_speed_complexity_limit(TransmissionSpeed(target_speed))
+        return 'bit_density', self.settings.get('auto_reduce_target_density', 0.10)
+    
     def get_speed_config(self, speed: TransmissionSpeed) -> Dict[str, float]:
         """
         Gibt die Timing-Konfiguration für eine bestimmte Geschwindigkeit zurück
@@ -269,6 +402,20 @@ class EnhancedPhomemoM110:
         Returns:
             dict: Timing-Konfiguration mit delays in Sekunden
         """
+        # Token-Bucket ersetzt die Tier-Tabelle: Pacing allein über die Byte-Rate
+        if self.settings.get('pacing_mode', DEFAULT_PACING_MODE) == 'bucket':
+            rate_bps, burst_bytes, source = self.get_token_bucket_params()
+            return {
+                'block_delay': 0.0,
+                'line_delay': 0.0,
+                'init_delay': 0.02,        # Reset nach ESC @
+                'header_delay': 0.0,
+                'post_delay': 0.02,
+                'rate_bps': rate_bps,
+                'burst_bytes': burst_bytes,
+                'description': f'Token Bucket {rate_bps:.0f} B/s, Burst {burst_bytes} B ({source})'
+            }
+        
         # Basis-Konfigurationen
         base_configs = {
             TransmissionSpeed.ULTRA_FAST: {
@@ -339,17 +486,18 @@ class EnhancedPhomemoM110:
         
         return config
     
-    def analyze_and_determine_speed(self, image_data: bytes) -> Tuple[TransmissionSpeed, Dict[str, float]]:
+    def analyze_and_determine_speed(self, image_data: bytes, stats: Optional[RasterStats] = None) -> Tuple[TransmissionSpeed, Dict[str, float]]:
         """
         Analysiert Bilddaten und bestimmt optimale Übertragungsgeschwindigkeit
         
         Args:
             image_data: Raw image bytes
+            stats: Optionale, bereits berechnete RasterStats des Jobs
             
         Returns:
             Tuple[TransmissionSpeed, Dict]: Speed enum und Config dict
         """
-        complexity = self.calculate_image_complexity(image_data)
+        complexity = self.calculate_image_complexity(image_data, stats)
         speed = self.determine_transmission_speed(complexity)
         config = self.get_speed_config(speed)
         
@@ -360,6 +508,58 @@ class EnhancedPhomemoM110:
         
         return speed, config
     
+    def estimate_transmission_time(self, stats: RasterStats) -> Dict[str, Any]:
+        """
+        Geplante Übertragungsdauer eines Rasters ohne Drucker
+        
+        Summiert dieselben Pausen wie _transmit_raster (Init, Header, Zeilen-
+        bzw. Block-Pacing, Abschluss) - die reine Schreibzeit auf dem Link
+        kommt noch hinzu.
+        
+        Returns:
+            dict: 'speed' (Tier-Name), 'seconds' (geplante Pausen gesamt),
+                  mit Write-Plan zusätzlich 'bytes' (Bytes auf der Leitung)
+        """
+        speed = self.determine_transmission_speed(stats.complexity)
+        timing_config = self.get_speed_config(speed)
+        
+        if WRITE_PLAN_ENABLED:
+            summary = WritePlanSummary()
+            blank_row = bytes(stats.bytes_per_line)
+            bands = plan_raster_bands(stats.height, stats.blank_runs) if BLANK_ELISION_ENABLED else None
+            for segment in iter_write_plan(itertools.repeat(blank_row, stats.height), stats.height,
+                                           stats.bytes_per_line, timing_config,
+                                           lambda line_idx, line: stats.line_popcounts[line_idx], bands=bands):
+                summary.add(segment)
+            if 'rate_bps' in timing_config:
+                # Token-Bucket: Dauer folgt aus den Bytes auf der Leitung
+                bucket = TokenBucketPacer(timing_config['rate_bps'], timing_config['burst_bytes'])
+                seconds = timing_config['init_delay'] + bucket.transfer_time(summary.bytes)
+            else:
+                seconds = summary.planned_pause
+            seconds += timing_config['post_delay']
+            return {'speed': speed.value, 'seconds': round(seconds, 3), 'bytes': summary.bytes}
+        
+        seconds = timing_config['init_delay'] + timing_config['header_delay'] + timing_config['post_delay']
+        
+        if ADAPTIVE_LINE_TIMING:
+            base_delay_s = ADAPTIVE_LINE_BASE_DELAY_MS / 1000.0
+            max_extra_s = ADAPTIVE_LINE_MAX_EXTRA_MS / 1000.0
+            bits_per_line = stats.bytes_per_line * 8
+            for bits_set in stats.line_popcounts:
+                bit_density = bits_set / bits_per_line
+                seconds += base_delay_s
+                if bit_density > ADAPTIVE_LINE_DENSITY_THRESHOLD:
+                    seconds += bit_density * max_extra_s
+        else:
+            lines_per_block = max(1, 480 // stats.bytes_per_line)
+            blocks = -(-stats.height // lines_per_block)
+            chunks = sum(-(-min(lines_per_block, stats.height - b * lines_per_block) * stats.bytes_per_line // int(CHUNK_SIZE_BYTES))
+                         for b in range(blocks))
+            seconds += max(0, blocks - 1) * timing_config['block_delay'] + chunks * float(INTER_CHUNK_SLEEP_MS) / 1000.0
+        
+        return {'speed': speed.value, 'seconds': round(seconds, 3)}
+    
     # =================== END ADAPTIVE SPEED CONTROL ===================
     
     def get_available_label_sizes(self) -> Dict[str, Any]:
@@ -377,8 +577,8 @@ class EnhancedPhomemoM110:
             **LABEL_SIZES[self.current_label_size]
         }
     
-    def update_label_size(self, label_size_key: str) -> bool:
-        """Aktualisiert die Label-Größe"""
+    def update_label_size(self, label_size_key: str, persist: bool = True) -> bool:
+        """Aktualisiert die Label-Größe (persist=False: Settings-Datei nicht schreiben)"""
         try:
             if label_size_key not in LABEL_SIZES:
                 logger.error(f"Unknown label size: {label_size_key}")
@@ -402,7 +602,8 @@ class EnhancedPhomemoM110:
             
             # Settings speichern
             self.settings['label_size'] = label_size_key
-            self.save_settings()
+            if persist:
+                self.save_settings()
             
             logger.info(f"📏 Label size updated to {label_config['name']}: {self.label_width_px}x{self.label_height_px}px")
             return True
@@ -411,18 +612,82 @@ class EnhancedPhomemoM110:
             logger.error(f"Error updating label size: {e}")
             return False
     
+    def render_snapshot(self) -> Dict[str, Any]:
+        """Render-relevanter Zustand für die Worker-Prozesse des Render-Pools"""
+        return {
+            'mac_address': self.mac_address,
+            'settings': dict(self.settings),
+            'label_size': self.current_label_size,
+        }
+    
+    def apply_render_snapshot(self, snapshot: Dict[str, Any]):
+        """Übernimmt render_snapshot() des Hauptprozesses (im Worker, ohne Settings-Datei)"""
+        self.settings = snapshot['settings']
+        if snapshot['label_size'] != self.current_label_size:
+            self.update_label_size(snapshot['label_size'], persist=False)
+    
+    def _replay_stored_jobs(self) -> int:
+        """Öffnet das Job-Journal und reiht unfertige Jobs in alter Reihenfolge wieder ein"""
+        try:
+            records = self.job_store.open()
+        except Exception as e:
+            logger.error(f"Job store unavailable, queue is not persistent: {e}")
+            self.job_store = None
+            return 0
+        for record in records:
+            job = PrintJob(
+                job_id=record['job_id'],
+                job_type=record['job_type'],
+                data=record['data'],
+                timestamp=record['created'],
+                retry_count=record['retry_count'],
+                max_retries=record['max_retries'],
+                store_key=record['seq']
+            )
+            if record['raster'] is not None:
+                # Schon gerendert - nicht neu berechnen
+                job.prepared = PreparedRaster(record['raster'], record['raster_height'])
+            self.print_queue.put(job)
+            self.stats['total_jobs'] += 1
+        if records:
+            logger.info(f"♻️ Replaying {len(records)} unfinished job(s) from {self.job_store.path}")
+        return len(records)
+    
     def start_services(self):
         """Startet Background-Services"""
         try:
-            # Queue-Processor starten
+            # Render-Worker zuerst forken - solange noch keine Hintergrund-Threads laufen
+            if self.render_pool is not None:
+                self.render_pool.start()
+            
+            # Unfertige Jobs aus dem Journal wieder einreihen
+            if self.job_store is not None:
+                self._replay_stored_jobs()
+            
+            # Queue-Processor starten (mit Pipeline: Render- und Sende-Stufe)
             self.queue_processor_running = True
+            if self.queue_pipeline:
+                # Mit Render-Pool warten die Threads nur auf die Prozesse - einer je Worker
+                render_threads = self.render_pool.workers if self.render_pool is not None else QUEUE_RENDER_WORKERS
+                self.render_executor = ThreadPoolExecutor(max_workers=render_threads,
+                                                          thread_name_prefix='phomemo-render')
+                self.render_thread = threading.Thread(target=self._render_print_queue, daemon=True)
+                self.render_thread.start()
             self.queue_thread = threading.Thread(target=self._process_print_queue, daemon=True)
             self.queue_thread.start()
             
-            # Connection Monitor starten
+            # Status-Rückkanal lesen
+            if self.status_reader is not None:
+                self.status_reader.start()
+            
+            # Connection Monitor starten (mit Asyncio-Engine als Task im Event-Loop)
             self.monitor_running = True
-            self.monitor_thread = threading.Thread(target=self._connection_monitor, daemon=True)
-            self.monitor_thread.start()
+            if self.async_engine is not None:
+                self.async_engine.every('connection_monitor', self.heartbeat_interval,
+                                        self._connection_monitor_step_async)
+            else:
+                self.monitor_thread = threading.Thread(target=self._connection_monitor, daemon=True)
+                self.monitor_thread.start()
             
             logger.info("Background services started successfully")
         except Exception as e:
@@ -435,10 +700,27 @@ class EnhancedPhomemoM110:
         
         if self.queue_thread and self.queue_thread.is_alive():
             self.queue_thread.join(timeout=5)
+        if self.render_thread and self.render_thread.is_alive():
+            self.render_thread.join(timeout=5)
+        if self.render_executor is not None:
+            self.render_executor.shutdown(wait=False, cancel_futures=True)
+            self.render_executor = None
         if self.monitor_thread and self.monitor_thread.is_alive():
             self.monitor_thread.join(timeout=5)
+        if self.transmit_worker is not None:
+            self.transmit_worker.stop()
+        if self.async_engine is not None:
+            self.async_engine.stop()
+        if self.status_reader is not None:
+            self.status_reader.stop()
+        if self.render_pool is not None:
+            self.render_pool.stop()
+        # Wartende Jobs bleiben im Journal für den nächsten Start
+        if self.job_store is not None:
+            self.job_store.close()
         
-        # rfcomm-Prozess beenden
+        # Transport-Sitzung schließen, dann rfcomm-Prozess beenden
+        self.close_transport()
         self._cleanup_rfcomm_process()
     
     def is_connected(self):
@@ -451,78 +733,119 @@ class EnhancedPhomemoM110:
     
     def manual_connect_bluetooth(self):
         """Manuelle Bluetooth-Verbindung mit der bewährten rfcomm connect Methode"""
+        if self.async_engine is not None:
+            return self.async_engine.run(self.manual_connect_async())
         try:
             with self._lock:
                 logger.info("Starting manual Bluetooth connection sequence...")
-                
-                # 1. Alte rfcomm-Verbindung beenden
-                logger.info("Step 1: Releasing old rfcomm connection...")
-                subprocess.run(['sudo', 'rfcomm', 'release', '0'], capture_output=True, timeout=10)
+                self._connect_release()
                 time.sleep(1)
-                
-                # 2. Trust setzen
-                logger.info("Step 2: Ensuring pairing and trust...")
-                trust_result = subprocess.run(
-                    ['bluetoothctl', 'trust', self.mac_address],
-                    capture_output=True, text=True, timeout=15
-                )
-                logger.info(f"Trust result: {trust_result.returncode}")
-                
-                # 3. rfcomm connect im Hintergrund starten
-                logger.info("Step 3: Starting rfcomm connect...")
-                cmd = ['sudo', 'rfcomm', 'connect', '0', self.mac_address, '1']
-                
-                # Cleanup old process
-                self._cleanup_rfcomm_process()
-                
-                # Start new process
-                self.rfcomm_process = subprocess.Popen(
-                    cmd,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    text=True
-                )
+                self._connect_start()
                 
                 # Wait and check
                 time.sleep(4)
                 
-                if self.is_connected():
-                    self.connection_status = ConnectionStatus.CONNECTED
-                    self.last_successful_connection = time.time()
-                    self.connection_attempts = 0
-                    self.stats['reconnections'] += 1
-                    
-                    # CRITICAL FIX: Set rfcomm TTY to raw mode to prevent
-                    # output post-processing (OPOST/ONLCR) which converts 0x0a
-                    # bytes in binary image data to 0x0d 0x0a, causing diagonal
-                    # drift/staircase pattern in printed images.
-                    try:
-                        import subprocess as _sp
-                        _sp.run(['stty', '-F', self.rfcomm_device, 'raw', '-echo', '-opost'],
-                                capture_output=True, timeout=5)
-                        logger.info(f"✅ TTY raw mode set on {self.rfcomm_device}")
-                    except Exception as e:
-                        logger.warning(f"⚠️ Could not set TTY raw mode: {e}")
+                if not self.is_connected():
+                    return self._connect_failed()
+                self._connect_established()
 
-                    # Test with heartbeat
-                    heartbeat_success = self._send_heartbeat()
-                    logger.info(f"Manual connection successful, heartbeat: {heartbeat_success}")
-                    return True
-                else:
-                    # Get error from process
-                    error_msg = "Device not accessible"
-                    if self.rfcomm_process and self.rfcomm_process.poll() is not None:
-                        _, stderr = self.rfcomm_process.communicate()
-                        error_msg = f"rfcomm failed: {stderr}"
-                    
-                    logger.error(f"Manual connect failed: {error_msg}")
-                    self.connection_status = ConnectionStatus.FAILED
-                    return False
+                # Test with heartbeat
+                heartbeat_success = self._send_heartbeat()
+                logger.info(f"Manual connection successful, heartbeat: {heartbeat_success}")
+                return True
                     
         except Exception as e:
             logger.error(f"Manual connect error: {e}")
             self.connection_status = ConnectionStatus.FAILED
             return False
+
+    async def manual_connect_async(self) -> bool:
+        """
+        Verbindungsaufbau im Event-Loop: Wartezeiten als Timer, rfcomm/bluetoothctl
+        im Executor - kein Thread bleibt für die 5s Wartezeit geparkt
+        """
+        engine = self.async_engine
+        try:
+            await engine.acquire(self._lock)
+            try:
+                logger.info("Starting manual Bluetooth connection sequence (async)...")
+                await engine.to_thread(self._connect_release)
+                await asyncio.sleep(1)
+                await engine.to_thread(self._connect_start)
+                await asyncio.sleep(4)
+
+                if not self.is_connected():
+                    return await engine.to_thread(self._connect_failed)
+                await engine.to_thread(self._connect_established)
+
+                heartbeat_success = await self.heartbeat_async()
+                logger.info(f"Manual connection successful, heartbeat: {heartbeat_success}")
+                return True
+            finally:
+                self._lock.release()
+        except Exception as e:
+            logger.error(f"Manual connect error: {e}")
+            self.connection_status = ConnectionStatus.FAILED
+            return False
+
+    def _connect_release(self):
+        """Schritt 1: Alte rfcomm-Verbindung beenden"""
+        logger.info("Step 1: Releasing old rfcomm connection...")
+        self.close_transport()
+        subprocess.run(['sudo', 'rfcomm', 'release', '0'], capture_output=True, timeout=10)
+
+    def _connect_start(self):
+        """Schritte 2 und 3: Trust setzen, rfcomm connect im Hintergrund starten"""
+        logger.info("Step 2: Ensuring pairing and trust...")
+        trust_result = subprocess.run(
+            ['bluetoothctl', 'trust', self.mac_address],
+            capture_output=True, text=True, timeout=15
+        )
+        logger.info(f"Trust result: {trust_result.returncode}")
+        
+        logger.info("Step 3: Starting rfcomm connect...")
+        cmd = ['sudo', 'rfcomm', 'connect', '0', self.mac_address, '1']
+        
+        # Cleanup old process
+        self._cleanup_rfcomm_process()
+        
+        # Start new process
+        self.rfcomm_process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True
+        )
+
+    def _connect_established(self):
+        """Verbindung steht: Status setzen und TTY in den Raw-Modus schalten"""
+        self.connection_status = ConnectionStatus.CONNECTED
+        self.last_successful_connection = time.time()
+        self.connection_attempts = 0
+        self.stats['reconnections'] += 1
+        
+        # CRITICAL FIX: Set rfcomm TTY to raw mode to prevent
+        # output post-processing (OPOST/ONLCR) which converts 0x0a
+        # bytes in binary image data to 0x0d 0x0a, causing diagonal
+        # drift/staircase pattern in printed images.
+        try:
+            import subprocess as _sp
+            _sp.run(['stty', '-F', self.rfcomm_device, 'raw', '-echo', '-opost'],
+                    capture_output=True, timeout=5)
+            logger.info(f"✅ TTY raw mode set on {self.rfcomm_device}")
+        except Exception as e:
+            logger.warning(f"⚠️ Could not set TTY raw mode: {e}")
+
+    def _connect_failed(self) -> bool:
+        """Verbindung nicht zustande gekommen: Fehler des rfcomm-Prozesses protokollieren"""
+        error_msg = "Device not accessible"
+        if self.rfcomm_process and self.rfcomm_process.poll() is not None:
+            _, stderr = self.rfcomm_process.communicate()
+            error_msg = f"rfcomm failed: {stderr}"
+        
+        logger.error(f"Manual connect failed: {error_msg}")
+        self.connection_status = ConnectionStatus.FAILED
+        return False
     
     def _cleanup_rfcomm_process(self):
         """Bereinigt alte rfcomm-Prozesse"""
@@ -537,31 +860,196 @@ class EnhancedPhomemoM110:
             logger.warning(f"Error cleaning up rfcomm process: {e}")
     
     def _send_heartbeat(self):
-        """Sendet einen Heartbeat-Test an den Drucker"""
+        """Sendet einen Heartbeat-Test an den Drucker (über die bestehende Sitzung)"""
         try:
+            with self._comm_lock:
+                if self.transport.is_open and not self.transport.check_health():
+                    logger.info("🔌 Stale transport session closed, reopening on heartbeat")
             return self.send_command(b'\x1b\x40')  # ESC @ Reset command
         except Exception:
             return False
 
-    def _open_rfcomm_socket(self):
-        """Öffnet ein RFCOMM Socket zum Drucker (falls konfiguriert).
+    async def heartbeat_async(self) -> bool:
+        """Heartbeat im Event-Loop (siehe _send_heartbeat)"""
+        try:
+            await self.async_engine.acquire(self._comm_lock)
+            try:
+                if self.transport.is_open and not self.transport.check_health():
+                    logger.info("🔌 Stale transport session closed, reopening on heartbeat")
+            finally:
+                self._comm_lock.release()
+            return await self.send_command_async(b'\x1b\x40')  # ESC @ Reset command
+        except Exception:
+            return False
 
-        Returns a connected socket.socket or raises.
+    def query_printer_status(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Fragt Papier, Deckel und Akku ab (Antworten kommen über den Status-Rückkanal)
+
+        Returns:
+            dict: success (mindestens eine Antwort), answers je Abfrage, Druckerzustand
         """
-        # AF_BLUETOOTH and BTPROTO_RFCOMM are Linux-specific constants
+        if self.status_reader is None:
+            return {'success': False, 'error': 'status reader disabled'}
+        timeout = STATUS_QUERY_TIMEOUT if timeout is None else timeout
         try:
-            s = socket.socket(socket.AF_BLUETOOTH, socket.SOCK_STREAM, socket.BTPROTO_RFCOMM)
-            s.settimeout(float(SOCKET_CONNECT_TIMEOUT))
-            s.connect((self.mac_address, int(RFCOMM_CHANNEL)))
-            # Set blocking mode after connect
-            s.settimeout(None)
-            return s
+            answers = {}
+            for name, (command, key) in STATUS_QUERIES.items():
+                answers[name] = self.status_reader.query(command, key, self.send_command, timeout)
+            return {
+                'success': any(value is not None for value in answers.values()),
+                'answers': answers,
+                **self.printer_state.to_dict()
+            }
         except Exception as e:
-            logger.error(f"❌ RFCOMM socket connect failed: {e}")
-            raise
+            logger.error(f"Status query error: {e}")
+            return {'success': False, 'error': str(e)}
+
+    def get_transport(self) -> PrinterTransport:
+        """
+        Liefert die offene Transport-Sitzung (öffnet sie bei Bedarf)
+
+        Aufrufer müssen _comm_lock halten.
+        """
+        # rfcomm_device kann nach __init__ umgestellt werden
+        self.transport.retarget(self.rfcomm_device)
+        return self.transport.open()
+
+    def create_pacer(self):
+        """
+        Pacer für pacing_mode 'outq' (TIOCOUTQ) bzw. 'bucket' (Token-Bucket),
+        None bei 'fixed' (feste Pausen)
+
+        Aufrufer müssen _comm_lock halten.
+        """
+        mode = self.settings.get('pacing_mode', DEFAULT_PACING_MODE)
+        queue_depth = self.output_queue_probe or self.transport.output_queue
+        if mode == 'outq':
+            return OutputQueuePacer(queue_depth, OUTQ_HIGH_WATER_BYTES, OUTQ_LOW_WATER_BYTES,
+                                    OUTQ_POLL_INTERVAL_MS / 1000.0, OUTQ_STALL_TIMEOUT)
+        if mode == 'bucket':
+            rate_bps, burst_bytes, _ = self.get_token_bucket_params()
+            return TokenBucketPacer(rate_bps, burst_bytes, queue_depth)
+        return None
+
+    def get_token_bucket_params(self) -> Tuple[float, int, str]:
+        """
+        Token-Bucket-Parameter dieses Druckers
+
+        Kalibrierte Werte (pacing_calibration.json, je MAC) oder die Standardwerte;
+        timing_multiplier verlangsamt bzw. beschleunigt die Rate.
+
+        Returns:
+            (rate_bps, burst_bytes, Quelle 'calibrated' | 'default')
+        """
+        record = self.pacing_calibration.get(self.mac_address)
+        if record:
+            rate_bps, burst_bytes, source = record['rate_bps'], record['burst_bytes'], 'calibrated'
+        else:
+            rate_bps, burst_bytes, source = BUCKET_DEFAULT_RATE_BPS, BUCKET_DEFAULT_BURST_BYTES, 'default'
+        timing_multiplier = self.settings.get('timing_multiplier', 1.0) or 1.0
+        return rate_bps / timing_multiplier, int(burst_bytes), source
+
+    def calibrate_pacing(self, device_path: Optional[str] = None, queue_probe=None, rates=None,
+                         burst_bytes: int = BUCKET_DEFAULT_BURST_BYTES, test_lines: int = 240,
+                         persist: bool = True) -> Dict[str, Any]:
+        """
+        Kalibriert das Token-Bucket-Pacing durch einen Raten-Sweep
+
+        Sendet je Rate ein Test-Raster über die Transport-Sitzung und beobachtet
+        die Queue-Tiefe. Eine Rate besteht, solange der Rückstau unter
+        PACING_CALIBRATION_MAX_BACKLOG bleibt; gemessen wird zusätzlich der
+        tatsächliche Durchsatz bis zum Leerlaufen der Queue. Ergebnis: die
+        beste bestandene Rate (bzw. deren gemessener Durchsatz, falls kleiner)
+        mit PACING_CALIBRATION_MARGIN Abschlag, gespeichert unter der MAC.
+
+        Gedacht für eine Attrappe (printer_simulator.SimulatedPrinter) oder einen
+        Drucker ohne Papier - das Test-Raster würde sonst gedruckt.
+
+        Args:
+            device_path: Gerät für den Sweep (Standard: rfcomm_device)
+            queue_probe: Queue-Abfrage (Standard: output_queue_probe bzw. TIOCOUTQ)
+
+        Returns:
+            dict: success, rate_bps, burst_bytes, measured_bps, sweep (je Rate)
+        """
+        rates = sorted(rates or PACING_CALIBRATION_RATES)
+        test_raster = bytes([0xAA, 0x55] * (self.bytes_per_line // 2)) * test_lines
+        timing_config = {'init_delay': 0.0, 'block_delay': 0.0}
+        original_device = self.rfcomm_device
+        sweep = []
+
+        try:
+            with self._comm_lock:
+                if device_path:
+                    self.rfcomm_device = device_path
+                transport = self.get_transport()
+                probe = queue_probe or self.output_queue_probe or transport.output_queue
+
+                for rate in rates:
+                    pacer = TokenBucketPacer(rate, burst_bytes, probe)
+                    start = time.monotonic()
+                    for segment in iter_write_plan(iter_raster_rows(test_raster, self.bytes_per_line), test_lines,
+                                                   self.bytes_per_line, timing_config):
+                        pacer.pace(segment.nbytes)
+                        transport.writev(segment.buffers)
+                    send_s = time.monotonic() - start
+
+                    # Bis zum Leerlaufen warten - ergibt den tatsächlichen Durchsatz
+                    drain = OutputQueuePacer(probe, 0, 0, OUTQ_POLL_INTERVAL_MS / 1000.0, OUTQ_STALL_TIMEOUT)
+                    drained = drain.wait_drained()
+                    done_s = time.monotonic() - start
+                    max_depth = max(pacer.max_depth, drain.max_depth)
+
+                    entry = {
+                        'rate_bps': rate,
+                        'send_s': round(send_s, 3),
+                        'done_s': round(done_s, 3),
+                        'measured_bps': round(pacer.bytes / done_s, 1) if done_s > 0 else None,
+                        'max_depth': max_depth,
+                        'passed': drained and max_depth <= PACING_CALIBRATION_MAX_BACKLOG,
+                    }
+                    sweep.append(entry)
+                    logger.info(f"📏 Calibration {rate} B/s: {entry['measured_bps']} B/s measured, "
+                                f"backlog {max_depth} -> {'ok' if entry['passed'] else 'overrun'}")
+                    if not entry['passed']:
+                        break
+        except Exception as e:
+            logger.error(f"Pacing calibration error: {e}")
+            return {'success': False, 'error': str(e), 'sweep': sweep}
+        finally:
+            if device_path:
+                with self._comm_lock:
+                    self.rfcomm_device = original_device
+                    self.transport.retarget(original_device)
+
+        passed = [entry for entry in sweep if entry['passed']]
+        if not passed:
+            return {'success': False, 'error': 'no rate passed', 'sweep': sweep}
+
+        best = passed[-1]
+        usable_bps = min(best['rate_bps'], best['measured_bps'] or best['rate_bps'])
+        record = {
+            'rate_bps': round(usable_bps * PACING_CALIBRATION_MARGIN, 1),
+            'burst_bytes': int(burst_bytes),
+            'measured_bps': best['measured_bps'],
+            'calibrated_at': datetime.now().isoformat(timespec='seconds'),
+            'sweep': sweep,
+        }
+        if persist:
+            self.pacing_calibration.put(self.mac_address, record)
+        logger.info(f"✅ Pacing calibrated for {self.mac_address}: {record['rate_bps']} B/s, burst {burst_bytes} B")
+        return {'success': True, **record}
+
+    def close_transport(self):
+        """Schließt die Transport-Sitzung (z.B. vor rfcomm release)"""
+        with self._comm_lock:
+            self.transport.close()
     
     def send_command(self, command_bytes):
         """Sendet Kommando an Drucker"""
+        if self.async_engine is not None:
+            return self.async_engine.run(self.send_command_async(command_bytes))
         try:
             if not self.is_connected():
                 if not self.connect_bluetooth():
@@ -569,59 +1057,59 @@ class EnhancedPhomemoM110:
 
             # Serialize access to the device to avoid concurrent writes
             with self._comm_lock:
-                # Optionally use RFCOMM socket transport
-                if USE_SOCKET_TRANSPORT:
-                    try:
-                        s = self._open_rfcomm_socket()
-                    except Exception:
-                        return False
-                    try:
-                        total = len(command_bytes)
-                        sent = 0
-                        CHUNK_SIZE = int(CHUNK_SIZE_BYTES)
-                        INTER_CHUNK_SLEEP = float(INTER_CHUNK_SLEEP_MS) / 1000.0
-                        while sent < total:
-                            chunk = command_bytes[sent:sent+CHUNK_SIZE]
-                            n = s.send(chunk)
-                            sent += n
-                            if INTER_CHUNK_SLEEP > 0:
-                                time.sleep(INTER_CHUNK_SLEEP)
-                        logger.debug(f"🔁 send_command(socket): sent {sent}/{total} bytes to {self.mac_address}:{RFCOMM_CHANNEL}")
-                        return True
-                    finally:
-                        try:
-                            s.close()
-                        except Exception:
-                            pass
-                else:
-                    with open(self.rfcomm_device, 'wb') as printer:
-                        # Robust write: ensure all bytes are written
-                        total = len(command_bytes)
-                        written = 0
-                        # Use configurable chunk size and inter-chunk sleep from config.py
-                        CHUNK_SIZE = int(CHUNK_SIZE_BYTES)
-                        INTER_CHUNK_SLEEP = float(INTER_CHUNK_SLEEP_MS) / 1000.0
-                        while written < total:
-                            chunk = command_bytes[written:written+CHUNK_SIZE]
-                            n = printer.write(chunk)
-                            # On file-like devices, write() should return number of bytes written or None
-                            if n is None:
-                                # Fallback: assume whole chunk written
-                                n = len(chunk)
-                            written += n
-                            printer.flush()
-                            # small pause between chunks to give controller time
-                            if INTER_CHUNK_SLEEP > 0:
-                                time.sleep(INTER_CHUNK_SLEEP)
-                        # small pause to allow device to process after full write
-                        time.sleep(0.01)
-                        logger.debug(f"🔁 send_command: wrote {written}/{total} bytes to {self.rfcomm_device} (chunks={CHUNK_SIZE})")
+                transport = self.get_transport()
+                pacer = self.create_pacer()
+                # Use configurable chunk size and inter-chunk sleep from config.py
+                written = transport.write_chunked(command_bytes, int(CHUNK_SIZE_BYTES),
+                                                  float(INTER_CHUNK_SLEEP_MS) / 1000.0,
+                                                  wait=pacer.pace if pacer else None)
+                if pacer is None and not USE_SOCKET_TRANSPORT:
+                    # small pause to allow device to process after full write
+                    time.sleep(0.01)
+                logger.debug(f"🔁 send_command: wrote {written}/{len(command_bytes)} bytes via {transport.get_status()['target']}")
+            return True
+        except Exception as e:
+            logger.error(f"Send command error: {e}")
+            return False
+
+    async def send_command_async(self, command_bytes) -> bool:
+        """
+        Sendet ein Kommando über die Asyncio-Engine
+
+        Chunks wie send_command; volle Puffer werden per add_writer abgewartet,
+        Pausen laufen als Timer.
+        """
+        engine = self.async_engine
+        try:
+            if not self.is_connected():
+                if not await self.manual_connect_async():
+                    return False
+
+            await engine.acquire(self._comm_lock)
+            try:
+                transport = self.get_transport()
+                pacer = self.create_pacer()
+                chunk_size = max(1, int(CHUNK_SIZE_BYTES))
+                inter_chunk_sleep = float(INTER_CHUNK_SLEEP_MS) / 1000.0
+                written = 0
+                for offset in range(0, len(command_bytes), chunk_size):
+                    chunk = command_bytes[offset:offset + chunk_size]
+                    if pacer is not None:
+                        await pacer.pace_async(len(chunk))
+                    written += await engine.write(transport, chunk)
+                    if pacer is None and inter_chunk_sleep > 0:
+                        await asyncio.sleep(inter_chunk_sleep)
+                if pacer is None and not USE_SOCKET_TRANSPORT:
+                    await asyncio.sleep(0.01)
+                logger.debug(f"🔁 send_command_async: wrote {written}/{len(command_bytes)} bytes")
+            finally:
+                self._comm_lock.release()
             return True
         except Exception as e:
             logger.error(f"Send command error: {e}")
             return False
     
-    def process_image_for_preview(self, image_data, fit_to_label=None, maintain_aspect=None, enable_dither=None, dither_threshold=None, dither_strength=None, scaling_mode='fit_aspect') -> Optional[ImageProcessingResult]:
+    def process_image_for_preview(self, image_data, fit_to_label=None, maintain_aspect=None, enable_dither=None, dither_threshold=None, dither_strength=None, scaling_mode='fit_aspect', dither_algorithm=None) -> Optional[ImageProcessingResult]:
         """Verarbeitet ein Bild für die Schwarz-Weiß-Vorschau"""
         try:
             # Parameter aus Einstellungen falls nicht übergeben
@@ -635,185 +1123,208 @@ class EnhancedPhomemoM110:
                 dither_threshold = self.settings.get('dither_threshold', DEFAULT_DITHER_THRESHOLD)
             if dither_strength is None:
                 dither_strength = self.settings.get('dither_strength', DEFAULT_DITHER_STRENGTH)
-            
-            # Bild öffnen
-            if isinstance(image_data, bytes):
-                img = Image.open(io.BytesIO(image_data))
+            if dither_algorithm is None:
+                dither_algorithm = self.settings.get('dither_algorithm', DEFAULT_DITHER_ALGORITHM)
+            
+            # Inhalts-Hash identifiziert die Upload-Sitzung für Render- und Stufen-Cache
+            upload_hash = content_hash(image_data) if isinstance(image_data, (bytes, bytearray)) else None
+            stage_session = upload_hash if STAGE_CACHE_ENABLED else None
+            
+            # Render-Cache: gleicher Upload mit gleichen Parametern -> fertiges Ergebnis
+            cache_key = None
+            if RENDER_CACHE_ENABLED and upload_hash is not None:
+                cache_key = (
+                    upload_hash, fit_to_label, maintain_aspect, scaling_mode,
+                    enable_dither, dither_threshold, dither_strength, dither_algorithm,
+                    self.current_label_size, self.label_width_px, self.label_height_px,
+                    tuple(self.settings.get(key) for key in RENDER_SETTINGS_KEYS)
+                )
+                cached = self.render_cache.get(cache_key)
+                if cached is not None:
+                    logger.info(f"♻️ Render cache hit ({cached.processed_size[0]}x{cached.processed_size[1]})")
+                    self.stats['images_processed'] += 1
+                    # PNG kann aus dem Vorschau-Speicher verdrängt sein - erneut veröffentlichen
+                    self.preview_images.put(cached.preview_id, cached.preview_png)
+                    return replace(cached, info={**cached.info, 'render_cache_hit': True})
+            
+            # Render-Prozesspool: Dekodieren bis Dithering außerhalb des GIL
+            if self.render_pool is not None:
+                try:
+                    pooled = self.render_pool.run(render_image_task, self.render_snapshot(), image_data, {
+                        'fit_to_label': fit_to_label, 'maintain_aspect': maintain_aspect,
+                        'enable_dither': enable_dither, 'dither_threshold': dither_threshold,
+                        'dither_strength': dither_strength, 'scaling_mode': scaling_mode,
+                        'dither_algorithm': dither_algorithm
+                    })
+                    if pooled is None:
+                        return None
+                    bw_img = pooled['image'].unpack()
+                    self.stats['images_processed'] += 1
+                    result = ImageProcessingResult(
+                        processed_image=bw_img,
+                        preview_id=self.publish_preview_png(pooled['preview_png']),
+                        preview_png=pooled['preview_png'],
+                        original_size=pooled['original_size'],
+                        processed_size=bw_img.size,
+                        info=pooled['info']
+                    )
+                    if cache_key is not None:
+                        self.render_cache.put(cache_key, result)
+                    return result
+                except RenderPoolUnavailable as e:
+                    logger.warning(f"⚠️ {e} - processing image locally")
+            
+            # KRITISCHER FIX: Verwende DRUCKER-Breite statt Label-Breite für Dithering-Erhaltung!
+            # Problem: Bild wird auf Label-Breite (320px) skaliert, dann in image_to_printer_format 
+            # nochmal auf Drucker-Breite (384px) gestretcht -> Dithering zerstört
+            # Lösung: Direkt auf Drucker-Breite skalieren
+            target_width = self.width_pixels  # 384px statt self.label_width_px (320px)
+            target_height = self.label_height_px
+            
+            # ============= STUFEN 1+2: DEKODIERT / SKALIERTES GRAUBILD =============
+            # Regler-Änderungen (Schwelle, Stärke, Verfahren) setzen hier auf dem gecachten
+            # 384px-Graubild auf - Dekodieren und Skalieren laufen nur bei neuer Geometrie
+            decode_params = ((target_width, target_height), scaling_mode, maintain_aspect) if fit_to_label else None
+            fit_params = (fit_to_label, decode_params)
+            fitted = self.stage_cache.get(stage_session, 'fitted', fit_params) if stage_session else None
+            resumed_stage = None
+            
+            if fitted is not None:
+                resumed_stage = 'fitted'
+                gray_img, decode_info = fitted
+                logger.info(f"♻️ Stage cache: reusing fitted {gray_img.width}x{gray_img.height} gray image")
             else:
-                img = image_data
-            
-            # In RGB konvertieren falls notwendig
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
-            
-            original_size = img.size
-            
-            # Größe anpassen basierend auf Skalierungsmodus
-            if fit_to_label:
-                # KRITISCHER FIX: Verwende DRUCKER-Breite statt Label-Breite für Dithering-Erhaltung!
-                # Problem: Bild wird auf Label-Breite (320px) skaliert, dann in image_to_printer_format 
-                # nochmal auf Drucker-Breite (384px) gestretcht -> Dithering zerstört
-                # Lösung: Direkt auf Drucker-Breite skalieren
-                target_width = self.width_pixels  # 384px statt self.label_width_px (320px)
-                target_height = self.label_height_px
-                
-                logger.info(f"🔧 DITHERING PRESERVATION: Scaling to printer width {target_width}px instead of label width {self.label_width_px}px")
-                
-                if scaling_mode == 'fit_aspect':
-                    # Original-Verhalten: Seitenverhältnis beibehalten
-                    if maintain_aspect:
-                        img.thumbnail((target_width, target_height), Image.Resampling.LANCZOS)
-                        # Zentrieren auf Label-Größe
-                        new_img = Image.new('RGB', (target_width, target_height), 'white')
-                        paste_x = (target_width - img.width) // 2
-                        paste_y = (target_height - img.height) // 2
-                        new_img.paste(img, (paste_x, paste_y))
-                        img = new_img
-                    else:
-                        # Direkt auf Label-Größe skalieren
-                        img = img.resize((target_width, target_height), Image.Resampling.LANCZOS)
-                
-                elif scaling_mode == 'stretch_full':
-                    # Volle Label-Größe (stretchen/verzerren falls nötig)
-                    img = img.resize((target_width, target_height), Image.Resampling.LANCZOS)
-                
-                elif scaling_mode == 'crop_center':
-                    # Zentriert zuschneiden für volle Label-Größe
-                    # Berechne Skalierung um kleinste Dimension zu füllen
-                    scale_w = target_width / img.width
-                    scale_h = target_height / img.height
-                    scale = max(scale_w, scale_h)  # Größere Skalierung für vollständige Abdeckung
-                    
-                    # Skalieren
-                    new_width = int(img.width * scale)
-                    new_height = int(img.height * scale)
-                    img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+                decoded = self.stage_cache.get(stage_session, 'decoded', decode_params) if stage_session else None
+                if decoded is not None:
+                    resumed_stage = 'decoded'
+                    img, decode_info = decoded
+                else:
+                    # Bild öffnen: direkt in 8-Bit-Graustufen (Alpha auf Weiß) und - bei Label-Anpassung -
+                    # schon beim Dekodieren auf die benötigte Größe verkleinert (JPEG-Draft + reduce)
+                    img, decode_info = decode_for_label(
+                        image_data,
+                        (target_width, target_height) if fit_to_label else None,
+                        scaling_mode, maintain_aspect
+                    )
+                    if stage_session:
+                        self.stage_cache.put(stage_session, 'decoded', decode_params, img, decode_info)
                     
-                    # Zentriert zuschneiden
-                    left = (new_width - target_width) // 2
-                    top = (new_height - target_height) // 2
-                    img = img.crop((left, top, left + target_width, top + target_height))
+                    if decode_info['decoded_size'] != decode_info['source_size']:
+                        logger.info(f"🗜️ Decoded {decode_info['source_size'][0]}x{decode_info['source_size'][1]} as {img.width}x{img.height} "
+                                    f"(draft 1/{decode_info['draft_scale']}, reduce {decode_info['reduce_factor']}x) "
+                                    f"in {decode_info['decode_time_ms']:.0f}ms")
                 
-                elif scaling_mode == 'pad_center':
-                    # Zentriert mit Rand für volle Label-Größe
-                    # Berechne Skalierung um größte Dimension zu füllen
-                    scale_w = target_width / img.width
-                    scale_h = target_height / img.height
-                    scale = min(scale_w, scale_h)  # Kleinere Skalierung um vollständig sichtbar zu bleiben
-                    
-                    # Skalieren
-                    new_width = int(img.width * scale)
-                    new_height = int(img.height * scale)
-                    img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+                # Größe anpassen basierend auf Skalierungsmodus
+                if fit_to_label:
+                    logger.info(f"🔧 DITHERING PRESERVATION: Scaling to printer width {target_width}px instead of label width {self.label_width_px}px")
                     
-                    # Auf Label-Größe mit Rand zentrieren
-                    new_img = Image.new('RGB', (target_width, target_height), 'white')
-                    paste_x = (target_width - new_width) // 2
-                    paste_y = (target_height - new_height) // 2
-                    new_img.paste(img, (paste_x, paste_y))
-                    img = new_img
+                    img = fit_image_to_label(img, target_width, target_height, scaling_mode, maintain_aspect)
+                
+                gray_img = img
+                if stage_session:
+                    self.stage_cache.put(stage_session, 'fitted', fit_params, gray_img, decode_info)
+            
+            original_size = decode_info['source_size']
+            
+            # Alle Tonwert-Schritte laufen über eine LUT auf dem 'L'-Bild
+            histogram = gray_img.histogram()
+            
+            # Kontrast und Dithering-Stärke wirken nur beim Dithering
+            if enable_dither:
+                contrast_boost = self.settings.get('contrast_boost', DEFAULT_CONTRAST_BOOST)
+                tone_strength = dither_strength
+            else:
+                contrast_boost = 1.0
+                tone_strength = 1.0
+            reduce_curve = self.settings.get('auto_reduce_curve', 'brightness')
+            tone_lut = image_tone_lut(histogram, reduce_curve, 1.0, contrast_boost, tone_strength)
+            budget_metric, budget_target = self.get_density_budget()
+            
+            # Dithering-Verfahren: 'auto' wählt das beste Verfahren, das das Dichte-Budget einhält
+            dither_candidates = None
+            if enable_dither and dither_algorithm == 'auto':
+                dither_algorithm, dither_candidates = select_dither_algorithm(
+                    gray_img, budget_target, budget_metric,
+                    dither_threshold=dither_threshold, lut=tone_lut
+                )
+                logger.info(f"🎛️ Auto dither: {dither_algorithm} ({budget_metric} estimates: {dither_candidates})")
+            dither_algorithm = resolve_dither_algorithm(dither_algorithm, enable_dither)
+            
+            # ============= DICHTE-SCHÄTZUNG (Probe-Dithering) =============
+            # Kleine Probe mit denselben Tonwert- und Dither-Einstellungen statt Pauschalfaktor
+            estimate = estimate_dither_density(gray_img, enable_dither, dither_threshold, tone_lut, algorithm=dither_algorithm)
+            estimated_speed = self.determine_transmission_speed(estimate.complexity)
+            logger.info(f"📊 Estimated after dithering: {estimate.bit_density*100:.1f}% bit density, "
+                        f"{estimate.complexity*100:.1f}% complexity → {estimated_speed.value}")
             
             # ============= AUTOMATISCHE KOMPLEXITÄTS-REDUKTION =============
             # WICHTIG: VOR dem Dithering, damit es wirken kann!
+            # Geprüft wird dieselbe Metrik wie das Budget (Bit-Dichte oder Komplexität des Speed-Tiers)
+            auto_reduce_info = None
             if self.settings.get('auto_reduce_complexity', True):
-                # Schätze Komplexität aus RGB-Bild
-                gray_preview = img.convert('L')
-                pixels = list(gray_preview.getdata())
-                # Schätze wie viele schwarze Pixel nach Dithering entstehen würden
-                threshold_preview = self.settings.get('dither_threshold', DEFAULT_DITHER_THRESHOLD)
-                estimated_black = sum(1 for p in pixels if p < threshold_preview)
-                estimated_complexity = estimated_black / len(pixels)
-                
-                # KRITISCH: Bei Dithering wird Komplexität DEUTLICH höher!
-                # Floyd-Steinberg kann Komplexität 2-3x erhöhen
-                if enable_dither:
-                    # Schätze Dithering-Effekt: ~2.5x mehr schwarze Pixel
-                    estimated_complexity *= 2.5
-                    logger.info(f"📊 Estimated complexity with dithering: {estimated_complexity*100:.1f}%")
-                
-                if estimated_complexity > self.settings.get('auto_reduce_threshold', 0.10):
-                    logger.warning(f"⚠️ High complexity detected (estimated): {estimated_complexity*100:.1f}%")
+                budget_estimate = getattr(estimate, budget_metric)
+                if budget_estimate > budget_target:
+                    logger.warning(f"⚠️ Density budget exceeded (estimated {budget_metric}): "
+                                   f"{budget_estimate*100:.1f}% > {budget_target*100:.1f}%")
                     logger.info(f"🔧 AUTO-REDUCING complexity BEFORE dithering...")
                     
-                    # AGGRESSIVE Helligkeit basierend auf Ziel-Komplexität
-                    # Ziel: Finale Komplexität < 25% (nach Dithering)
-                    target_complexity = 0.20  # 20% finale Ziel-Komplexität
-                    
-                    if enable_dither:
-                        # Mit Dithering: Sehr aggressiv reduzieren
-                        # Wir müssen auf ~8% VOR Dithering, um 20% NACH Dithering zu erreichen
-                        if estimated_complexity > 0.50:  # >50%: Extrem hell
-                            factor = 1.8
-                        elif estimated_complexity > 0.30:  # >30%: Sehr hell
-                            factor = 1.6
-                        elif estimated_complexity > 0.20:  # >20%: Stark hell
-                            factor = 1.4
-                        else:  # >10%: Moderat hell
-                            factor = 1.2
-                    else:
-                        # Ohne Dithering: Normale Reduktion
-                        factor = 1.4 if estimated_complexity > 0.15 else 1.2
-                    
-                    logger.info(f"   → Using: Brightness +{(factor-1)*100:.0f}% (Dithering: {enable_dither})")
-                    enhancer = ImageEnhance.Brightness(img)
-                    img = enhancer.enhance(factor)
+                    auto_reduce_info = reduce_to_density_budget(
+                        gray_img, budget_target, budget_metric,
+                        enable_dither=enable_dither,
+                        dither_threshold=dither_threshold,
+                        contrast=contrast_boost,
+                        dither_strength=tone_strength,
+                        curve=reduce_curve,
+                        max_value=self.settings.get('auto_reduce_max_value', 1.8),
+                        dither_algorithm=dither_algorithm
+                    )
                     
-                    # Neue Komplexität schätzen
-                    gray_preview = img.convert('L')
-                    pixels = list(gray_preview.getdata())
-                    new_estimated_black = sum(1 for p in pixels if p < threshold_preview)
-                    new_estimated_complexity = new_estimated_black / len(pixels)
-                    if enable_dither:
-                        new_estimated_complexity *= 2.5
+                    # Aufhellung in dieselbe LUT fusionieren und neu schätzen
+                    tone_lut = image_tone_lut(histogram, reduce_curve, auto_reduce_info['value'], contrast_boost, tone_strength)
+                    estimate = estimate_dither_density(gray_img, enable_dither, dither_threshold, tone_lut, algorithm=dither_algorithm)
+                    reduced_estimate = getattr(estimate, budget_metric)
+                    estimated_speed = self.determine_transmission_speed(estimate.complexity)
                     
-                    reduction = (estimated_complexity - new_estimated_complexity) * 100
-                    logger.info(f"✅ Estimated complexity reduced: {estimated_complexity*100:.1f}% → {new_estimated_complexity*100:.1f}% (-{reduction:.1f}%)")
+                    reduction = (budget_estimate - reduced_estimate) * 100
+                    logger.info(f"✅ Estimated {budget_metric} reduced: {budget_estimate*100:.1f}% → {reduced_estimate*100:.1f}% "
+                                f"(-{reduction:.1f}%) → {estimated_speed.value}")
             # ===============================================================
             
-            # Schwarz-Weiß konvertieren mit erweiterten Dithering-Optionen
-            if enable_dither:
-                # Kontrast-Verstärkung anwenden falls konfiguriert
-                contrast_boost = self.settings.get('contrast_boost', DEFAULT_CONTRAST_BOOST)
-                if contrast_boost != 1.0:
-                    try:
-                        enhancer = ImageEnhance.Contrast(img)
-                        img = enhancer.enhance(contrast_boost)
-                    except Exception:
-                        logger.warning("Contrast enhancement failed, using original image")
-                
-                # Floyd-Steinberg Dithering mit angepasster Stärke
-                if dither_strength != 1.0 and HAS_NUMPY:
-                    try:
-                        # Dithering-Stärke durch Gamma-Korrektur simulieren
-                        gamma = 1.0 / dither_strength
-                        img_array = np.array(img)
-                        img_array = np.power(img_array / 255.0, gamma) * 255.0
-                        img = Image.fromarray(np.uint8(img_array))
-                    except Exception:
-                        logger.warning("Advanced dithering failed, using standard dithering")
-                
-                bw_img = img.convert('1', dither=Image.Dither.FLOYDSTEINBERG)
+            # ============= STUFE 3: TONWERT =============
+            # Ein einziger Tonwert-Durchlauf (Aufhellung + Kontrast + Gamma) auf dem 'L'-Bild
+            tone_params = (fit_params, tone_lut)
+            toned = self.stage_cache.get(stage_session, 'toned', tone_params) if stage_session else None
+            if toned is not None:
+                resumed_stage = 'toned'
+                gray_img = toned[0]
+            elif tone_lut != IDENTITY_LUT:
+                gray_img = gray_img.point(tone_lut)
+                if stage_session:
+                    self.stage_cache.put(stage_session, 'toned', tone_params, gray_img)
+            
+            # ============= STUFE 4: DITHERING =============
+            # Schwarz-Weiß konvertieren mit gewählter Dithering-Engine (ohne Dithering: Threshold)
+            dither_params = (tone_params, dither_algorithm, dither_threshold)
+            dithered = self.stage_cache.get(stage_session, 'dithered', dither_params) if stage_session else None
+            if dithered is not None:
+                resumed_stage = 'dithered'
+                bw_img = dithered[0]
             else:
-                # Einfacher Threshold
-                gray_img = img.convert('L')
-                bw_img = gray_img.point(lambda x: 0 if x < dither_threshold else 255, '1')
-            
-            # Base64 für Web-Vorschau erstellen
-            preview_buffer = io.BytesIO()
-            # Für bessere Web-Darstellung in RGB konvertieren
-            preview_img = bw_img.convert('RGB')
+                bw_img = dither_image(gray_img, dither_algorithm, dither_threshold)
+                if stage_session:
+                    self.stage_cache.put(stage_session, 'dithered', dither_params, bw_img)
             
-            # Vorschau-Größe begrenzen
-            preview_img.thumbnail((PREVIEW_MAX_WIDTH, PREVIEW_MAX_HEIGHT), Image.Resampling.NEAREST)
-            preview_img.save(preview_buffer, format=PREVIEW_FORMAT)
-            preview_base64 = base64.b64encode(preview_buffer.getvalue()).decode('utf-8')
+            # 1-Bit-PNG für die Web-Vorschau (Abruf per GET /api/preview/<id>.png)
+            preview_png = encode_preview_png(bw_img, (PREVIEW_MAX_WIDTH, PREVIEW_MAX_HEIGHT))
+            preview_id = self.publish_preview_png(preview_png)
             
             # Statistik aktualisieren
             self.stats['images_processed'] += 1
             
-            return ImageProcessingResult(
+            result = ImageProcessingResult(
                 processed_image=bw_img,
-                preview_base64=preview_base64,
+                preview_id=preview_id,
+                preview_png=preview_png,
                 original_size=original_size,
                 processed_size=bw_img.size,
                 info={
@@ -827,18 +1338,52 @@ class EnhancedPhomemoM110:
                     'dither_enabled': enable_dither,
                     'dither_threshold': dither_threshold,
                     'dither_strength': dither_strength,
+                    'dither_algorithm': dither_algorithm,
+                    'dither_candidates': dither_candidates,
                     'contrast_boost': self.settings.get('contrast_boost', DEFAULT_CONTRAST_BOOST),
                     'x_offset': self.settings.get('x_offset', DEFAULT_X_OFFSET),
                     'y_offset': self.settings.get('y_offset', DEFAULT_Y_OFFSET),
                     'dithering_preservation_active': True,  # Zeigt an, dass Dithering-Erhaltung aktiviert ist
-                    'scaled_to_printer_width': True  # Bild wurde direkt auf Drucker-Breite skaliert
+                    'scaled_to_printer_width': True,  # Bild wurde direkt auf Drucker-Breite skaliert
+                    'estimated_bit_density': round(estimate.bit_density, 4),
+                    'estimated_complexity': round(estimate.complexity, 4),
+                    'estimated_transmission_speed': estimated_speed.value,
+                    'auto_reduce': auto_reduce_info,
+                    'decoded_width': decode_info['decoded_size'][0],
+                    'decoded_height': decode_info['decoded_size'][1],
+                    'decode_draft_scale': decode_info['draft_scale'],
+                    'decode_reduce_factor': decode_info['reduce_factor'],
+                    'decode_time_ms': decode_info['decode_time_ms'],
+                    'peak_rss_kb': decode_info['peak_rss_kb'],
+                    'peak_rss_growth_kb': decode_info['peak_rss_growth_kb'],
+                    'render_cache_hit': False,
+                    'stage_cache_resumed_from': resumed_stage
                 }
             )
             
+            if cache_key is not None:
+                self.render_cache.put(cache_key, result)
+            
+            return result
+            
         except Exception as e:
             logger.error(f"Image processing error: {e}")
             return None
     
+    def publish_preview_png(self, png: bytes) -> str:
+        """Legt ein Vorschau-PNG unter seinem Inhalts-Hash ab und gibt den Hash zurück"""
+        preview_id = content_hash(png)
+        self.preview_images.put(preview_id, png)
+        return preview_id
+    
+    def publish_preview_image(self, img: Image.Image, max_size: Optional[Tuple[int, int]] = None) -> str:
+        """Kodiert ein Bild als 1-Bit-PNG und veröffentlicht es (Text-/Code-Vorschauen)"""
+        return self.publish_preview_png(encode_preview_png(img, max_size))
+    
+    def get_preview_png(self, preview_id: str) -> Optional[bytes]:
+        """1-Bit-PNG einer Vorschau oder None, falls unbekannt/verdrängt"""
+        return self.preview_images.get(preview_id)
+    
     def apply_offsets_to_image(self, img: Image.Image) -> Image.Image:
         """Apply X/Y offset: shift image right/down by adding white padding"""
         try:
@@ -868,13 +1413,13 @@ class EnhancedPhomemoM110:
             logger.error(f"❌ Offset error: {e}")
             return img
     
-    def print_image_with_preview(self, image_data, fit_to_label=True, maintain_aspect=True, enable_dither=None, dither_threshold=None, dither_strength=None, scaling_mode='fit_aspect'):
+    def print_image_with_preview(self, image_data, fit_to_label=True, maintain_aspect=True, enable_dither=None, dither_threshold=None, dither_strength=None, scaling_mode='fit_aspect', dither_algorithm=None):
         """Druckt ein Bild mit den aktuellen Offset-Einstellungen"""
         try:
             logger.info("Processing image for print with offsets...")
             
             # Bild verarbeiten
-            result = self.process_image_for_preview(image_data, fit_to_label, maintain_aspect, enable_dither, dither_threshold, dither_strength, scaling_mode)
+            result = self.process_image_for_preview(image_data, fit_to_label, maintain_aspect, enable_dither, dither_threshold, dither_strength, scaling_mode, dither_algorithm)
             if not result:
                 return False
             
@@ -896,6 +1441,71 @@ class EnhancedPhomemoM110:
             logger.error(f"Print image error: {e}")
             return False
     
+    def _pack_preview_raster(self, img: Image.Image) -> Tuple[Optional[bytes], int, Tuple[int, int]]:
+        """Wendet die aktuellen Offsets an und packt das Raster (für Vorschau-Tokens)"""
+        offsets = (self.settings.get('x_offset', 0), self.settings.get('y_offset', 0))
+        printer_img = self.apply_offsets_to_image(img)
+        return self.image_to_printer_format(printer_img), printer_img.height, offsets
+    
+    def create_preview_token(self, result: ImageProcessingResult) -> Optional[Dict[str, Any]]:
+        """
+        Legt das fertige Vorschau-Ergebnis als druckbares Artefakt ab
+        
+        Returns:
+            dict: 'token' und 'expires_in' (Sekunden) oder None bei Fehler
+        """
+        try:
+            raster, height, offsets = self._pack_preview_raster(result.processed_image)
+            if raster is None:
+                return None
+            token = self.preview_tokens.create({
+                'image': result.processed_image,
+                'raster': raster,
+                'height': height,
+                'offsets': offsets,
+                'info': result.info
+            })
+            return {'token': token, 'expires_in': PREVIEW_TOKEN_TTL}
+        except Exception as e:
+            logger.error(f"❌ Preview token error: {e}")
+            return None
+    
+    def print_preview_token(self, token: str, use_queue: bool = False) -> Dict[str, Any]:
+        """
+        Druckt das Raster einer Vorschau - ohne Upload, Dekodieren oder Dithering
+        
+        Wurden die Offsets seit der Vorschau geändert, wird nur neu gepackt.
+        
+        Returns:
+            dict: 'success', bei Queue 'job_id', sonst ggf. 'error' / 'token_expired'
+        """
+        try:
+            artifact = self.preview_tokens.get(token)
+            if artifact is None:
+                return {'success': False, 'error': 'Vorschau-Token unbekannt oder abgelaufen', 'token_expired': True}
+            
+            raster, height = artifact['raster'], artifact['height']
+            current_offsets = (self.settings.get('x_offset', 0), self.settings.get('y_offset', 0))
+            if current_offsets != artifact['offsets']:
+                logger.info(f"📐 Offsets changed since preview {artifact['offsets']} -> {current_offsets}, repacking")
+                raster, height, offsets = self._pack_preview_raster(artifact['image'])
+                if raster is None:
+                    return {'success': False, 'error': 'Bildkonvertierung fehlgeschlagen'}
+                self.preview_tokens.update(token, raster=raster, height=height, offsets=offsets)
+            
+            if use_queue:
+                job_id = self.queue_print_job('raster', {'raster': raster, 'height': height, 'token': token})
+                return {'success': True, 'job_id': job_id, 'height': height}
+            
+            logger.info(f"📤 Printing preview token raster ({len(raster)} bytes, {height} lines)")
+            success = self.send_bitmap(raster, height)
+            if success:
+                self.stats['successful_jobs'] += 1
+            return {'success': success, 'height': height}
+        except Exception as e:
+            logger.error(f"❌ Print by token error: {e}")
+            return {'success': False, 'error': str(e)}
+    
     def print_text_immediate(self, text: str, font_size: int = 24, alignment: str = 'center') -> dict:
         """Druckt Text sofort (bypass Queue)"""
         try:
@@ -933,7 +1543,7 @@ class EnhancedPhomemoM110:
             return {'success': False, 'error': str(e)}
             return {'success': False, 'error': str(e)}
     
-    def print_image_immediate(self, image_data, fit_to_label=True, maintain_aspect=True, enable_dither=True, dither_threshold=None, dither_strength=None, scaling_mode='fit_aspect') -> bool:
+    def print_image_immediate(self, image_data, fit_to_label=True, maintain_aspect=True, enable_dither=True, dither_threshold=None, dither_strength=None, scaling_mode='fit_aspect', dither_algorithm=None) -> bool:
         """Druckt Bild sofort mit FUNKTIONIERENDER TEXT-STRUKTUR"""
         try:
             logger.info("🖨️ Starting immediate image print with PROVEN TEXT STRUCTURE")
@@ -947,7 +1557,8 @@ class EnhancedPhomemoM110:
                 enable_dither, 
                 dither_threshold=dither_threshold, 
                 dither_strength=dither_strength, 
-                scaling_mode=scaling_mode
+                scaling_mode=scaling_mode,
+                dither_algorithm=dither_algorithm
             )
             
             if result:
@@ -957,6 +1568,22 @@ class EnhancedPhomemoM110:
                 printer_img = self.apply_offsets_to_image(result.processed_image)
                 logger.info(f"✅ Offsets applied, final size: {printer_img.width}x{printer_img.height}")
                 
+                # Hohe Labels: bandweise packen und senden (Time-to-first-dot).
+                # Das Tempo kommt aus der Dichte-Schätzung der Vorverarbeitung - ohne
+                # Schätzung gepuffert senden, damit dichte Fotos ihr langsames Tempo behalten
+                estimated_complexity = result.info.get('estimated_complexity')
+                if (STREAM_RASTER_TRANSMISSION and printer_img.height >= STREAM_RASTER_MIN_LINES
+                        and estimated_complexity is not None):
+                    logger.info("📤 Streaming bitmap to printer...")
+                    raster_stream, height = self.image_to_raster_stream(printer_img)
+                    success = self.send_bitmap_stream(raster_stream, height, estimated_complexity)
+                    if success:
+                        logger.info("✅ Image printed successfully (streamed)!")
+                        self.stats['successful_jobs'] += 1
+                    else:
+                        logger.error("❌ Failed to stream bitmap to printer")
+                    return success
+                
                 # GENAU WIE BEI TEXT: Zu Drucker-Format konvertieren
                 logger.info("🔄 Converting image to printer format...")
                 final_image_data = self.image_to_printer_format(printer_img)
@@ -998,18 +1625,43 @@ class EnhancedPhomemoM110:
             'last_connection': self.last_successful_connection,
             'last_heartbeat': self.last_heartbeat,
             'connection_attempts': self.connection_attempts,
-            'queue_size': self.print_queue.qsize(),
-            'queue_pending': self.print_queue.qsize(),
+            'queue_size': self.pending_jobs(),
+            'queue_pending': self.pending_jobs(),
             'rfcomm_process_running': self.rfcomm_process.poll() is None if self.rfcomm_process else False,
             'settings': self.get_settings(),
-            'stats': self.stats.copy()
+            'stats': self.stats.copy(),
+            'render_cache': self.render_cache.get_stats(),
+            'stage_cache': self.stage_cache.get_stats(),
+            'preview_tokens': self.preview_tokens.get_stats(),
+            'transport': self.transport.get_status(),
+            'last_write_plan': self.last_write_plan,
+            'transmit': {
+                **(self.transmit_worker.get_status() if self.transmit_worker else {'running': False}),
+                'history': list(self.transmit_history)
+            },
+            'engine': self.async_engine.get_status() if self.async_engine else None,
+            'printer_state': {
+                **self.printer_state.to_dict(),
+                'reader': self.status_reader.get_status() if self.status_reader else {'running': False}
+            }
         }
     
     def get_queue_status(self) -> Dict[str, Any]:
         """Gibt Queue-Status zurück"""
         return {
-            'size': self.print_queue.qsize(),
+            'size': self.pending_jobs(),
             'processor_running': self.queue_processor_running,
+            'pipeline': {
+                'enabled': self.queue_pipeline,
+                'prepared': self.prepared_queue.qsize(),
+                'rendered': self.pipeline_stats['rendered'],
+                'render_s': round(self.pipeline_stats['render_s'], 3),
+                'render_wait_s': round(self.pipeline_stats['render_wait_s'], 3),
+                'render_pool': self.render_pool.get_status() if self.render_pool is not None else None,
+            },
+            'paused': self.printer_state.has_error,
+            'printer_errors': self.printer_state.errors(),
+            'store': self.job_store.get_status() if self.job_store is not None else None,
             'stats': {
                 'total_jobs': self.stats['total_jobs'],
                 'successful_jobs': self.stats['successful_jobs'],
@@ -1019,6 +1671,30 @@ class EnhancedPhomemoM110:
             }
         }
     
+    def pending_jobs(self) -> int:
+        """Wartende Jobs (Queue plus vorbereitete Jobs der Pipeline)"""
+        return self.print_queue.qsize() + self.prepared_queue.qsize()
+
+    def clear_queue(self) -> int:
+        """Verwirft alle wartenden Jobs (auch bereits vorbereitete)"""
+        cleared = 0
+        for pending in (self.print_queue, self.prepared_queue):
+            while True:
+                try:
+                    item = pending.get_nowait()
+                except queue.Empty:
+                    break
+                if pending is self.prepared_queue:
+                    item[1].cancel()
+                # Aus der Queue genommen ohne Bearbeitung (vorbereitete Jobs stammen
+                # ebenfalls aus print_queue, ihr task_done stand noch aus)
+                self.print_queue.task_done()
+                cleared += 1
+        if self.job_store is not None:
+            self.job_store.clear()
+        logger.info(f"🗑️ Queue cleared ({cleared} jobs)")
+        return cleared
+
     def queue_print_job(self, job_type: str, data: Dict[str, Any]) -> str:
         """Fügt einen Print Job zur Queue hinzu"""
         job_id = f"{job_type}_{int(time.time() * 1000)}"
@@ -1030,6 +1706,9 @@ class EnhancedPhomemoM110:
             max_retries=MAX_RETRIES_PER_JOB
         )
         
+        # Erst ins Journal (nur eingereiht, geschrieben wird gesammelt), dann in die Queue
+        if self.job_store is not None:
+            self.job_store.add(job)
         self.print_queue.put(job)
         self.stats['total_jobs'] += 1
         logger.info(f"Queued job {job_id} of type {job_type}")
@@ -1042,45 +1721,94 @@ class EnhancedPhomemoM110:
             try:
                 # Wait for a job (timeout so we can check queue_processor_running)
                 try:
-                    job = self.print_queue.get(timeout=2)
+                    if self.queue_pipeline:
+                        job, rendered = self.prepared_queue.get(timeout=2)
+                    else:
+                        job, rendered = self.print_queue.get(timeout=2), None
                 except queue.Empty:
                     continue
 
-                # Wait until printer is connected, trigger reconnect if needed
-                wait_logged = False
-                while self.queue_processor_running and not self.is_connected():
-                    if not wait_logged:
-                        logger.info(f"📋 Queue: waiting for printer connection (job {job.job_id}, queue size: {self.print_queue.qsize() + 1})")
-                        wait_logged = True
-                    # Trigger reconnect if monitor isn't already trying
-                    if self.connection_status not in (ConnectionStatus.CONNECTING, ConnectionStatus.RECONNECTING):
-                        logger.info("📋 Queue: triggering reconnect...")
-                        self.manual_connect_bluetooth()
-                    time.sleep(5)
-
-                if not self.queue_processor_running:
-                    # Put job back before exiting
-                    self.print_queue.put(job)
-                    break
+                # Wiederholungen laufen sofort auf demselben Job, bevor der nächste
+                # (ggf. schon vorbereitete) Job an die Reihe kommt - die Reihenfolge bleibt erhalten
+                stopped = False
+                try:
+                    while True:
+                        # Wait until printer is connected, trigger reconnect if needed
+                        wait_logged = False
+                        while self.queue_processor_running and not self.is_connected():
+                            if not wait_logged:
+                                logger.info(f"📋 Queue: waiting for printer connection (job {job.job_id}, queue size: {self.print_queue.qsize() + 1})")
+                                wait_logged = True
+                            # Trigger reconnect if monitor isn't already trying
+                            if self.connection_status not in (ConnectionStatus.CONNECTING, ConnectionStatus.RECONNECTING):
+                                logger.info("📋 Queue: triggering reconnect...")
+                                self.manual_connect_bluetooth()
+                            time.sleep(5)
 
-                # Execute the job
-                logger.info(f"📋 Queue: executing job {job.job_id} (type={job.job_type}, attempt={job.retry_count + 1}/{job.max_retries})")
-                success = self._execute_print_job(job)
+                        # Drucker meldet Fehler: pausieren, ohne Versuche des Jobs zu verbrauchen.
+                        # Nicht erneut bestätigte Fehler verfallen (STATUS_ERROR_STALE_AFTER)
+                        paused = False
+                        while (self.queue_processor_running and self.is_connected()
+                               and self.printer_state.has_error):
+                            if not paused:
+                                logger.warning(f"⏸️ Queue paused: printer reports {', '.join(self.printer_state.errors())} "
+                                               f"(job {job.job_id})")
+                                paused = True
+                            time.sleep(STATUS_ERROR_POLL_INTERVAL)
+                            self.query_printer_status()
+                            if self.status_reader is not None:
+                                self.status_reader.expire_errors(STATUS_ERROR_STALE_AFTER)
+
+                        if not self.queue_processor_running:
+                            # Put job back before exiting
+                            self.print_queue.put(job)
+                            stopped = True
+                            break
+                        if not self.is_connected():
+                            # Verbindung in der Pause verloren - erst neu verbinden (setzt den Status zurück)
+                            continue
+                        if paused:
+                            logger.info("▶️ Queue resumed, printer status OK")
+
+                        # Execute the job
+                        logger.info(f"📋 Queue: executing job {job.job_id} (type={job.job_type}, attempt={job.retry_count + 1}/{job.max_retries})")
+                        if rendered is not None:
+                            success = self._transmit_prepared_job(job, rendered)
+                        else:
+                            success = self._execute_print_job(job)
+
+                        if success:
+                            self.stats['successful_jobs'] += 1
+                            logger.info(f"✅ Queue: job {job.job_id} completed successfully")
+                            if self.job_store is not None:
+                                self.job_store.finish(job)
+                            break
+                        elif self.printer_state.has_error:
+                            # Fehler lag am Drucker - nach der Pause erneut, Versuch nicht zählen
+                            logger.warning(f"⏸️ Queue: job {job.job_id} interrupted by printer "
+                                           f"({', '.join(self.printer_state.errors())}), retrying without counting")
+                            if self.job_store is not None:
+                                self.job_store.update(job)
+                            continue
+
+                        job.retry_count += 1
+                        if job.retry_count < job.max_retries:
+                            logger.warning(f"⚠️ Queue: job {job.job_id} failed, retrying ({job.retry_count}/{job.max_retries})")
+                            if self.job_store is not None:
+                                self.job_store.update(job)
+                            time.sleep(2)  # Back off before retry
+                            continue
 
-                if success:
-                    self.stats['successful_jobs'] += 1
-                    logger.info(f"✅ Queue: job {job.job_id} completed successfully")
-                else:
-                    job.retry_count += 1
-                    if job.retry_count < job.max_retries:
-                        logger.warning(f"⚠️ Queue: job {job.job_id} failed, retrying ({job.retry_count}/{job.max_retries})")
-                        self.print_queue.put(job)
-                        time.sleep(2)  # Back off before retry
-                    else:
                         self.stats['failed_jobs'] += 1
                         logger.error(f"❌ Queue: job {job.job_id} failed after {job.max_retries} attempts, discarding")
-
-                self.print_queue.task_done()
+                        if self.job_store is not None:
+                            self.job_store.finish(job)
+                        break
+                finally:
+                    # Genau ein task_done je aus print_queue genommenem Job
+                    self.print_queue.task_done()
+                if stopped:
+                    break
 
             except Exception as e:
                 logger.error(f"Queue processor error: {e}")
@@ -1088,6 +1816,120 @@ class EnhancedPhomemoM110:
 
         logger.info("📋 Print Queue processor stopped")
 
+    def _render_print_queue(self):
+        """
+        Render-Stufe der Queue-Pipeline (Background Thread)
+
+        Nimmt Jobs in Reihenfolge aus print_queue, gibt das Rendern an die
+        Render-Worker und reicht (Job, Future) an prepared_queue weiter. Ist der
+        Puffer voll (QUEUE_PREPARED_MAX), wartet die Stufe - höchstens so viele
+        Jobs liegen fertig bereit, während die Sende-Stufe überträgt.
+        """
+        logger.info("🎨 Render stage started")
+        while self.queue_processor_running:
+            try:
+                job = self.print_queue.get(timeout=2)
+            except queue.Empty:
+                continue
+
+            if job.prepared is not None:
+                # Wiederholung: Raster liegt schon vor
+                rendered = Future()
+                rendered.set_result(job.prepared)
+            else:
+                rendered = self.render_executor.submit(self._render_print_job, job)
+
+            while self.queue_processor_running:
+                try:
+                    self.prepared_queue.put((job, rendered), timeout=1)
+                    break
+                except queue.Full:
+                    continue
+            else:
+                rendered.cancel()
+                self.print_queue.put(job)
+                self.print_queue.task_done()
+        logger.info("🎨 Render stage stopped")
+
+    def _render_print_job(self, job: PrintJob) -> Optional[PreparedRaster]:
+        """
+        Rendert einen Job zu einem gepackten Raster (läuft in einem Render-Worker)
+
+        Returns:
+            PreparedRaster oder None für Jobtypen ohne Render-Stufe (werden
+            in der Sende-Stufe per _execute_print_job ausgeführt)
+
+        Raises:
+            RuntimeError: Rendern fehlgeschlagen
+        """
+        start = time.perf_counter()
+        data = job.data
+        if job.job_type in ('text', 'calibration'):
+            default_text = 'Calibration Test' if job.job_type == 'calibration' else ''
+            img = self.create_text_image_with_offsets(data.get('text', default_text),
+                                                      data.get('font_size', 24), data.get('alignment', 'center'))
+        elif job.job_type == 'text_with_codes':
+            if not HAS_CODE_GENERATOR or self.code_generator is None:
+                raise RuntimeError('QR/Barcode features not available')
+            img = self.create_text_image_with_codes(data.get('text', ''), data.get('font_size', 22),
+                                                    data.get('alignment', 'center'))
+        elif job.job_type == 'image':
+            image_data = data.get('image_data')
+            if not image_data:
+                raise RuntimeError('no image data')
+            result = self.process_image_for_preview(
+                image_data,
+                data.get('fit_to_label', True),
+                data.get('maintain_aspect', True),
+                data.get('enable_dither', True),
+                dither_threshold=data.get('dither_threshold'),
+                dither_strength=data.get('dither_strength'),
+                scaling_mode=data.get('scaling_mode', 'fit_aspect'),
+                dither_algorithm=data.get('dither_algorithm')
+            )
+            img = self.apply_offsets_to_image(result.processed_image) if result else None
+        elif job.job_type == 'raster':
+            raster = data.get('raster')
+            if not raster:
+                raise RuntimeError('no raster data')
+            height = data.get('height', len(raster) // self.bytes_per_line)
+            return PreparedRaster(raster, height, compute_raster_stats(raster, self.bytes_per_line),
+                                  time.perf_counter() - start)
+        else:
+            return None
+
+        if img is None:
+            raise RuntimeError('image could not be created')
+        raster = self.image_to_printer_format(img)
+        if raster is None:
+            raise RuntimeError('conversion to printer format failed')
+        render_s = time.perf_counter() - start
+        self.pipeline_stats['rendered'] += 1
+        self.pipeline_stats['render_s'] += render_s
+        logger.info(f"🎨 Job {job.job_id} rendered in {render_s * 1000:.0f}ms ({img.height} lines)")
+        return PreparedRaster(raster, img.height, compute_raster_stats(raster, self.bytes_per_line), render_s)
+
+    def _transmit_prepared_job(self, job: PrintJob, rendered: Future) -> bool:
+        """Sende-Stufe: wartet auf das Raster des Jobs und überträgt es"""
+        wait_start = time.perf_counter()
+        try:
+            prepared = rendered.result()
+        except Exception as e:
+            logger.error(f"❌ Job {job.job_id} render error: {e}")
+            return False
+        finally:
+            self.pipeline_stats['render_wait_s'] += time.perf_counter() - wait_start
+
+        if prepared is None:
+            return self._execute_print_job(job)
+
+        # Bei Wiederholung nicht neu rendern
+        job.prepared = prepared
+        success = self.send_bitmap(prepared.raster, prepared.height, prepared.stats)
+        if success and job.job_type in ('text', 'text_with_codes'):
+            self.stats['text_jobs'] += 1
+        return success
+
     def _execute_print_job(self, job: PrintJob) -> bool:
         """Execute a single print job from the queue"""
         try:
@@ -1113,9 +1955,22 @@ class EnhancedPhomemoM110:
                     enable_dither=data.get('enable_dither', True),
                     dither_threshold=data.get('dither_threshold'),
                     dither_strength=data.get('dither_strength'),
-                    scaling_mode=data.get('scaling_mode', 'fit_aspect')
+                    scaling_mode=data.get('scaling_mode', 'fit_aspect'),
+                    dither_algorithm=data.get('dither_algorithm')
                 )
 
+            elif job.job_type == 'raster':
+                # Bereits gepacktes Raster (Vorschau-Token)
+                data = job.data
+                raster = data.get('raster')
+                if not raster:
+                    logger.error(f"❌ Job {job.job_id}: no raster data")
+                    return False
+                return self.send_bitmap(raster, data.get('height', len(raster) // self.bytes_per_line))
+
+            elif job.job_type == 'text_with_codes':
+                return self._execute_text_with_codes_job(job.data)
+
             elif job.job_type == 'calibration':
                 # Run calibration print
                 data = job.data
@@ -1144,6 +1999,12 @@ class EnhancedPhomemoM110:
                         logger.info("✅ Connection restored")
                         self.connection_status = ConnectionStatus.CONNECTED
                     reconnect_backoff = 5
+                    # Offene Sitzung prüfen - nicht blockieren, während ein Druck läuft
+                    if self.transport.is_open and self._comm_lock.acquire(blocking=False):
+                        try:
+                            self.transport.check_health()
+                        finally:
+                            self._comm_lock.release()
                     self.last_heartbeat = time.time()
                     time.sleep(self.heartbeat_interval)
                 else:
@@ -1169,6 +2030,79 @@ class EnhancedPhomemoM110:
             except Exception as e:
                 logger.error(f"Connection monitor error: {e}")
                 time.sleep(10)
+
+    async def _connection_monitor_step_async(self) -> Optional[float]:
+        """
+        Ein Durchlauf des Connection Monitors als Task der Asyncio-Engine
+
+        Returns:
+            Sekunden bis zum nächsten Durchlauf (Heartbeat-Intervall bzw. Back-off)
+        """
+        if not self.monitor_running:
+            return None
+        if self.is_connected():
+            if self.connection_status != ConnectionStatus.CONNECTED:
+                logger.info("✅ Connection restored")
+                self.connection_status = ConnectionStatus.CONNECTED
+            self._monitor_backoff = 5
+            # Offene Sitzung prüfen - nicht warten, während ein Druck läuft
+            if self.transport.is_open and self._comm_lock.acquire(blocking=False):
+                try:
+                    self.transport.check_health()
+                finally:
+                    self._comm_lock.release()
+            self.last_heartbeat = time.time()
+            return self.heartbeat_interval
+
+        if self.connection_status == ConnectionStatus.CONNECTED:
+            logger.warning("Connection lost, starting reconnect loop...")
+            self.stats['reconnections'] += 1
+        self.connection_status = ConnectionStatus.RECONNECTING
+
+        logger.info(f"🔄 Reconnect attempt (backoff: {self._monitor_backoff}s)...")
+        if await self.manual_connect_async():
+            logger.info("✅ Automatic reconnection successful")
+            self.connection_status = ConnectionStatus.CONNECTED
+            self._monitor_backoff = 5
+            return self.heartbeat_interval
+        logger.warning(f"⚠️ Reconnect failed, retrying in {self._monitor_backoff}s...")
+        delay = self._monitor_backoff
+        self._monitor_backoff = min(self._monitor_backoff * 1.5, 60)  # Max 60s backoff
+        return delay
+    
+    def _fit_to_printer_width(self, img):
+        """Bringt ein Mode-'1'-Bild auf exakt Drucker-Breite (384px)"""
+        width, height = img.size
+        
+        # *** KRITISCHE ÄNDERUNG: Direct 384px Resize ABER mit Dithering-Erhaltung ***
+        # PROBLEM: Image.NEAREST zerstört das Dithering komplett!
+        # LÖSUNG: Nur resizen wenn nötig UND mit Dithering-erhaltendem Algorithmus
+        if width != self.width_pixels:
+            logger.info(f"🔧 DITHER-SAFE RESIZE: {width}px -> {self.width_pixels}px (preserving dithering)")
+            # ANTILOPE-FIX: Image.NEAREST -> Image.Resampling.LANCZOS für Dithering-Erhaltung
+            # Aber ACHTUNG: Nur für kleine Unterschiede, sonst kann es das Dithering trotzdem beeinträchtigen
+            if abs(width - self.width_pixels) <= 10:
+                # Kleine Anpassung: Verwende besseren Algorithmus
+                img = img.resize((self.width_pixels, height), Image.Resampling.LANCZOS)
+            else:
+                # Große Änderung: Warnung, dass Dithering beeinträchtigt werden könnte
+                logger.warning(f"⚠️ Large resize {width} -> {self.width_pixels} may affect dithering quality")
+                img = img.resize((self.width_pixels, height), Image.Resampling.LANCZOS)
+        else:
+            logger.info(f"✅ Image already correct width: {width}px - preserving dithering")
+        return img
+    
+    def image_to_raster_stream(self, img) -> Tuple[Iterator[bytes], int]:
+        """
+        Streaming-Gegenstück zu image_to_printer_format
+        
+        Returns:
+            Tuple[Iterator[bytes], int]: Lazy Band-Iterator und Höhe in Zeilen
+        """
+        if img.mode != '1':
+            img = img.convert('1')
+        img = self._fit_to_printer_width(img)
+        return iter_raster_bands(img, self.bytes_per_line), img.height
     
     def image_to_printer_format(self, img):
         """
@@ -1185,65 +2119,14 @@ class EnhancedPhomemoM110:
             
             logger.info(f"🔧 ULTIMATE FIX: Converting {width}x{height} -> printer format")
             
-            # *** KRITISCHE ÄNDERUNG: Direct 384px Resize ABER mit Dithering-Erhaltung ***
-            # PROBLEM: Image.NEAREST zerstört das Dithering komplett!
-            # LÖSUNG: Nur resizen wenn nötig UND mit Dithering-erhaltendem Algorithmus
-            if width != self.width_pixels:
-                logger.info(f"🔧 DITHER-SAFE RESIZE: {width}px -> {self.width_pixels}px (preserving dithering)")
-                # ANTILOPE-FIX: Image.NEAREST -> Image.Resampling.LANCZOS für Dithering-Erhaltung
-                # Aber ACHTUNG: Nur für kleine Unterschiede, sonst kann es das Dithering trotzdem beeinträchtigen
-                if abs(width - self.width_pixels) <= 10:
-                    # Kleine Anpassung: Verwende besseren Algorithmus
-                    img = img.resize((self.width_pixels, height), Image.Resampling.LANCZOS)
-                else:
-                    # Große Änderung: Warnung, dass Dithering beeinträchtigt werden könnte
-                    logger.warning(f"⚠️ Large resize {width} -> {self.width_pixels} may affect dithering quality")
-                    img = img.resize((self.width_pixels, height), Image.Resampling.LANCZOS)
-                width = self.width_pixels
-            else:
-                logger.info(f"✅ Image already correct width: {width}px - preserving dithering")
+            img = self._fit_to_printer_width(img)
+            width = img.width
             
             # Jetzt: width == self.width_pixels (384)
-            pixels = list(img.getdata())
-            
             logger.info(f"🔧 Processing {width}x{height} (exactly {self.width_pixels} pixels per line)")
             
-            # ULTIMATIVE BYTE-KONVERTIERUNG
-            image_bytes = []
-            
-            for y in range(height):
-                # Neue Zeile: Exakt 48 Bytes
-                line_bytes = [0] * self.bytes_per_line
-                
-                # Verarbeite diese Zeile: 384 Pixel = 48 Bytes
-                for pixel_x in range(self.width_pixels):
-                    # Pixel-Index im Bild
-                    pixel_idx = y * width + pixel_x
-                    
-                    # Hole Pixel-Wert (sollte immer im gültigen Bereich sein)
-                    if pixel_idx < len(pixels):
-                        pixel_value = pixels[pixel_idx]
-                    else:
-                        pixel_value = 1  # Weiß als Fallback
-                    
-                    # Bestimme Byte- und Bit-Position
-                    byte_index = pixel_x // 8
-                    bit_index = pixel_x % 8
-                    
-                    # Setze Bit wenn Pixel schwarz ist
-                    if pixel_value == 0:  # PIL: 0 = schwarz
-                        line_bytes[byte_index] |= (1 << (7 - bit_index))
-                
-                # Validierung: Zeile muss genau 48 Bytes haben
-                if len(line_bytes) != self.bytes_per_line:
-                    logger.error(f"❌ CRITICAL: Line {y} has {len(line_bytes)} bytes, expected {self.bytes_per_line}")
-                    return None
-                
-                # Zeile zu Gesamtbild hinzufügen
-                image_bytes.extend(line_bytes)
-            
-            # Finale Daten
-            final_bytes = bytes(image_bytes)
+            # Bulk-Packing direkt aus dem Bildpuffer (numpy/PIL, Python-Fallback)
+            final_bytes = pack_image_to_raster(img, self.bytes_per_line)
             expected_size = height * self.bytes_per_line
             
             logger.info(f"✅ ULTIMATE FIX: Converted to {len(final_bytes)} bytes (expected: {expected_size})")
@@ -1267,11 +2150,12 @@ class EnhancedPhomemoM110:
             logger.error(f"❌ Full traceback: {traceback.format_exc()}")
             return None
     
-    def send_bitmap(self, image_data: bytes, height: int) -> bool:
+    def send_bitmap(self, image_data: bytes, height: int, stats: Optional[RasterStats] = None) -> bool:
         """
         Adaptive line-by-line Bitmap-Uebertragung.
         Sendet jede 48-Byte-Zeile einzeln mit adaptiver Pause basierend auf
         Bit-Dichte, um Bluetooth Buffer Overrun bei komplexen Zeilen zu verhindern.
+        Bereits vorliegende RasterStats (Render-Stufe der Queue) werden übernommen.
         """
         try:
             width_bytes = self.bytes_per_line  # Immer 48 Bytes
@@ -1284,161 +2168,442 @@ class EnhancedPhomemoM110:
                 logger.error(f"DATA SIZE ERROR: Got {len(image_data)}, expected {expected_size}")
                 return False
 
+            # Einmalige Analyse: Gesamtdichte für die Speed-Wahl, Popcounts für das Zeilen-Pacing
+            if stats is None:
+                stats = compute_raster_stats(image_data, width_bytes)
+            logger.info(f"Raster stats: {stats.bit_density*100:.1f}% bit density, "
+                        f"{stats.blank_lines}/{height} blank lines in {len(stats.blank_runs)} runs")
+
             # Adaptive Speed Analysis (for init/header/post delays)
-            speed, timing_config = self.analyze_and_determine_speed(image_data)
-            logger.info(f"Using {timing_config['description']}")
-
-            # Anti-Drift: Mindestabstand zwischen Druckvorgaengen
-            if hasattr(self, 'last_print_time'):
-                time_since_last = time.time() - self.last_print_time
-                min_delay = max(0.15, timing_config['post_delay'] * 2)
-                if time_since_last < min_delay:
-                    time.sleep(min_delay - time_since_last)
-
-            # 1. Drucker initialisieren
-            logger.info("Step 1: Initialize printer")
-            if not self.send_command(b'\x1b\x40'):  # ESC @ - Reset
-                logger.error("Failed to initialize printer")
-                return False
-            time.sleep(timing_config['init_delay'])
-
-            # 2. Raster-Bitmap-Header senden
-            logger.info("Step 2: Send bitmap header")
-            m = 0  # Normal mode
-            header = bytes([
-                0x1D, 0x76, 0x30, m,
-                width_bytes & 0xFF, (width_bytes >> 8) & 0xFF,
-                height & 0xFF, (height >> 8) & 0xFF
-            ])
-
-            if not self.send_command(header):
-                logger.error("Failed to send bitmap header")
-                return False
-            time.sleep(timing_config['header_delay'])
+            speed, timing_config = self.analyze_and_determine_speed(image_data, stats)
 
-            # 3. Adaptive line-by-line image transmission
-            logger.info(f"Step 3: Image transmission ({speed.value})")
+            return self._transmit_raster(iter_raster_rows(image_data, width_bytes), height, speed, timing_config, stats)
 
-            use_line_timing = ADAPTIVE_LINE_TIMING
-            base_delay_s = ADAPTIVE_LINE_BASE_DELAY_MS / 1000.0
-            max_extra_s = ADAPTIVE_LINE_MAX_EXTRA_MS / 1000.0
-            density_threshold = ADAPTIVE_LINE_DENSITY_THRESHOLD
-            total_bits_per_line = width_bytes * 8
+        except Exception as e:
+            logger.error(f"Adaptive bitmap transmission error: {e}")
+            import traceback
+            logger.error(f"Full traceback: {traceback.format_exc()}")
+            return False
 
-            success = True
+    def send_bitmap_stream(self, raster_source: Iterable[bytes], height: int, complexity: Optional[float] = None) -> bool:
+        """
+        Streaming-Variante von send_bitmap.
+        Konsumiert Rasterbänder (z.B. aus iter_raster_bands) lazy, sodass die
+        erste Zeile gesendet wird, während spätere Zeilen noch gepackt werden.
 
-            if use_line_timing:
-                logger.info(f"ADAPTIVE LINE-BY-LINE TRANSFER: {height} lines, "
-                            f"base_delay={ADAPTIVE_LINE_BASE_DELAY_MS}ms, "
-                            f"max_extra={ADAPTIVE_LINE_MAX_EXTRA_MS}ms, "
-                            f"threshold={density_threshold}")
+        Args:
+            raster_source: Iterable von Bändern mit ganzen 48-Byte-Zeilen
+            height: Gesamthöhe in Zeilen (wird im GS v 0 Header angekündigt)
+            complexity: Optionaler Komplexitäts-Hinweis; ohne Hinweis wird das
+                        NORMAL-Timing verwendet, da die Daten noch nicht vorliegen
+        """
+        try:
+            logger.info(f"STREAMING BITMAP TRANSMISSION: {height} lines")
 
-                complex_lines = 0
-                with self._comm_lock:
-                    try:
-                        with open(self.rfcomm_device, 'wb') as printer_fd:
-                            for line_idx in range(height):
-                                offset = line_idx * width_bytes
-                                line = image_data[offset:offset + width_bytes]
-
-                                # Write the 48-byte line
-                                written = 0
-                                total = len(line)
-                                try_count = 0
-                                ok = False
-                                while try_count < int(BLOCK_WRITE_RETRIES) and not ok:
-                                    try:
-                                        while written < total:
-                                            n = printer_fd.write(line[written:])
-                                            if n is None:
-                                                n = total - written
-                                            written += n
-                                        printer_fd.flush()
-                                        ok = True
-                                    except Exception as e:
-                                        logger.warning(f"Write error on line {line_idx}: {e}")
-                                        try_count += 1
-                                        written = 0
-                                        time.sleep(0.02)
-
-                                if not ok:
-                                    logger.error(f"Line {line_idx} failed after retries")
-                                    success = False
-                                    break
+            if complexity is not None:
+                speed = self.determine_transmission_speed(complexity)
+            else:
+                speed = TransmissionSpeed.NORMAL
+            timing_config = self.get_speed_config(speed)
 
-                                # Adaptive delay based on line bit density
-                                bits_set = bin(int.from_bytes(line, 'big')).count('1')
-                                bit_density = bits_set / total_bits_per_line
+            rows = iter_raster_rows(raster_source, self.bytes_per_line)
+            return self._transmit_raster(rows, height, speed, timing_config)
 
-                                if bit_density > density_threshold:
-                                    extra_delay = bit_density * max_extra_s
-                                    complex_lines += 1
-                                else:
-                                    extra_delay = 0.0
+        except Exception as e:
+            logger.error(f"Streaming bitmap transmission error: {e}")
+            import traceback
+            logger.error(f"Full traceback: {traceback.format_exc()}")
+            return False
+
+    def _transmit_raster(self, rows: Iterator[bytes], height: int, speed: TransmissionSpeed, timing_config: Dict[str, Any], stats: Optional[RasterStats] = None) -> bool:
+        """
+        Gemeinsamer Übertragungsweg für send_bitmap und send_bitmap_stream.
+        Sendet Init, GS v 0 Header und anschließend die Zeilen aus dem Iterator
+        (per Write-Plan oder auf dem bisherigen Weg, siehe WRITE_PLAN_ENABLED).
+        Liegen RasterStats vor, kommt die Zeilen-Dichte aus deren Popcounts.
+        
+        Läuft im Sende-Thread (TRANSMIT_THREAD_ENABLED) bzw. im Event-Loop der
+        Asyncio-Engine (ASYNC_ENGINE_ENABLED); alle Pausen laufen über eine
+        DeadlineClock, geplante und tatsächliche Dauer landen in transmit_history.
+        """
+        if self.async_engine is not None and WRITE_PLAN_ENABLED:
+            return self.async_engine.run(self.transmit_raster_async(rows, height, speed, timing_config, stats))
+        if self.transmit_worker is not None and not self.transmit_worker.in_worker_thread():
+            return self.transmit_worker.run(self._transmit_raster, rows, height, speed, timing_config, stats)
+        
+        logger.info(f"Using {timing_config['description']}")
 
-                                time.sleep(base_delay_s + extra_delay)
+        # Anti-Drift: Mindestabstand zwischen Druckvorgaengen
+        delay = self._anti_drift_delay(timing_config)
+        if delay > 0:
+            time.sleep(delay)
 
-                                if line_idx > 0 and line_idx % 50 == 0:
-                                    logger.debug(f"Line {line_idx}/{height} sent")
+        clock = DeadlineClock()
+        if WRITE_PLAN_ENABLED:
+            success, lines_sent = self._transmit_write_plan(rows, height, timing_config, stats, clock)
+        else:
+            success, lines_sent = self._transmit_raster_legacy(rows, height, speed, timing_config, stats, clock)
 
-                        logger.info(f"Line transfer done: {height} lines, {complex_lines} complex "
-                                    f"(>{density_threshold*100:.0f}% density)")
-                    except Exception as e:
-                        logger.error(f"Error opening/writing device: {e}")
-                        success = False
-            else:
-                # Fallback: old block transfer
-                logger.info("BLOCK TRANSFER (adaptive line timing disabled)")
-                BLOCK_SIZE = 480
-                lines_per_block = BLOCK_SIZE // width_bytes
-                actual_block_size = lines_per_block * width_bytes
+        # 4. Adaptive Abschluss
+        clock.wait(timing_config['post_delay'])
+        return self._finish_transmission(clock, success, lines_sent, height, speed)
 
-                with self._comm_lock:
+    async def transmit_raster_async(self, rows: Iterator[bytes], height: int, speed: TransmissionSpeed,
+                                    timing_config: Dict[str, Any], stats: Optional[RasterStats] = None) -> bool:
+        """Wie _transmit_raster (Write-Plan), als Coroutine der Asyncio-Engine"""
+        logger.info(f"Using {timing_config['description']} (async)")
+        delay = self._anti_drift_delay(timing_config)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        clock = DeadlineClock()
+        success, lines_sent = await self._transmit_write_plan_async(rows, height, timing_config, stats, clock)
+        await clock.wait_async(timing_config['post_delay'])
+        return self._finish_transmission(clock, success, lines_sent, height, speed)
+
+    def _anti_drift_delay(self, timing_config: Dict[str, Any]) -> float:
+        """Restzeit bis zum Mindestabstand zwischen zwei Druckvorgängen"""
+        if not hasattr(self, 'last_print_time'):
+            return 0.0
+        time_since_last = time.time() - self.last_print_time
+        min_delay = max(0.15, timing_config['post_delay'] * 2)
+        return max(0.0, min_delay - time_since_last)
+
+    def _finish_transmission(self, clock: DeadlineClock, success: bool, lines_sent: int, height: int,
+                             speed: TransmissionSpeed) -> bool:
+        """Abschluss eines Rasterjobs: Zeilenzahl prüfen, transmit_history und Log"""
+        if success and lines_sent != height:
+            # Header hat `height` Zeilen angekündigt - der Drucker wartet sonst ewig
+            logger.error(f"Raster source ended after {lines_sent}/{height} lines")
+            success = False
+
+        self.last_print_time = time.time()
+
+        timing = clock.finish()
+        self.transmit_history.append({
+            'finished': datetime.now().isoformat(timespec='seconds'),
+            'lines': lines_sent,
+            'speed': speed.value,
+            'success': success,
+            **timing,
+        })
+        logger.info(f"⏱️ Transmission {timing['actual_s']:.3f}s (planned {timing['planned_s']:.3f}s, "
+                    f"drift {timing['drift_ms']:+.1f}ms)")
+
+        if success:
+            logger.info(f"ADAPTIVE BITMAP SENT SUCCESSFULLY using {speed.value}")
+        else:
+            logger.error("ADAPTIVE BITMAP TRANSMISSION FAILED")
+
+        return success
+
+    def _prepare_write_plan(self, height: int, stats: Optional[RasterStats]):
+        """Band-Folge und Popcount-Quelle für einen Write-Plan"""
+        popcount = None
+        bands = [('print', 0, height)]
+        if stats is not None:
+            popcount = lambda line_idx, line: stats.line_popcounts[line_idx]
+            if BLANK_ELISION_ENABLED:
+                bands = plan_raster_bands(height, stats.blank_runs)
+        bands = split_bands(bands, TRANSMIT_BAND_LINES)
+        tracker = BandTracker(bands, TRANSMIT_BAND_RETRIES, TRANSMIT_BAND_BACKOFF_MS / 1000.0)
+        return bands, popcount, tracker
+
+    def _record_write_plan(self, summary: WritePlanSummary, bands, tracker: BandTracker, pacer):
+        """Kennzahlen des gesendeten Plans nach last_write_plan"""
+        self.last_write_plan = summary.to_dict()
+        self.last_write_plan['bands'] = sum(1 for kind, _, _ in bands if kind == 'print')
+        self.last_write_plan['elided_lines'] = sum(n for kind, _, n in bands if kind == 'feed')
+        self.last_write_plan['band_retries'] = tracker.total_retries
+        self.last_write_plan['band_timings'] = tracker.timings
+        self.last_write_plan['pacing_mode'] = self.settings.get('pacing_mode', DEFAULT_PACING_MODE) if pacer else 'fixed'
+        if pacer is not None:
+            self.last_write_plan['flow_control'] = pacer.get_stats()
+        logger.info(f"Write plan done: {summary.lines} lines in {summary.segments} segments, "
+                    f"{summary.planned_pause * 1000:.0f}ms pacing {summary.pacing_points}")
+
+    def _transmit_write_plan(self, rows: Iterator[bytes], height: int, timing_config: Dict[str, Any],
+                             stats: Optional[RasterStats] = None,
+                             clock: Optional[DeadlineClock] = None) -> Tuple[bool, int]:
+        """
+        Sendet Init, Header und Raster nach Write-Plan (siehe write_plan.py)
+
+        Jedes Segment ist ein writev auf der Transport-Sitzung, geschlafen wird
+        nur an den Pacing-Punkten des Plans. Mit RasterStats werden Leerzeilen-
+        Runs per ESC J übersprungen (BLANK_ELISION_ENABLED).
+
+        Das Raster geht als Folge eigenständiger Bänder (TRANSMIT_BAND_LINES)
+        hinaus. Schlägt ein Write fehl, wird nach Back-off und Neuöffnen nur das
+        laufende Band komplett wiederholt; Dauer und Versuche je Band landen in
+        last_write_plan['band_timings'].
+
+        Returns:
+            (success, lines_sent)
+        """
+        if not self.is_connected():
+            if not self.connect_bluetooth():
+                return False, 0
+
+        bands, popcount, tracker = self._prepare_write_plan(height, stats)
+        clock = clock or DeadlineClock()
+        rows = iter(rows)
+        summary = WritePlanSummary()
+        success = True
+        pacer = None
+
+        with self._comm_lock:
+            try:
+                transport = self.get_transport()
+                pacer = self.create_pacer()
+                plan = iter_write_plan(itertools.islice(rows, height), height, self.bytes_per_line,
+                                       timing_config, popcount, bands=bands)
+                for segment in plan:
+                    pending = tracker.begin(segment)
+                    while True:
+                        try:
+                            for seg in pending:
+                                if pacer is not None:
+                                    pacer.pace(seg.nbytes)
+                                transport.writev(seg.buffers, reopen=False)
+                            break
+                        except OSError as e:
+                            backoff = tracker.retry(e)
+                            if backoff is None:
+                                raise
+                            time.sleep(backoff)
+                            transport.reopen()
+                            # Das ganze Band erneut senden - der Drucker hat den Rest verworfen
+                            pending = list(tracker.segments)
+
+                    summary.add(segment)
+                    # Mit Pacer bleibt nur die Reset-Pause nach ESC @
+                    if segment.pause > 0 and (pacer is None or segment.reason == 'init'):
+                        clock.wait(segment.pause)
+            except Exception as e:
+                logger.error(f"Write plan transmission error after {summary.lines} lines: {e}")
+                success = False
+            tracker.close()
+
+        if success and next(rows, None) is not None:
+            logger.error(f"Raster source yields more than {height} lines")
+            success = False
+
+        self._record_write_plan(summary, bands, tracker, pacer)
+        return success, summary.lines
+
+    async def _transmit_write_plan_async(self, rows: Iterator[bytes], height: int, timing_config: Dict[str, Any],
+                                         stats: Optional[RasterStats] = None,
+                                         clock: Optional[DeadlineClock] = None) -> Tuple[bool, int]:
+        """
+        Write-Plan über die Asyncio-Engine (siehe _transmit_write_plan)
+
+        Segmente gehen als nicht-blockierende writev hinaus (add_writer bei vollem
+        Puffer); Pacing-Punkte, Pacer-Wartezeiten und Band-Back-off sind Timer.
+        """
+        engine = self.async_engine
+        if not self.is_connected():
+            if not await self.manual_connect_async():
+                return False, 0
+
+        bands, popcount, tracker = self._prepare_write_plan(height, stats)
+        clock = clock or DeadlineClock()
+        rows = iter(rows)
+        summary = WritePlanSummary()
+        success = True
+        pacer = None
+
+        await engine.acquire(self._comm_lock)
+        try:
+            transport = self.get_transport()
+            pacer = self.create_pacer()
+            plan = iter_write_plan(itertools.islice(rows, height), height, self.bytes_per_line,
+                                   timing_config, popcount, bands=bands)
+            for segment in plan:
+                pending = tracker.begin(segment)
+                while True:
                     try:
-                        with open(self.rfcomm_device, 'wb') as printer_fd:
-                            for i in range(0, len(image_data), actual_block_size):
-                                block_num = i // actual_block_size + 1
-                                block = image_data[i:i + actual_block_size]
-                                written = 0
-                                total = len(block)
-                                CHUNK_SIZE = int(CHUNK_SIZE_BYTES)
-                                INTER_CHUNK_SLEEP = float(INTER_CHUNK_SLEEP_MS) / 1000.0
-                                try:
-                                    while written < total:
-                                        chunk = block[written:written+CHUNK_SIZE]
-                                        n = printer_fd.write(chunk)
-                                        if n is None:
-                                            n = len(chunk)
-                                        written += n
-                                        printer_fd.flush()
-                                        if INTER_CHUNK_SLEEP > 0:
-                                            time.sleep(INTER_CHUNK_SLEEP)
-                                except Exception as e:
-                                    logger.error(f"Block {block_num} write error: {e}")
-                                    success = False
+                        for seg in pending:
+                            if pacer is not None:
+                                await pacer.pace_async(seg.nbytes)
+                            await engine.writev(transport, seg.buffers)
+                        break
+                    except OSError as e:
+                        backoff = tracker.retry(e)
+                        if backoff is None:
+                            raise
+                        await asyncio.sleep(backoff)
+                        transport.reopen()
+                        # Das ganze Band erneut senden - der Drucker hat den Rest verworfen
+                        pending = list(tracker.segments)
+
+                summary.add(segment)
+                # Mit Pacer bleibt nur die Reset-Pause nach ESC @
+                if segment.pause > 0 and (pacer is None or segment.reason == 'init'):
+                    await clock.wait_async(segment.pause)
+        except Exception as e:
+            logger.error(f"Write plan transmission error after {summary.lines} lines: {e}")
+            success = False
+        finally:
+            tracker.close()
+            self._comm_lock.release()
+
+        if success and next(rows, None) is not None:
+            logger.error(f"Raster source yields more than {height} lines")
+            success = False
+
+        self._record_write_plan(summary, bands, tracker, pacer)
+        return success, summary.lines
+
+    def _transmit_raster_legacy(self, rows: Iterator[bytes], height: int, speed: TransmissionSpeed,
+                                timing_config: Dict[str, Any], stats: Optional[RasterStats] = None,
+                                clock: Optional[DeadlineClock] = None) -> Tuple[bool, int]:
+        """
+        Bisheriger Weg ohne Write-Plan: ESC @ und Header per send_command mit
+        festen Pausen, danach Zeilen- bzw. Block-Übertragung
+
+        Returns:
+            (success, lines_sent)
+        """
+        width_bytes = self.bytes_per_line
+        clock = clock or DeadlineClock()
+
+        # 1. Drucker initialisieren
+        logger.info("Step 1: Initialize printer")
+        if not self.send_command(b'\x1b\x40'):  # ESC @ - Reset
+            logger.error("Failed to initialize printer")
+            return False, 0
+        clock.wait(timing_config['init_delay'])
+
+        # 2. Raster-Bitmap-Header senden
+        logger.info("Step 2: Send bitmap header")
+        m = 0  # Normal mode
+        header = bytes([
+            0x1D, 0x76, 0x30, m,
+            width_bytes & 0xFF, (width_bytes >> 8) & 0xFF,
+            height & 0xFF, (height >> 8) & 0xFF
+        ])
+
+        if not self.send_command(header):
+            logger.error("Failed to send bitmap header")
+            return False, 0
+        clock.wait(timing_config['header_delay'])
+
+        # 3. Adaptive line-by-line image transmission
+        logger.info(f"Step 3: Image transmission ({speed.value})")
+
+        use_line_timing = ADAPTIVE_LINE_TIMING
+        base_delay_s = ADAPTIVE_LINE_BASE_DELAY_MS / 1000.0
+        max_extra_s = ADAPTIVE_LINE_MAX_EXTRA_MS / 1000.0
+        density_threshold = ADAPTIVE_LINE_DENSITY_THRESHOLD
+        total_bits_per_line = width_bytes * 8
+
+        success = True
+        lines_sent = 0
+
+        if use_line_timing:
+            logger.info(f"ADAPTIVE LINE-BY-LINE TRANSFER: {height} lines, "
+                        f"base_delay={ADAPTIVE_LINE_BASE_DELAY_MS}ms, "
+                        f"max_extra={ADAPTIVE_LINE_MAX_EXTRA_MS}ms, "
+                        f"threshold={density_threshold}")
+
+            complex_lines = 0
+            with self._comm_lock:
+                try:
+                    transport = self.get_transport()
+                    for line_idx, line in enumerate(rows):
+                        if line_idx >= height:
+                            logger.error(f"Raster source yields more than {height} lines")
+                            success = False
+                            break
+
+                        # Write the 48-byte line
+                        try_count = 0
+                        ok = False
+                        while try_count < int(BLOCK_WRITE_RETRIES) and not ok:
+                            try:
+                                # Kein automatisches Neuöffnen: der GS v 0 Header lief über den alten Kanal
+                                transport.write(line, reopen=False)
+                                ok = True
+                            except Exception as e:
+                                logger.warning(f"Write error on line {line_idx}: {e}")
+                                if not transport.is_open:
+                                    # Kanal abgerissen - Rest des Rasters wäre ohne Header, Job scheitert
                                     break
-                                if i + actual_block_size < len(image_data):
-                                    time.sleep(timing_config['block_delay'])
-                    except Exception as e:
-                        logger.error(f"Error opening/writing device: {e}")
-                        success = False
+                                try_count += 1
+                                time.sleep(0.02)
 
-            # 4. Adaptive Abschluss
-            time.sleep(timing_config['post_delay'])
-            self.last_print_time = time.time()
+                        if not ok:
+                            logger.error(f"Line {line_idx} failed after retries")
+                            success = False
+                            break
+                        lines_sent += 1
 
-            if success:
-                logger.info(f"ADAPTIVE BITMAP SENT SUCCESSFULLY using {speed.value}")
-            else:
-                logger.error("ADAPTIVE BITMAP TRANSMISSION FAILED")
+                        # Adaptive delay based on line bit density
+                        if stats is not None:
+                            bits_set = stats.line_popcounts[line_idx]
+                        else:
+                            bits_set = line_popcount(line)
+                        bit_density = bits_set / total_bits_per_line
 
-            return success
+                        if bit_density > density_threshold:
+                            extra_delay = bit_density * max_extra_s
+                            complex_lines += 1
+                        else:
+                            extra_delay = 0.0
 
-        except Exception as e:
-            logger.error(f"Adaptive bitmap transmission error: {e}")
-            import traceback
-            logger.error(f"Full traceback: {traceback.format_exc()}")
-            return False
+                        clock.wait(base_delay_s + extra_delay)
+
+                        if line_idx > 0 and line_idx % 50 == 0:
+                            logger.debug(f"Line {line_idx}/{height} sent")
+
+                    logger.info(f"Line transfer done: {lines_sent} lines, {complex_lines} complex "
+                                f"(>{density_threshold*100:.0f}% density)")
+                except Exception as e:
+                    logger.error(f"Error opening/writing device: {e}")
+                    success = False
+        else:
+            # Fallback: old block transfer
+            logger.info("BLOCK TRANSFER (adaptive line timing disabled)")
+            BLOCK_SIZE = 480
+            lines_per_block = BLOCK_SIZE // width_bytes
+
+            with self._comm_lock:
+                try:
+                    transport = self.get_transport()
+                    block_num = 0
+                    block_lines = []
+                    for line in itertools.chain(rows, [None]):
+                        if line is not None:
+                            if lines_sent + len(block_lines) >= height:
+                                logger.error(f"Raster source yields more than {height} lines")
+                                success = False
+                                break
+                            block_lines.append(line)
+                            if len(block_lines) < lines_per_block:
+                                continue
+                        if not block_lines:
+                            break
+
+                        # Pause zwischen Blöcken (nicht vor dem ersten)
+                        if block_num > 0:
+                            clock.wait(timing_config['block_delay'])
+                        block_num += 1
+                        block = b''.join(block_lines)
+                        CHUNK_SIZE = int(CHUNK_SIZE_BYTES)
+                        INTER_CHUNK_SLEEP = float(INTER_CHUNK_SLEEP_MS) / 1000.0
+                        try:
+                            transport.write_chunked(block, CHUNK_SIZE, INTER_CHUNK_SLEEP, reopen=False)
+                        except Exception as e:
+                            logger.error(f"Block {block_num} write error: {e}")
+                            success = False
+                            break
+                        lines_sent += len(block_lines)
+                        block_lines = []
+                except Exception as e:
+                    logger.error(f"Error opening/writing device: {e}")
+                    success = False
+
+        return success, lines_sent
 
     def create_text_image_with_offsets(self, text, font_size, alignment='center'):
         """Erstellt Text-Bild mit Offsets und Ausrichtung - MIT MARKDOWN SUPPORT"""
@@ -1524,7 +2689,7 @@ class EnhancedPhomemoM110:
             logger.info(f"📄 Processing {len(lines)} lines: {[line[:20] + '...' if len(line) > 20 else line for line in lines[:3]]}")
             
             # Bildgröße berechnen
-            temp_img = Image.new('RGB', (1, 1), 'white')
+            temp_img = Image.new('L', (1, 1), 'white')
             temp_draw = ImageDraw.Draw(temp_img)
             
             line_heights = []
@@ -1547,7 +2712,7 @@ class EnhancedPhomemoM110:
             total_height = max(total_height, 50)  # Mindesthöhe
             
             logger.info(f"📐 Base image size: {self.label_width_px}x{total_height}")
-            img = Image.new('RGB', (self.label_width_px, total_height), 'white')
+            img = Image.new('L', (self.label_width_px, total_height), 'white')
             draw = ImageDraw.Draw(img)
             
             # Text zeichnen mit Ausrichtung
@@ -1704,6 +2869,14 @@ class EnhancedPhomemoM110:
     def create_text_image_preview(self, text, font_size, alignment='center'):
         """Erstellt Text-Bild für Vorschau OHNE Offsets - mit Markdown-Support"""
         try:
+            # Render-Prozesspool: Text-Rasterung außerhalb des GIL
+            if self.render_pool is not None:
+                try:
+                    packed = self.render_pool.run(render_text_task, self.render_snapshot(), text, font_size, alignment)
+                    return packed.unpack() if packed is not None else None
+                except RenderPoolUnavailable as e:
+                    logger.warning(f"⚠️ {e} - rendering text locally")
+            
             import os
             from PIL import Image, ImageDraw, ImageFont
             
@@ -1744,7 +2917,7 @@ class EnhancedPhomemoM110:
                 return font_cache[key]
             
             # Bildgröße berechnen
-            temp_img = Image.new('RGB', (1, 1), 'white')
+            temp_img = Image.new('L', (1, 1), 'white')
             temp_draw = ImageDraw.Draw(temp_img)
             
             line_heights = []
@@ -1775,7 +2948,7 @@ class EnhancedPhomemoM110:
             total_height = max(total_height, 50)
             
             logger.info(f"📐 Markdown preview image size: {self.label_width_px}x{total_height}")
-            img = Image.new('RGB', (self.label_width_px, total_height), 'white')
+            img = Image.new('L', (self.label_width_px, total_height), 'white')
             draw = ImageDraw.Draw(img)
             
             # Markdown-Text mit Formatierung zeichnen
@@ -1904,6 +3077,16 @@ class EnhancedPhomemoM110:
             logger.error(f"❌ Full traceback: {traceback.format_exc()}")
             return False
 
+    def _create_combined_image(self, text: str, font_size: int, alignment: str) -> Optional[Image.Image]:
+        """CodeGenerator.create_combined_image - mit Render-Pool in einem Worker-Prozess"""
+        if self.render_pool is not None:
+            try:
+                packed = self.render_pool.run(render_codes_task, self.render_snapshot(), text, font_size, alignment)
+                return packed.unpack() if packed is not None else None
+            except RenderPoolUnavailable as e:
+                logger.warning(f"⚠️ {e} - rendering codes locally")
+        return self.code_generator.create_combined_image(text, font_size, alignment)
+
     def create_text_image_with_codes(self, text: str, font_size: int = 22, alignment: str = 'center') -> Optional[Image.Image]:
         """Erstellt Text-Bild mit QR/Barcode-Unterstützung"""
         try:
@@ -1914,7 +3097,7 @@ class EnhancedPhomemoM110:
             logger.info(f"📝 Creating text image with codes: font_size={font_size}, alignment={alignment}")
             
             # Code Generator verwenden
-            img = self.code_generator.create_combined_image(text, font_size, alignment)
+            img = self._create_combined_image(text, font_size, alignment)
             
             if img:
                 # Offsets anwenden (falls gesetzt)
@@ -1945,7 +3128,7 @@ class EnhancedPhomemoM110:
             logger.info(f"📝 Creating PREVIEW with codes (NO offsets): font_size={font_size}, alignment={alignment}")
             
             # Code Generator verwenden - OHNE Offsets!
-            img = self.code_generator.create_combined_image(text, font_size, alignment)
+            img = self._create_combined_image(text, font_size, alignment)
             
             if img:
                 logger.info(f"✅ Text PREVIEW with codes created (NO offsets): {img.width}x{img.height}")
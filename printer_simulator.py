@@ -0,0 +1,186 @@
+"""
+Drucker-Attrappe für Phomemo M110
+Pty, das wie /dev/rfcomm0 beschrieben werden kann und Daten mit begrenzter
+Rate abarbeitet - für Benchmarks und Tests ohne Drucker
+"""
+
+import os
+import pty
+import tty
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict
+
+from printer_status import STATUS_FRAME_PREFIX, STATUS_KEY_BATTERY, STATUS_QUERIES, STATUS_VALUES
+
+logger = logging.getLogger(__name__)
+
+
+class SimulatedPrinter:
+    """
+    Pty-Gegenstelle mit simuliertem, abfließendem Empfangspuffer
+
+    Ein Lesethread holt alles vom pty-Master in einen Rückstau-Puffer, der mit
+    drain_rate Bytes/s "gedruckt" wird. queue_probe() liefert daraus die Tiefe
+    einer Ausgabe-Warteschlange (Ersatz für TIOCOUTQ, das auf ptys immer 0 liefert).
+    Übersteigt der Rückstau buffer_capacity, zählt das als Overrun - beim echten
+    Drucker die Ursache für verschobene Zeilen.
+
+    Rückkanal: emit_status() schickt eine Statusmeldung (1A key value) an den
+    Host, set_condition() setzt Papier/Deckel/Überhitzung und meldet die
+    Änderung. Statusabfragen (printer_status.STATUS_QUERIES) im Datenstrom
+    werden mit dem aktuellen Zustand beantwortet.
+
+    Args:
+        drain_rate: abgearbeitete Bytes pro Sekunde
+        buffer_capacity: Empfangspuffer des Druckers in Bytes
+    """
+
+    def __init__(self, drain_rate: float = 8000.0, buffer_capacity: int = 4096, tick: float = 0.002):
+        self.drain_rate = float(drain_rate)
+        self.buffer_capacity = int(buffer_capacity)
+        self.tick = tick
+
+        self.master, self._slave = pty.openpty()
+        tty.setraw(self._slave)
+        self.path = os.ttyname(self._slave)
+
+        self.received = bytearray()
+        self.total_received = 0
+        self._backlog = 0.0
+        self._lock = threading.Lock()
+        self.overruns = 0
+        self.max_backlog = 0
+        self.first_byte_at = None
+        self.last_drained_at = None
+        self.conditions = {'paper_out': False, 'cover_open': False, 'overheat': False}
+        self.battery = 80
+        self.status_sent = 0
+        self.queries_answered = 0
+        self._query_tail = b''
+        self._running = True
+        self._reader = threading.Thread(target=self._read_loop, daemon=True)
+        self._drainer = threading.Thread(target=self._drain_loop, daemon=True)
+        self._reader.start()
+        self._drainer.start()
+
+    def _read_loop(self):
+        while self._running:
+            try:
+                data = os.read(self.master, 65536)
+            except OSError:
+                return
+            if not data:
+                return
+            with self._lock:
+                if self.first_byte_at is None:
+                    self.first_byte_at = time.monotonic()
+                self.received += data
+                self.total_received += len(data)
+                self._backlog += len(data)
+                if self._backlog > self.buffer_capacity:
+                    self.overruns += 1
+                self.max_backlog = max(self.max_backlog, int(self._backlog))
+            self._answer_queries(data)
+
+    def _drain_loop(self):
+        last = time.monotonic()
+        while self._running:
+            time.sleep(self.tick)
+            now = time.monotonic()
+            with self._lock:
+                if self._backlog > 0:
+                    self._backlog = max(0.0, self._backlog - (now - last) * self.drain_rate)
+                    if self._backlog == 0:
+                        self.last_drained_at = now
+            last = now
+
+    def _status_value(self, key: int) -> int:
+        if key == STATUS_KEY_BATTERY:
+            return self.battery
+        for value, (name, active) in STATUS_VALUES[key].items():
+            if self.conditions[name] == active:
+                return value
+        return 0
+
+    def _answer_queries(self, data: bytes):
+        # Abfragen können über zwei Reads verteilt ankommen
+        window = self._query_tail + data
+        for command, key in STATUS_QUERIES.values():
+            if command in window:
+                self.emit_status(key, self._status_value(key))
+                self.queries_answered += 1
+        self._query_tail = window[-2:]
+
+    def emit_status(self, key: int, value: int):
+        """Schickt eine Statusmeldung 1A key value an den Host"""
+        os.write(self.master, bytes([STATUS_FRAME_PREFIX, key, value]))
+        self.status_sent += 1
+
+    def set_condition(self, name: str, active: bool):
+        """Setzt paper_out/cover_open/overheat und meldet die Änderung wie der Drucker"""
+        self.conditions[name] = active
+        for key, values in STATUS_VALUES.items():
+            for value, (field_name, state) in values.items():
+                if field_name == name and state == active:
+                    self.emit_status(key, value)
+
+    def backlog(self) -> int:
+        """Empfangene, noch nicht abgearbeitete Bytes"""
+        with self._lock:
+            return int(self._backlog)
+
+    def queue_probe(self, transport) -> Callable[[], int]:
+        """
+        Queue-Tiefe wie TIOCOUTQ für OutputQueuePacer (EnhancedPhomemoM110.output_queue_probe)
+
+        Zählt neben dem Rückstau auch die Bytes, die die Transport-Sitzung schon
+        geschrieben hat, die aber noch im pty unterwegs sind - TIOCOUTQ meldet
+        auf einem pty immer 0.
+        """
+        baseline = transport.stats['bytes_written'] - self.total_received
+
+        def depth() -> int:
+            with self._lock:
+                in_flight = transport.stats['bytes_written'] - baseline - self.total_received
+                return int(self._backlog) + max(0, in_flight)
+        return depth
+
+    def wait_idle(self, timeout: float = 10.0) -> bool:
+        """Wartet, bis alles gelesen und abgearbeitet ist"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            time.sleep(0.02)
+            if self.backlog() == 0:
+                return True
+        return False
+
+    def reset(self):
+        with self._lock:
+            self.received = bytearray()
+            self._backlog = 0.0
+            self.overruns = 0
+            self.max_backlog = 0
+            self.first_byte_at = None
+            self.last_drained_at = None
+
+    def close(self):
+        self._running = False
+        for fd in (self._slave, self.master):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'received_bytes': len(self.received),
+                'overruns': self.overruns,
+                'max_backlog': self.max_backlog,
+                'buffer_capacity': self.buffer_capacity,
+                'drain_rate': self.drain_rate,
+                'status_sent': self.status_sent,
+                'queries_answered': self.queries_answered,
+            }
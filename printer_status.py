@@ -0,0 +1,331 @@
+"""
+Status-Rückkanal für Phomemo M110
+Liest Statusmeldungen des Druckers (Papier, Deckel, Überhitzung, Akku)
+von der Transport-Sitzung und beantwortet Statusabfragen
+Wird von printer_controller.py verwendet
+"""
+
+import os
+import time
+import select
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Statusmeldungen sind 3 Bytes: 1A <schlüssel> <wert>
+STATUS_FRAME_PREFIX = 0x1A
+STATUS_FRAME_LEN = 3
+
+# Schlüssel der Meldungen (M02/M110-Familie)
+STATUS_KEY_OVERHEAT = 0x03
+STATUS_KEY_BATTERY = 0x04
+STATUS_KEY_COVER = 0x05
+STATUS_KEY_PAPER = 0x06
+STATUS_KEY_PRINT_DONE = 0x0F
+
+# Werte der Zustandsmeldungen: schlüssel -> {wert: (feld, zustand)}
+STATUS_VALUES = {
+    STATUS_KEY_PAPER: {0x88: ('paper_out', True), 0x89: ('paper_out', False)},
+    STATUS_KEY_COVER: {0x99: ('cover_open', True), 0x98: ('cover_open', False)},
+    STATUS_KEY_OVERHEAT: {0xA9: ('overheat', True), 0xA8: ('overheat', False)},
+}
+
+# Abfragen: name -> (kommando, schlüssel der Antwort). Überhitzung ist nicht
+# abfragbar - der Drucker meldet sie nur von sich aus (siehe PrinterState.expire_errors)
+STATUS_QUERIES = {
+    'paper': (b'\x1f\x11\x11', STATUS_KEY_PAPER),
+    'cover': (b'\x1f\x11\x12', STATUS_KEY_COVER),
+    'battery': (b'\x1f\x11\x08', STATUS_KEY_BATTERY),
+}
+
+
+def parse_status_frames(buffer: bytearray) -> List[Tuple[int, int]]:
+    """
+    Entnimmt vollständige Statusmeldungen aus buffer (in-place)
+
+    Bytes vor einem 1A werden verworfen (Resynchronisation), ein
+    unvollständiges Frame am Ende bleibt für den nächsten Aufruf stehen.
+
+    Returns:
+        Liste von (schlüssel, wert)
+    """
+    frames = []
+    while buffer:
+        start = buffer.find(STATUS_FRAME_PREFIX)
+        if start < 0:
+            buffer.clear()
+            break
+        if start:
+            del buffer[:start]
+        if len(buffer) < STATUS_FRAME_LEN:
+            break
+        frames.append((buffer[1], buffer[2]))
+        del buffer[:STATUS_FRAME_LEN]
+    return frames
+
+
+@dataclass
+class PrinterState:
+    """Zuletzt gemeldeter Druckerzustand"""
+    paper_out: bool = False
+    cover_open: bool = False
+    overheat: bool = False
+    battery: Optional[int] = None
+    prints_done: int = 0
+    frames: int = 0
+    unknown_frames: int = 0
+    last_frame: Optional[str] = None
+    last_frame_at: Optional[float] = None
+    changed_at: Optional[float] = None
+    error_seen_at: Dict[str, float] = field(default_factory=dict)  # letzte Meldung je aktivem Fehler
+
+    def apply(self, key: int, value: int) -> bool:
+        """Übernimmt eine Meldung, True wenn sich ein Fehlerzustand geändert hat"""
+        self.frames += 1
+        self.last_frame = f"1a {key:02x} {value:02x}"
+        self.last_frame_at = time.time()
+
+        if key in STATUS_VALUES and value in STATUS_VALUES[key]:
+            name, active = STATUS_VALUES[key][value]
+            if active:
+                self.error_seen_at[name] = self.last_frame_at
+            else:
+                self.error_seen_at.pop(name, None)
+            if getattr(self, name) != active:
+                setattr(self, name, active)
+                self.changed_at = self.last_frame_at
+                return True
+        elif key == STATUS_KEY_BATTERY:
+            self.battery = value
+        elif key == STATUS_KEY_PRINT_DONE:
+            self.prints_done += 1
+        else:
+            self.unknown_frames += 1
+        return False
+
+    def errors(self) -> List[str]:
+        return [name for name in ('paper_out', 'cover_open', 'overheat') if getattr(self, name)]
+
+    def clear_errors(self) -> List[str]:
+        """Verwirft alle Fehlerzustände (neue Sitzung: unbekannt bis zur nächsten Meldung)"""
+        cleared = self.errors()
+        for name in cleared:
+            setattr(self, name, False)
+        self.error_seen_at.clear()
+        if cleared:
+            self.changed_at = time.time()
+        return cleared
+
+    def expire_errors(self, max_age: float, now: Optional[float] = None) -> List[str]:
+        """
+        Verwirft Fehler, die seit max_age Sekunden nicht erneut gemeldet wurden
+
+        Abfragbare Fehler (Papier, Deckel) werden bei jeder Statusabfrage neu
+        bestätigt und verfallen nur, wenn der Drucker nicht mehr antwortet.
+        Überhitzung meldet der Drucker nur einmal - ohne Entwarnung bliebe sie
+        sonst für immer gesetzt.
+        """
+        now = time.time() if now is None else now
+        expired = [name for name in self.errors() if now - self.error_seen_at.get(name, 0.0) > max_age]
+        for name in expired:
+            setattr(self, name, False)
+            self.error_seen_at.pop(name, None)
+        if expired:
+            self.changed_at = now
+        return expired
+
+    @property
+    def has_error(self) -> bool:
+        return bool(self.errors())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'paper_out': self.paper_out,
+            'cover_open': self.cover_open,
+            'overheat': self.overheat,
+            'battery': self.battery,
+            'errors': self.errors(),
+            'prints_done': self.prints_done,
+            'frames': self.frames,
+            'unknown_frames': self.unknown_frames,
+            'last_frame': self.last_frame,
+            'last_frame_at': self.last_frame_at,
+            'changed_at': self.changed_at,
+        }
+
+
+class StatusReader:
+    """
+    Lesethread auf der Transport-Sitzung
+
+    Liest alles, was der Drucker zurückschickt, zerlegt es in Statusmeldungen
+    und führt damit PrinterState nach. Der Thread liest über ein dup() des
+    Session-fds und folgt Neuöffnungen der Sitzung (stats['opens']), schreibt
+    also nie selbst und braucht keinen _comm_lock. Mit jeder neuen Sitzung
+    werden die Fehlerzustände verworfen - Meldungen der alten Verbindung
+    gelten nicht mehr, die nächste Statusabfrage liefert den aktuellen Stand.
+
+    Args:
+        transport: PrinterTransport (mit read_access geöffnet)
+        state: PrinterState, der aktualisiert wird
+        poll_interval: select()-Timeout bzw. Wartezeit ohne offene Sitzung
+    """
+
+    def __init__(self, transport, state: Optional[PrinterState] = None, poll_interval: float = 0.2):
+        self.transport = transport
+        self.state = state or PrinterState()
+        self.poll_interval = float(poll_interval)
+        self._buffer = bytearray()
+        self._waiters: Dict[int, List[Tuple[threading.Event, List[int]]]] = {}
+        self._lock = threading.Lock()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self._fd: Optional[int] = None
+        self._generation = None
+        self._state_generation = None   # Sitzung, zu der der Fehlerzustand gehört
+        self.bytes_read = 0
+        self.read_errors = 0
+
+    # ------------------------------------------------------------------ Thread
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='phomemo-status', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        self._running = False
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+        self._thread = None
+        self._drop_fd()
+
+    def _drop_fd(self):
+        if self._fd is not None:
+            try:
+                os.close(self._fd)
+            except OSError:
+                pass
+        self._fd = None
+        self._generation = None
+        self._buffer.clear()
+
+    def _follow_session(self) -> Optional[int]:
+        """Eigenes dup() des aktuellen Session-fds (neu nach jedem Öffnen der Sitzung)"""
+        generation = self.transport.stats['opens'] if self.transport.is_open else None
+        if generation != self._generation:
+            self._drop_fd()
+            fd = self.transport.fileno()
+            if generation is not None and fd is not None:
+                try:
+                    self._fd = os.dup(fd)
+                    self._generation = generation
+                except OSError:
+                    return None
+                if generation != self._state_generation:
+                    # Nur bei neuer Sitzung, nicht beim erneuten Anhängen nach einem Lesefehler
+                    self._state_generation = generation
+                    self.reset_state()
+        return self._fd
+
+    def reset_state(self):
+        """Verwirft gemeldete Fehler (Sitzung neu geöffnet bzw. Verbindung neu aufgebaut)"""
+        with self._lock:
+            cleared = self.state.clear_errors()
+        if cleared:
+            logger.info(f"🔄 Session reopened, discarding stale printer status: {', '.join(cleared)}")
+
+    def expire_errors(self, max_age: float) -> List[str]:
+        """PrinterState.expire_errors unter dem Lese-Lock"""
+        with self._lock:
+            expired = self.state.expire_errors(max_age)
+        if expired:
+            logger.warning(f"⚠️ No printer report for {max_age:.0f}s, treating as cleared: {', '.join(expired)}")
+        return expired
+
+    def _run(self):
+        logger.info("📥 Status reader started")
+        while self._running:
+            fd = self._follow_session()
+            if fd is None:
+                time.sleep(self.poll_interval)
+                continue
+            try:
+                readable, _, _ = select.select([fd], [], [], self.poll_interval)
+                if not readable:
+                    continue
+                data = os.read(fd, 256)
+            except BlockingIOError:
+                continue
+            except (OSError, ValueError) as e:
+                self.read_errors += 1
+                logger.debug(f"Status read error: {e}")
+                self._drop_fd()
+                time.sleep(self.poll_interval)
+                continue
+            if not data:
+                # Gegenstelle weg - bis zum nächsten Öffnen der Sitzung warten
+                self._drop_fd()
+                time.sleep(self.poll_interval)
+                continue
+            self.feed(data)
+        logger.info("📥 Status reader stopped")
+
+    # ------------------------------------------------------------------ Auswertung
+
+    def feed(self, data: bytes):
+        """Verarbeitet empfangene Bytes (auch direkt nutzbar, z.B. aus einem Event-Loop)"""
+        self.bytes_read += len(data)
+        with self._lock:
+            self._buffer += data
+            frames = parse_status_frames(self._buffer)
+            for key, value in frames:
+                if self.state.apply(key, value):
+                    errors = self.state.errors()
+                    if errors:
+                        logger.warning(f"⚠️ Printer reports: {', '.join(errors)}")
+                    else:
+                        logger.info("✅ Printer status OK")
+                for event, result in self._waiters.pop(key, []):
+                    result.append(value)
+                    event.set()
+
+    def query(self, command: bytes, key: int, send: Callable[[bytes], bool],
+              timeout: float = 1.0) -> Optional[int]:
+        """
+        Sendet eine Statusabfrage und wartet auf die Antwort mit Schlüssel key
+
+        Args:
+            send: Schreibfunktion (z.B. EnhancedPhomemoM110.send_command)
+
+        Returns:
+            Wert der Antwort oder None (nicht gesendet / keine Antwort)
+        """
+        event = threading.Event()
+        result: List[int] = []
+        with self._lock:
+            self._waiters.setdefault(key, []).append((event, result))
+        try:
+            if not send(command):
+                return None
+            if not event.wait(timeout):
+                return None
+            return result[0]
+        finally:
+            with self._lock:
+                waiters = self._waiters.get(key, [])
+                if (event, result) in waiters:
+                    waiters.remove((event, result))
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            'running': self._thread is not None and self._thread.is_alive(),
+            'attached': self._fd is not None,
+            'bytes_read': self.bytes_read,
+            'read_errors': self.read_errors,
+        }
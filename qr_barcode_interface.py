@@ -122,7 +122,7 @@ QR_BARCODE_JAVASCRIPT = '''
                     const previewImage = document.getElementById('codePreviewImage');
                     const previewInfo = document.getElementById('codePreviewInfo');
                     
-                    previewImage.src = 'data:image/png;base64,' + result.preview_base64;
+                    previewImage.src = result.preview_url;
                     previewContainer.style.display = 'block';
                     
                     // Info anzeigen
@@ -0,0 +1,225 @@
+"""
+Raster-Engine für Phomemo M110
+Packt 1-Bit-Bilder in das GS v 0 Rasterformat (48 Bytes pro Zeile)
+Wird von printer_controller.py verwendet
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, List, Tuple, Sequence
+from PIL import Image
+
+# Optional numpy import für Bulk-Packing
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+from config import PRINTER_BYTES_PER_LINE, RASTER_STREAM_BAND_LINES
+
+logger = logging.getLogger(__name__)
+
+# Popcount-Lookup-Tabelle: gesetzte Bits je Byte-Wert
+POPCOUNT_TABLE = bytes(bin(i).count('1') for i in range(256))
+if HAS_NUMPY:
+    _POPCOUNT_LUT = np.frombuffer(POPCOUNT_TABLE, dtype=np.uint8)
+
+
+@dataclass
+class RasterStats:
+    """Einmalig berechnete Dichte-Kennzahlen eines Rasterjobs"""
+    height: int
+    bytes_per_line: int
+    nonzero_bytes: int
+    black_pixels: int
+    line_popcounts: Sequence[int]                       # gesetzte Bits je Zeile
+    blank_runs: List[Tuple[int, int]] = field(default_factory=list)  # (Startzeile, Länge)
+
+    @property
+    def total_bytes(self) -> int:
+        return self.height * self.bytes_per_line
+
+    @property
+    def complexity(self) -> float:
+        """Anteil non-zero Bytes (Metrik der adaptiven Geschwindigkeitswahl)"""
+        return self.nonzero_bytes / self.total_bytes if self.total_bytes else 0.0
+
+    @property
+    def bit_density(self) -> float:
+        """Anteil schwarzer Pixel am gesamten Raster"""
+        return self.black_pixels / (self.total_bytes * 8) if self.total_bytes else 0.0
+
+    @property
+    def blank_lines(self) -> int:
+        return sum(length for _, length in self.blank_runs)
+
+    def line_density(self, line_idx: int) -> float:
+        """Bit-Dichte einer einzelnen Zeile (0.0-1.0)"""
+        return self.line_popcounts[line_idx] / (self.bytes_per_line * 8)
+
+
+def line_popcount(line: bytes) -> int:
+    """Gesetzte Bits einer Rasterzeile (für Zeilen ohne vorberechnete Stats)"""
+    return sum(line.translate(POPCOUNT_TABLE))
+
+
+def _find_blank_runs(blank_flags: Iterable[bool]) -> List[Tuple[int, int]]:
+    """Fasst aufeinanderfolgende Leerzeilen zu (Start, Länge)-Runs zusammen"""
+    runs = []
+    run_start = None
+    line_idx = -1
+    for line_idx, blank in enumerate(blank_flags):
+        if blank and run_start is None:
+            run_start = line_idx
+        elif not blank and run_start is not None:
+            runs.append((run_start, line_idx - run_start))
+            run_start = None
+    if run_start is not None:
+        runs.append((run_start, line_idx + 1 - run_start))
+    return runs
+
+
+def compute_raster_stats(image_data: bytes, bytes_per_line: int = PRINTER_BYTES_PER_LINE) -> RasterStats:
+    """
+    Analysiert gepackte Rasterdaten in einem Durchlauf
+
+    Liefert Gesamtdichte, Popcount je Zeile (per Lookup-Tabelle) und Leerzeilen-Runs.
+    Speed-Auswahl, Zeilen-Pacing und Komplexitäts-Reduktion lesen daraus.
+    """
+    height = len(image_data) // bytes_per_line
+
+    if HAS_NUMPY and height:
+        rows = np.frombuffer(image_data, dtype=np.uint8, count=height * bytes_per_line).reshape(height, bytes_per_line)
+        popcounts = _POPCOUNT_LUT[rows].sum(axis=1, dtype=np.int64)
+        return RasterStats(
+            height=height,
+            bytes_per_line=bytes_per_line,
+            nonzero_bytes=int(np.count_nonzero(rows)),
+            black_pixels=int(popcounts.sum()),
+            line_popcounts=popcounts.tolist(),
+            blank_runs=_find_blank_runs((popcounts == 0).tolist()),
+        )
+
+    popcounts = [
+        line_popcount(image_data[offset:offset + bytes_per_line])
+        for offset in range(0, height * bytes_per_line, bytes_per_line)
+    ]
+    return RasterStats(
+        height=height,
+        bytes_per_line=bytes_per_line,
+        nonzero_bytes=height * bytes_per_line - image_data.count(0, 0, height * bytes_per_line),
+        black_pixels=sum(popcounts),
+        line_popcounts=popcounts,
+        blank_runs=_find_blank_runs(count == 0 for count in popcounts),
+    )
+
+
+def _pack_raster_numpy(img: Image.Image) -> bytes:
+    """Packt ein Mode-'1'-Bild mit numpy.packbits (schwarz = Bit gesetzt, MSB zuerst)"""
+    # Mode '1' liefert ein bool-Array: True = weiß
+    pixels = np.asarray(img)
+    return np.packbits(~pixels, axis=1).tobytes()
+
+
+def _pack_raster_pil(img: Image.Image) -> bytes:
+    """Packt ein Mode-'1'-Bild mit PILs nativem 1-Bit-Raw-Encoder (invertiert)"""
+    return img.tobytes('raw', '1;I')
+
+
+def _pack_raster_python(img: Image.Image, bytes_per_line: int = PRINTER_BYTES_PER_LINE) -> bytes:
+    """
+    Reine Python-Referenzimplementierung (ursprünglicher Bit-für-Bit-Encoder)
+    Langsam, aber ohne Abhängigkeiten - dient als letzter Fallback und als Referenz
+    der Paritätstests (tests/test_raster_engine.py)
+    """
+    width, height = img.size
+    # 'L'-Bytes: 0 = schwarz, 255 = weiß (getdata ist in Pillow veraltet)
+    pixels = img.convert('L').tobytes()
+    image_bytes = bytearray(height * bytes_per_line)
+
+    for y in range(height):
+        line_offset = y * bytes_per_line
+        for pixel_x in range(min(width, bytes_per_line * 8)):
+            # PIL: 0 = schwarz
+            if pixels[y * width + pixel_x] == 0:
+                image_bytes[line_offset + pixel_x // 8] |= (1 << (7 - pixel_x % 8))
+
+    return bytes(image_bytes)
+
+
+def pack_image_to_raster(img: Image.Image, bytes_per_line: int = PRINTER_BYTES_PER_LINE) -> bytes:
+    """
+    Konvertiert ein Mode-'1'-Bild in Rasterdaten (eine Zeile = bytes_per_line Bytes)
+
+    Reihenfolge: numpy.packbits -> PIL Raw-Encoder -> reine Python-Schleife.
+    Alle drei Wege liefern byte-identische Ergebnisse.
+
+    Args:
+        img: PIL Image, Breite == bytes_per_line * 8
+        bytes_per_line: Bytes pro Rasterzeile (Standard: 48)
+
+    Returns:
+        bytes: height * bytes_per_line Bytes
+    """
+    if img.mode != '1':
+        img = img.convert('1')
+
+    if img.width != bytes_per_line * 8:
+        raise ValueError(f"Image width {img.width}px does not match {bytes_per_line} bytes per line")
+
+    if HAS_NUMPY:
+        try:
+            return _pack_raster_numpy(img)
+        except Exception as e:
+            logger.warning(f"⚠️ numpy raster packing failed, falling back: {e}")
+
+    try:
+        return _pack_raster_pil(img)
+    except Exception as e:
+        logger.warning(f"⚠️ PIL raw raster packing failed, using pure Python: {e}")
+
+    return _pack_raster_python(img, bytes_per_line)
+
+
+def iter_raster_bands(img: Image.Image, bytes_per_line: int = PRINTER_BYTES_PER_LINE,
+                      band_lines: int = RASTER_STREAM_BAND_LINES) -> Iterator[bytes]:
+    """
+    Streaming-Variante von pack_image_to_raster: packt das Bild bandweise
+
+    Jedes Band wird erst gepackt, wenn der Konsument es anfordert - die erste
+    Zeile kann so schon übertragen werden, während spätere noch gepackt werden.
+
+    Yields:
+        bytes: band_lines * bytes_per_line Bytes (letztes Band ggf. kürzer)
+    """
+    if img.mode != '1':
+        img = img.convert('1')
+
+    width, height = img.size
+    band_lines = max(1, int(band_lines))
+
+    for top in range(0, height, band_lines):
+        band = img.crop((0, top, width, min(top + band_lines, height)))
+        yield pack_image_to_raster(band, bytes_per_line)
+
+
+def iter_raster_rows(raster_source: Iterable[bytes], bytes_per_line: int = PRINTER_BYTES_PER_LINE) -> Iterator[bytes]:
+    """
+    Zerlegt Rasterdaten (komplette bytes oder ein Band-Iterator) in einzelne Zeilen
+
+    Yields:
+        bytes: genau bytes_per_line Bytes pro Zeile
+
+    Raises:
+        ValueError: wenn ein Band nicht auf Zeilengrenzen endet
+    """
+    if isinstance(raster_source, (bytes, bytearray, memoryview)):
+        raster_source = (raster_source,)
+
+    for band in raster_source:
+        if len(band) % bytes_per_line != 0:
+            raise ValueError(f"Raster band of {len(band)} bytes is not aligned to {bytes_per_line}-byte lines")
+        for offset in range(0, len(band), bytes_per_line):
+            yield bytes(band[offset:offset + bytes_per_line])
+
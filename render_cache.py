@@ -0,0 +1,250 @@
+"""
+Render-Cache für Phomemo M110
+LRU-Caches mit Byte-Budget für fertig verarbeitete Bilder und Pipeline-Zwischenstufen,
+Vorschau-Tokens für Druck ohne erneuten Upload
+Wird von printer_controller.py verwendet
+"""
+
+import hashlib
+import logging
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(data: bytes) -> str:
+    """Inhalts-Hash eines Uploads (blake2b, 128 Bit)"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def image_nbytes(img: Image.Image) -> int:
+    """Speicherbedarf eines PIL-Bildes (1-Bit-Bilder gepackt)"""
+    if img.mode == '1':
+        return (img.width + 7) // 8 * img.height
+    return img.width * img.height * len(img.getbands())
+
+
+class ByteLRUCache:
+    """
+    Thread-sicherer LRU-Cache, begrenzt durch Gesamtgröße in Bytes (und optional Anzahl)
+
+    Die Größe eines Eintrags liefert sizeof(value). Einträge, die allein größer
+    als das Budget sind, werden nicht aufgenommen.
+    """
+
+    def __init__(self, max_bytes: int, sizeof: Callable[[Any], int], max_entries: Optional[int] = None,
+                 name: str = 'cache'):
+        self.max_bytes = int(max_bytes)
+        self.max_entries = max_entries
+        self.name = name
+        self._sizeof = sizeof
+        self._entries: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any) -> bool:
+        size = self._sizeof(value)
+        if size > self.max_bytes:
+            logger.debug(f"{self.name}: entry of {size} bytes exceeds budget {self.max_bytes}")
+            return False
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+
+            while self._entries and (self._bytes > self.max_bytes or
+                                     (self.max_entries is not None and len(self._entries) > self.max_entries)):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+        return True
+
+    def discard(self, key: Hashable):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Zähler für /api/status"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+class StagedImageCache:
+    """
+    Zwischenergebnisse der Bildpipeline je Upload-Sitzung (Inhalts-Hash)
+
+    Stufen: 'decoded' -> 'fitted' (Graustufen auf Label-Geometrie) -> 'toned'
+    (Tonwert-LUT angewendet) -> 'dithered'. Eine Parameteränderung setzt bei der
+    spätesten noch gültigen Stufe wieder auf - ein neuer Schwellenwert dithert
+    nur das bereits skalierte 384px-Graubild neu.
+
+    Jede Sitzung ist durch Anzahl und Bytes begrenzt, die Sitzungen selbst
+    werden nach LRU verdrängt.
+    """
+
+    STAGES = ('decoded', 'fitted', 'toned', 'dithered')
+
+    def __init__(self, max_sessions: int, session_max_entries: int, session_max_bytes: int):
+        self.max_sessions = max_sessions
+        self.session_max_entries = session_max_entries
+        self.session_max_bytes = session_max_bytes
+        self._sessions: 'OrderedDict[str, ByteLRUCache]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.stage_hits = {stage: 0 for stage in self.STAGES}
+        self.stage_misses = {stage: 0 for stage in self.STAGES}
+
+    @staticmethod
+    def _sizeof(value) -> int:
+        # Werte sind (Bild, Metadaten) - gezählt wird der Bildpuffer
+        return image_nbytes(value[0]) + 256
+
+    def _session(self, session_id: str, create: bool) -> Optional[ByteLRUCache]:
+        with self._lock:
+            cache = self._sessions.get(session_id)
+            if cache is not None:
+                self._sessions.move_to_end(session_id)
+            elif create:
+                cache = ByteLRUCache(self.session_max_bytes, self._sizeof,
+                                     max_entries=self.session_max_entries, name=f'stages:{session_id[:8]}')
+                self._sessions[session_id] = cache
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            return cache
+
+    def get(self, session_id: str, stage: str, params: Hashable) -> Optional[tuple]:
+        """Liefert (Bild, Metadaten) der Stufe oder None"""
+        cache = self._session(session_id, create=False)
+        value = cache.get((stage, params)) if cache is not None else None
+        with self._lock:
+            if value is None:
+                self.stage_misses[stage] += 1
+            else:
+                self.stage_hits[stage] += 1
+        return value
+
+    def put(self, session_id: str, stage: str, params: Hashable, img: Image.Image, meta: Any = None):
+        self._session(session_id, create=True).put((stage, params), (img, meta))
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            sessions = list(self._sessions.values())
+            stats = {
+                'sessions': len(sessions),
+                'max_sessions': self.max_sessions,
+                'stage_hits': dict(self.stage_hits),
+                'stage_misses': dict(self.stage_misses),
+            }
+        stats['entries'] = sum(len(cache) for cache in sessions)
+        stats['bytes'] = sum(cache.get_stats()['bytes'] for cache in sessions)
+        return stats
+
+
+class PreviewTokenStore:
+    """
+    Kurzlebige Tokens für fertig verarbeitete Vorschau-Artefakte
+
+    Ein Token verweist auf das 1-Bit-Bild und das gepackte Raster einer
+    Vorschau - Drucken per Token braucht weder erneuten Upload noch erneutes
+    Dithering. Abgelaufene Tokens werden beim Zugriff entfernt, bei vollem
+    Speicher fällt das älteste Token heraus.
+    """
+
+    def __init__(self, ttl_seconds: float, max_tokens: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_tokens = max_tokens
+        self._tokens: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.created = 0
+        self.redeemed = 0
+        self.expired = 0
+
+    def _purge_expired(self, now: float):
+        for token in [t for t, artifact in self._tokens.items() if artifact['expires'] <= now]:
+            del self._tokens[token]
+            self.expired += 1
+
+    def create(self, artifact: Dict[str, Any]) -> str:
+        now = time.time()
+        token = secrets.token_urlsafe(16)
+        with self._lock:
+            self._purge_expired(now)
+            self._tokens[token] = {**artifact, 'created': now, 'expires': now + self.ttl_seconds}
+            while len(self._tokens) > self.max_tokens:
+                self._tokens.popitem(last=False)
+            self.created += 1
+        return token
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            self._purge_expired(now)
+            artifact = self._tokens.get(token)
+            if artifact is not None:
+                self.redeemed += 1
+            return artifact
+
+    def update(self, token: str, **fields):
+        with self._lock:
+            if token in self._tokens:
+                self._tokens[token].update(fields)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._purge_expired(time.time())
+            return {
+                'active': len(self._tokens),
+                'created': self.created,
+                'redeemed': self.redeemed,
+                'expired': self.expired,
+                'ttl_seconds': self.ttl_seconds,
+            }
@@ -0,0 +1,219 @@
+"""
+Render-Prozesspool für Phomemo M110
+CPU-lastiges Rendern (Dekodieren, Skalieren, Dithering, Text- und Code-Bilder)
+läuft in Worker-Prozessen statt unter dem GIL der Flask- und Queue-Threads
+Wird von printer_controller.py verwendet
+"""
+
+import os
+import time
+import signal
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Zustand im Worker-Prozess: Offline-Controller (lazy, einer je Prozess)
+_in_worker = False
+_worker_printer = None
+
+
+class RenderPoolUnavailable(RuntimeError):
+    """Pool läuft nicht (mehr) - der Aufrufer rendert lokal"""
+
+
+@dataclass
+class PackedImage:
+    """1-Bit-Bild als gepackte Zeilen (PIL-Layout '1': MSB zuerst, Zeilen auf volle Bytes)"""
+    size: Tuple[int, int]
+    data: bytes
+
+    @classmethod
+    def pack(cls, img: Image.Image) -> 'PackedImage':
+        if img.mode != '1':
+            img = img.convert('1')
+        return cls(img.size, img.tobytes())
+
+    def unpack(self) -> Image.Image:
+        return Image.frombytes('1', self.size, self.data)
+
+
+def in_render_worker() -> bool:
+    """True im Worker-Prozess (dort rendert der Controller selbst, ohne eigenen Pool)"""
+    return _in_worker
+
+
+def _init_worker():
+    global _in_worker
+    _in_worker = True
+    # Signale behandelt nur der Hauptprozess (geerbte Handler würden dessen Dienste stoppen)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+
+def _printer_for(snapshot: Dict[str, Any]):
+    """Offline-Controller des Workers, auf den Render-Zustand des Hauptprozesses gebracht"""
+    global _worker_printer
+    if _worker_printer is None:
+        from printer_controller import EnhancedPhomemoM110
+        printer = EnhancedPhomemoM110(snapshot['mac_address'], auto_start=False)
+        # Fertige Ergebnisse und Vorschau-PNGs hält der Hauptprozess
+        printer.render_cache.max_bytes = 0
+        printer.preview_images.max_bytes = 0
+        _worker_printer = printer
+    _worker_printer.apply_render_snapshot(snapshot)
+    return _worker_printer
+
+
+# ---------------------------------------------------------------------- Worker-Aufträge
+# Modulebene, damit sie sich an die Worker übergeben lassen
+
+def render_image_task(snapshot: Dict[str, Any], image_data: bytes, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """process_image_for_preview im Worker - Ergebnis mit gepacktem Bild statt PIL-Objekt"""
+    result = _printer_for(snapshot).process_image_for_preview(image_data, **params)
+    if result is None:
+        return None
+    return {
+        'image': PackedImage.pack(result.processed_image),
+        'preview_png': result.preview_png,
+        'original_size': result.original_size,
+        'info': {**result.info, 'render_pid': os.getpid()},
+    }
+
+
+def render_text_task(snapshot: Dict[str, Any], text: str, font_size: int, alignment: str) -> Optional[PackedImage]:
+    """create_text_image_preview im Worker"""
+    img = _printer_for(snapshot).create_text_image_preview(text, font_size, alignment)
+    return PackedImage.pack(img) if img is not None else None
+
+
+def render_codes_task(snapshot: Dict[str, Any], text: str, font_size: int, alignment: str) -> Optional[PackedImage]:
+    """CodeGenerator.create_combined_image im Worker"""
+    printer = _printer_for(snapshot)
+    if printer.code_generator is None:
+        return None
+    img = printer.code_generator.create_combined_image(text, font_size, alignment)
+    return PackedImage.pack(img) if img is not None else None
+
+
+# ---------------------------------------------------------------------- Pool
+
+class RenderPool:
+    """
+    Prozesspool für die Render-Aufträge des Controllers
+
+    Die Worker entstehen per fork und erben den geladenen Code, ohne main.py
+    erneut auszuführen (spawn/forkserver würden dort den Drucker samt Diensten
+    anlegen). start() forkt alle Worker auf einmal und gehört deshalb vor den
+    Start der Hintergrund-Threads. Fällt ein Worker aus (z.B. OOM-Killer bei
+    riesigen Uploads), bleibt der Pool bis zum nächsten start() abgeschaltet:
+    ein Neu-Forken aus einem Flask- oder Queue-Thread, während Sende-, Status-
+    und Monitor-Threads Locks halten, könnte den neuen Worker verklemmen. Alle
+    Aufträge melden dann RenderPoolUnavailable und werden lokal gerendert.
+
+    Args:
+        workers: Anzahl Worker-Prozesse (None: Anzahl CPU-Kerne)
+        timeout: maximale Wartezeit je Auftrag in Sekunden
+    """
+
+    def __init__(self, workers: Optional[int] = None, timeout: float = 60.0):
+        self.workers = max(1, int(workers or os.cpu_count() or 1))
+        self.timeout = float(timeout)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._started = False
+        self._disabled_reason: Optional[str] = None
+        self._lock = threading.Lock()
+        self.stats = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'crashes': 0,
+            'busy_s': 0.0,
+        }
+
+    @staticmethod
+    def _context():
+        methods = multiprocessing.get_all_start_methods()
+        return multiprocessing.get_context('fork' if 'fork' in methods else None)
+
+    def _ensure_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if not self._started or self._executor is None:
+                raise RenderPoolUnavailable(self._disabled_reason or 'render pool not started')
+            return self._executor
+
+    @property
+    def running(self) -> bool:
+        return self._started
+
+    def start(self):
+        """Startet die Worker-Prozesse (vor den Hintergrund-Threads aufrufen)"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=self._context(),
+                                                     initializer=_init_worker)
+            self._started = True
+            self._disabled_reason = None
+        executor = self._ensure_executor()
+        # Beim ersten Auftrag forkt der Executor alle Worker auf einmal
+        executor.submit(os.getpid).result()
+        logger.info(f"🧮 Render pool started with {self.workers} worker process(es)")
+
+    def stop(self):
+        with self._lock:
+            executor = self._executor
+            self._executor = None
+            self._started = False
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+            logger.info("🧮 Render pool stopped")
+
+    def run(self, task: Callable, *args) -> Any:
+        """
+        Führt task(*args) in einem Worker aus und wartet auf das Ergebnis
+
+        Raises:
+            RenderPoolUnavailable: Pool nicht gestartet oder ausgefallen (lokal rendern)
+            concurrent.futures.TimeoutError: Auftrag dauerte länger als timeout
+            Exception: Fehler des Auftrags im Worker
+        """
+        executor = self._ensure_executor()
+        self.stats['submitted'] += 1
+        start = time.perf_counter()
+        try:
+            result = executor.submit(task, *args).result(self.timeout)
+            self.stats['completed'] += 1
+            return result
+        except BrokenProcessPool as e:
+            self.stats['failed'] += 1
+            with self._lock:
+                if self._executor is executor:
+                    # Kein Neu-Forken im laufenden Betrieb (siehe Klassen-Docstring)
+                    self._executor = None
+                    self._started = False
+                    self._disabled_reason = f'render pool disabled after worker crash ({e})'
+                    self.stats['crashes'] += 1
+                    logger.warning("⚠️ Render worker died - pool disabled, rendering locally until the next service start")
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise RenderPoolUnavailable(f'render worker died: {e}')
+        except Exception:
+            self.stats['failed'] += 1
+            raise
+        finally:
+            self.stats['busy_s'] += time.perf_counter() - start
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            'running': self.running,
+            'disabled_reason': self._disabled_reason,
+            'workers': self.workers,
+            **self.stats,
+            'busy_s': round(self.stats['busy_s'], 3),
+        }
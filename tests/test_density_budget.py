@@ -0,0 +1,64 @@
+"""
+Tests für das Dichte-Budget in process_image_for_preview
+Die Regelung muss auf dieselbe Metrik reagieren, die das Budget vorgibt
+"""
+
+import io
+import os
+import sys
+
+import pytest
+from PIL import Image
+
+# Module liegen eine Ebene höher
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from printer_controller import EnhancedPhomemoM110, TransmissionSpeed
+
+
+def png_bytes(gray: int, size=(384, 240)) -> bytes:
+    buf = io.BytesIO()
+    Image.new('L', size, gray).save(buf, 'PNG')
+    return buf.getvalue()
+
+
+@pytest.fixture
+def printer(tmp_path, monkeypatch):
+    # Einstellungsdatei und Journal nicht im Repo anlegen
+    monkeypatch.chdir(tmp_path)
+    return EnhancedPhomemoM110('00:00:00:00:00:00', auto_start=False)
+
+
+def test_light_gray_stays_below_bit_density_budget(printer):
+    # ~6% Bit-Dichte, aber gestreute Punkte -> hohe Byte-Komplexität
+    info = printer.process_image_for_preview(png_bytes(240)).info
+    assert info['estimated_bit_density'] < printer.settings['auto_reduce_target_density']
+    assert info['estimated_complexity'] > 0.2
+    assert info['auto_reduce'] is None
+
+
+def test_speed_tier_budget_triggers_search_on_complexity(printer):
+    printer.settings['auto_reduce_target_speed'] = 'fast'
+    limit = printer.get_speed_complexity_limit(TransmissionSpeed.FAST)
+
+    info = printer.process_image_for_preview(png_bytes(240)).info
+
+    reduce_info = info['auto_reduce']
+    assert reduce_info is not None
+    assert reduce_info['metric'] == 'complexity'
+    assert reduce_info['target'] == limit
+    assert reduce_info['start_density'] > limit
+    assert reduce_info['met_budget']
+    # info['estimated_complexity'] ist Byte-Komplexität (liest print_image_immediate)
+    assert info['estimated_complexity'] <= limit
+    assert info['estimated_transmission_speed'] in (TransmissionSpeed.FAST.value, TransmissionSpeed.ULTRA_FAST.value)
+
+
+def test_auto_reduce_disabled_skips_speed_tier_search(printer):
+    printer.settings['auto_reduce_target_speed'] = 'fast'
+    printer.settings['auto_reduce_complexity'] = False
+
+    info = printer.process_image_for_preview(png_bytes(240)).info
+
+    assert info['auto_reduce'] is None
+    assert info['estimated_complexity'] > printer.get_speed_complexity_limit(TransmissionSpeed.FAST)
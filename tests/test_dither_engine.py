@@ -0,0 +1,62 @@
+"""
+Paritätstests für dither_engine
+Die vektorisierte Atkinson-Wellenfront muss bit-identisch zur Python-Schleife sein
+"""
+
+import os
+import sys
+import random
+
+import pytest
+from PIL import Image
+
+# Module liegen eine Ebene höher
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dither_engine
+from dither_engine import _atkinson_python
+
+pytestmark = pytest.mark.skipif(not dither_engine.HAS_NUMPY, reason="numpy nicht installiert")
+
+
+def noise_image(width: int, height: int, seed: int) -> Image.Image:
+    rng = random.Random(seed)
+    data = bytes(rng.randrange(256) for _ in range(width * height))
+    return Image.frombytes('L', (width, height), data)
+
+
+def gradient_image(width: int, height: int) -> Image.Image:
+    return Image.linear_gradient('L').resize((width, height))
+
+
+PATTERNS = {
+    'gradient': lambda w, h: gradient_image(w, h),
+    'noise': lambda w, h: noise_image(w, h, seed=w * 1000 + h),
+    'all_white': lambda w, h: Image.new('L', (w, h), 255),
+    'all_black': lambda w, h: Image.new('L', (w, h), 0),
+    'mid_gray': lambda w, h: Image.new('L', (w, h), 128),
+}
+
+
+@pytest.mark.parametrize('pattern', sorted(PATTERNS))
+@pytest.mark.parametrize('size', [(384, 120), (1, 1), (1, 5), (2, 9), (3, 7), (13, 11), (384, 1)])
+@pytest.mark.parametrize('threshold', [64, 128, 200])
+def test_atkinson_numpy_matches_python(pattern, size, threshold):
+    img = PATTERNS[pattern](*size)
+    expected = _atkinson_python(img, threshold)
+    actual = dither_engine._atkinson_numpy(img, threshold)
+    assert actual.mode == '1'
+    assert actual.size == expected.size
+    assert actual.tobytes() == expected.tobytes()
+
+
+def test_atkinson_falls_back_without_numpy(monkeypatch):
+    img = noise_image(40, 30, seed=7)
+    expected = dither_engine._atkinson_numpy(img, 128).tobytes()
+    monkeypatch.setattr(dither_engine, 'HAS_NUMPY', False)
+    assert dither_engine._atkinson(img, 128).tobytes() == expected
+
+
+def test_atkinson_not_in_auto_candidates():
+    from config import DITHER_AUTO_CANDIDATES
+    assert 'atkinson' not in DITHER_AUTO_CANDIDATES
@@ -0,0 +1,182 @@
+"""
+Tests für flow_control
+OutputQueuePacer (Hysterese, Stall-Timeout) und TokenBucketPacer, erst mit
+vorgegebenen Queue-Tiefen, dann gegen die pty-Attrappe (printer_simulator)
+"""
+
+import os
+import sys
+import time
+import asyncio
+
+import pytest
+
+# Module liegen eine Ebene höher
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flow_control import OutputQueuePacer, TokenBucketPacer
+from printer_simulator import SimulatedPrinter
+from transport import PrinterTransport
+
+CHUNK = 256
+
+
+def scripted_depth(values):
+    """Queue-Abfrage, die nacheinander values liefert (der letzte Wert bleibt stehen)"""
+    values = list(values)
+    seen = []
+
+    def depth():
+        value = values.pop(0) if len(values) > 1 else values[0]
+        seen.append(value)
+        return value
+    depth.seen = seen
+    return depth
+
+
+def make_pacer(depth, high=2048, low=512, stall_timeout=1.0):
+    return OutputQueuePacer(depth, high, low, poll_interval=0.001, stall_timeout=stall_timeout)
+
+
+# ---------------------------------------------------------------------- OutputQueuePacer
+
+def test_below_high_water_does_not_wait():
+    depth = scripted_depth([2047])
+    pacer = make_pacer(depth)
+    pacer.pace(CHUNK)
+    assert depth.seen == [2047]
+    assert pacer.waits == 0
+
+
+def test_unknown_depth_does_not_wait():
+    pacer = make_pacer(lambda: None)
+    pacer.pace(CHUNK)
+    assert pacer.waits == 0
+
+
+def test_waits_until_low_water_not_just_below_high():
+    # Hysterese: 1500 liegt schon unter der Hochwassermarke, reicht aber nicht
+    depth = scripted_depth([2048, 1500, 900, 512, 100])
+    pacer = make_pacer(depth)
+    pacer.pace(CHUNK)
+    assert depth.seen == [2048, 1500, 900, 512]
+    assert pacer.waits == 1
+    assert pacer.get_stats()['max_depth'] == 2048
+
+
+def test_low_water_is_capped_at_high_water():
+    assert make_pacer(lambda: 0, high=1000, low=5000).low_water == 1000
+
+
+def test_stalled_queue_raises():
+    pacer = make_pacer(lambda: 4096, stall_timeout=0.05)
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        pacer.pace(CHUNK)
+    assert 0.05 <= time.monotonic() - start < 1.0
+
+
+def test_pace_async_follows_same_hysteresis():
+    depth = scripted_depth([3000, 1000, 400])
+    pacer = make_pacer(depth)
+    asyncio.run(pacer.pace_async(CHUNK))
+    assert depth.seen == [3000, 1000, 400]
+
+
+def test_wait_drained():
+    assert make_pacer(scripted_depth([300, 100, 0])).wait_drained()
+    assert not make_pacer(lambda: 300).wait_drained(timeout=0.02)
+
+
+# ---------------------------------------------------------------------- TokenBucketPacer
+
+def test_bucket_burst_then_rate():
+    pacer = TokenBucketPacer(rate_bps=1000, burst_bytes=100)
+    assert pacer.reserve(100) == 0.0
+    assert pacer.reserve(50) == pytest.approx(0.05, abs=0.005)
+    assert pacer.waits == 1
+    assert pacer.bytes == 150
+
+
+def test_bucket_oversized_write_runs_into_debt():
+    pacer = TokenBucketPacer(rate_bps=1000, burst_bytes=100)
+    # Nur der Burst muss vorhanden sein, der Rest bremst die folgenden Writes
+    assert pacer.reserve(400) == 0.0
+    assert pacer.reserve(10) == pytest.approx(0.31, abs=0.005)
+
+
+def test_bucket_transfer_time():
+    pacer = TokenBucketPacer(rate_bps=2000, burst_bytes=500)
+    assert pacer.transfer_time(400) == 0.0
+    assert pacer.transfer_time(4500) == pytest.approx(2.0)
+
+
+def test_bucket_records_queue_depth():
+    pacer = TokenBucketPacer(rate_bps=1e6, burst_bytes=1024, queue_depth=scripted_depth([10, 700, 30]))
+    for _ in range(3):
+        pacer.pace(CHUNK)
+    assert pacer.max_depth == 700
+
+
+# ---------------------------------------------------------------------- Attrappe
+
+@pytest.fixture
+def sim():
+    printer = SimulatedPrinter(drain_rate=40000, buffer_capacity=1536)
+    yield printer
+    printer.close()
+
+
+@pytest.fixture
+def transport(sim):
+    session = PrinterTransport(sim.path, '00:00:00:00:00:00')
+    session.open()
+    yield session
+    session.close()
+
+
+def send(transport, total: int, pacer=None) -> float:
+    data = bytes(range(256)) * (total // 256)
+    start = time.monotonic()
+    for offset in range(0, len(data), CHUNK):
+        if pacer is not None:
+            pacer.pace(CHUNK)
+        transport.write(data[offset:offset + CHUNK])
+    return time.monotonic() - start
+
+
+def test_unpaced_burst_overruns_simulator(sim, transport):
+    send(transport, 16384)
+    assert sim.wait_idle()
+    assert sim.get_stats()['overruns'] > 0
+
+
+def test_output_queue_pacer_keeps_simulator_below_capacity(sim, transport):
+    pacer = OutputQueuePacer(sim.queue_probe(transport), high_water=1024, low_water=256,
+                             poll_interval=0.001, stall_timeout=2.0)
+    send(transport, 16384, pacer)
+    assert sim.wait_idle()
+    stats = sim.get_stats()
+    assert stats['received_bytes'] == 16384
+    assert stats['overruns'] == 0
+    assert stats['max_backlog'] <= 1024 + CHUNK
+    assert pacer.waits > 0
+
+
+def test_output_queue_pacer_times_out_on_stalled_simulator(sim, transport):
+    sim.drain_rate = 0.0
+    pacer = OutputQueuePacer(sim.queue_probe(transport), high_water=1024, low_water=256,
+                             poll_interval=0.001, stall_timeout=0.1)
+    with pytest.raises(TimeoutError):
+        send(transport, 16384, pacer)
+
+
+def test_token_bucket_keeps_simulator_below_capacity(sim, transport):
+    # Rate unter der Abarbeitung der Attrappe: Rückstau bleibt beim Burst
+    pacer = TokenBucketPacer(rate_bps=20000, burst_bytes=512, queue_depth=sim.queue_probe(transport))
+    elapsed = send(transport, 8192, pacer)
+    assert sim.wait_idle()
+    stats = sim.get_stats()
+    assert stats['received_bytes'] == 8192
+    assert stats['overruns'] == 0
+    assert elapsed >= pacer.transfer_time(8192) * 0.9
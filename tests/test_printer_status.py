@@ -0,0 +1,259 @@
+"""
+Tests für den Status-Rückkanal
+Frame-Zerlegung, Abfragen gegen die pty-Attrappe (printer_simulator) und die
+Queue-Pause bei Druckerfehlern, ohne Versuche der Jobs zu verbrauchen
+"""
+
+import os
+import sys
+import time
+import threading
+
+import pytest
+
+# Module liegen eine Ebene höher
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import printer_controller
+from printer_status import (PrinterState, StatusReader, parse_status_frames, STATUS_QUERIES,
+                            STATUS_KEY_PAPER, STATUS_KEY_COVER, STATUS_KEY_OVERHEAT, STATUS_KEY_BATTERY,
+                            STATUS_KEY_PRINT_DONE)
+from printer_simulator import SimulatedPrinter
+from transport import PrinterTransport
+
+
+def wait_for(predicate, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+class _FastTime:
+    """time-Modul für den Controller mit gekürzten Pausen (Verbindungs-Warteschleife: 5s)"""
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+    @staticmethod
+    def sleep(seconds):
+        time.sleep(min(seconds, 0.02))
+
+
+@pytest.fixture
+def sim():
+    printer = SimulatedPrinter(drain_rate=1e6, buffer_capacity=1 << 20)
+    yield printer
+    printer.close()
+
+
+@pytest.fixture
+def session(sim):
+    transport = PrinterTransport(sim.path, '00:00:00:00:00:00', read_access=True)
+    reader = StatusReader(transport, PrinterState(), poll_interval=0.02)
+    transport.open()
+    reader.start()
+    yield transport, reader
+    reader.stop()
+    transport.close()
+
+
+# ---------------------------------------------------------------------- Frames
+
+def test_parse_complete_frames():
+    buffer = bytearray(b'\x1a\x06\x88\x1a\x05\x98')
+    assert parse_status_frames(buffer) == [(STATUS_KEY_PAPER, 0x88), (STATUS_KEY_COVER, 0x98)]
+    assert buffer == bytearray()
+
+
+def test_parse_split_frame_waits_for_rest():
+    buffer = bytearray(b'\x1a\x06')
+    assert parse_status_frames(buffer) == []
+    assert buffer == bytearray(b'\x1a\x06')
+    buffer += b'\x89\x1a'
+    assert parse_status_frames(buffer) == [(STATUS_KEY_PAPER, 0x89)]
+    assert buffer == bytearray(b'\x1a')
+
+
+def test_parse_drops_garbage_prefix():
+    buffer = bytearray(b'\x00\xff\x33\x1a\x03\xa9')
+    assert parse_status_frames(buffer) == [(STATUS_KEY_OVERHEAT, 0xA9)]
+    buffer = bytearray(b'\x00\x01\x02')
+    assert parse_status_frames(buffer) == []
+    assert buffer == bytearray()
+
+
+# ---------------------------------------------------------------------- PrinterState
+
+def test_state_tracks_errors_and_counters():
+    state = PrinterState()
+    assert state.apply(STATUS_KEY_PAPER, 0x88)
+    assert not state.apply(STATUS_KEY_PAPER, 0x88)       # unverändert
+    assert not state.apply(STATUS_KEY_BATTERY, 55)
+    assert not state.apply(STATUS_KEY_PRINT_DONE, 0x0C)
+    assert not state.apply(0x7E, 0x00)
+    assert state.errors() == ['paper_out']
+    assert (state.battery, state.prints_done, state.unknown_frames) == (55, 1, 1)
+    assert state.apply(STATUS_KEY_PAPER, 0x89)
+    assert not state.has_error
+
+
+def test_unconfirmed_errors_expire():
+    state = PrinterState()
+    state.apply(STATUS_KEY_OVERHEAT, 0xA9)
+    state.apply(STATUS_KEY_PAPER, 0x88)
+    now = time.time()
+    state.error_seen_at['paper_out'] = now      # gerade per Abfrage bestätigt
+    state.error_seen_at['overheat'] = now - 200
+    assert state.expire_errors(120, now=now) == ['overheat']
+    assert state.errors() == ['paper_out']
+    assert state.clear_errors() == ['paper_out']
+    assert not state.has_error
+
+
+# ---------------------------------------------------------------------- Attrappe
+
+def test_query_answered_by_simulator(sim, session):
+    transport, reader = session
+    send = lambda command: transport.write(command) == len(command)
+
+    sim.set_condition('paper_out', True)
+    assert wait_for(lambda: reader.state.paper_out)
+
+    command, key = STATUS_QUERIES['paper']
+    assert reader.query(command, key, send, timeout=2.0) == 0x88
+    command, key = STATUS_QUERIES['battery']
+    assert reader.query(command, key, send, timeout=2.0) == sim.battery
+
+    sim.set_condition('paper_out', False)
+    command, key = STATUS_QUERIES['paper']
+    assert reader.query(command, key, send, timeout=2.0) == 0x89
+    assert not reader.state.has_error
+    assert wait_for(lambda: sim.get_stats()['queries_answered'] == 3)
+
+
+def test_status_split_across_reads(sim, session):
+    _, reader = session
+    os.write(sim.master, b'\x55\x1a\x05')
+    time.sleep(0.1)
+    assert not reader.state.cover_open
+    os.write(sim.master, b'\x99')
+    assert wait_for(lambda: reader.state.cover_open)
+
+
+def test_reopen_discards_latched_error(sim, session):
+    transport, reader = session
+    sim.set_condition('overheat', True)
+    assert wait_for(lambda: reader.state.overheat)
+    transport.reopen()
+    assert wait_for(lambda: not reader.state.overheat)
+
+
+# ---------------------------------------------------------------------- Queue-Pause
+
+@pytest.fixture
+def printer(sim, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(printer_controller, 'time', _FastTime())
+    monkeypatch.setattr(printer_controller, 'STATUS_QUERY_TIMEOUT', 0.2)
+    controller = printer_controller.EnhancedPhomemoM110('00:00:00:00:00:00', auto_start=False)
+    controller.job_store = None
+    controller.queue_pipeline = False
+    controller.rfcomm_device = sim.path
+    controller.manual_connect_bluetooth = lambda: False
+    controller.status_reader.poll_interval = 0.02
+    controller.status_reader.start()
+    controller.query_printer_status()               # Sitzung öffnen, Reader hängt sich an
+    yield controller
+    controller.queue_processor_running = False
+    controller.status_reader.stop()
+    controller.close_transport()
+
+
+def run_queue(controller, execute):
+    """Startet die Sende-Stufe mit execute statt _execute_print_job, liefert die Aufrufliste"""
+    calls = []
+
+    def fake_execute(job):
+        calls.append(job)
+        return execute(job, len(calls))
+
+    controller._execute_print_job = fake_execute
+    controller.queue_processor_running = True
+    thread = threading.Thread(target=controller._process_print_queue, daemon=True)
+    thread.start()
+    return calls
+
+
+def test_queue_pauses_on_paper_out_and_resumes(sim, printer):
+    sim.set_condition('paper_out', True)
+    assert wait_for(lambda: printer.printer_state.paper_out)
+
+    printer.queue_print_job('text', {'text': 'x'})
+    calls = run_queue(printer, lambda job, n: True)
+    time.sleep(0.3)
+    assert calls == []
+    assert printer.get_queue_status()['paused']
+
+    sim.set_condition('paper_out', False)
+    assert wait_for(lambda: len(calls) == 1)
+    assert calls[0].retry_count == 0
+    assert wait_for(lambda: printer.print_queue.unfinished_tasks == 0)
+
+
+def test_printer_error_during_job_does_not_count_as_retry(sim, printer):
+    def execute(job, attempt):
+        if attempt == 1:
+            sim.set_condition('cover_open', True)
+            wait_for(lambda: printer.printer_state.cover_open)
+            threading.Timer(0.3, sim.set_condition, ('cover_open', False)).start()
+            return False
+        return True
+
+    printer.queue_print_job('text', {'text': 'x'})
+    calls = run_queue(printer, execute)
+    assert wait_for(lambda: len(calls) == 2)
+    assert calls[1] is calls[0]
+    assert calls[1].retry_count == 0
+    assert printer.stats['failed_jobs'] == 0
+
+
+def test_latched_overheat_expires(sim, printer, monkeypatch):
+    monkeypatch.setattr(printer_controller, 'STATUS_ERROR_STALE_AFTER', 0.3)
+    sim.set_condition('overheat', True)
+    assert wait_for(lambda: printer.printer_state.overheat)
+
+    printer.queue_print_job('text', {'text': 'x'})
+    calls = run_queue(printer, lambda job, n: True)
+    assert wait_for(lambda: len(calls) == 1)
+    assert calls[0].retry_count == 0
+
+
+def test_pause_ends_when_connection_drops(sim, printer, tmp_path):
+    sim.set_condition('overheat', True)
+    assert wait_for(lambda: printer.printer_state.overheat)
+
+    reconnects = []
+
+    def reconnect():
+        # Wie _connect_release: Sitzung schließen, rfcomm neu binden
+        reconnects.append(time.monotonic())
+        printer.close_transport()
+        printer.rfcomm_device = sim.path
+        return True
+
+    printer.manual_connect_bluetooth = reconnect
+    # Nur die Warteschleife der Queue verbindet neu, nicht schon send_command der Statusabfrage
+    printer.connect_bluetooth = lambda force_reconnect=False: False
+    printer.queue_print_job('text', {'text': 'x'})
+    calls = run_queue(printer, lambda job, n: True)
+    time.sleep(0.2)
+    assert calls == []
+
+    printer.rfcomm_device = str(tmp_path / 'rfcomm-gone')
+    assert wait_for(lambda: len(calls) == 1)
+    assert reconnects
+    assert not printer.printer_state.has_error
+    assert calls[0].retry_count == 0
@@ -0,0 +1,120 @@
+"""
+Paritätstests für raster_engine
+numpy-, PIL-'1;I'- und reine Python-Packer müssen byte-identische Raster liefern
+"""
+
+import os
+import sys
+import random
+
+import pytest
+from PIL import Image, ImageDraw
+
+# Module liegen eine Ebene höher
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import raster_engine
+from raster_engine import (_pack_raster_numpy, _pack_raster_pil, _pack_raster_python,
+                           pack_image_to_raster, iter_raster_bands, compute_raster_stats)
+from config import PRINTER_WIDTH_PIXELS, PRINTER_BYTES_PER_LINE
+
+
+def random_image(width: int, height: int, seed: int) -> Image.Image:
+    rng = random.Random(seed)
+    data = bytes(rng.choice((0, 255)) for _ in range(width * height))
+    return Image.frombytes('L', (width, height), data).convert('1', dither=Image.Dither.NONE)
+
+
+def lines_and_text(width: int) -> Image.Image:
+    img = Image.new('1', (width, 64), 1)
+    draw = ImageDraw.Draw(img)
+    for x in range(0, width, 7):
+        draw.line([x, 0, x, 63], fill=0)
+    draw.rectangle([3, 10, width - 4, 20], outline=0)
+    draw.text((10, 30), "PARITY 0123", fill=0)
+    return img
+
+
+def byte_edges(width: int) -> Image.Image:
+    # Einzelne Bits an Byte-Grenzen (MSB/LSB-Vertauschungen fallen hier auf)
+    img = Image.new('1', (width, 16), 1)
+    for y in range(16):
+        img.putpixel((y, y), 0)
+        img.putpixel((width - 1 - y, y), 0)
+        img.putpixel((8 * y + 7, y), 0)
+    return img
+
+
+def dithered_gradient(width: int) -> Image.Image:
+    return Image.linear_gradient('L').resize((width, 80)).convert('1', dither=Image.Dither.FLOYDSTEINBERG)
+
+
+PATTERNS = {
+    'all_white': lambda w: Image.new('1', (w, 40), 1),
+    'all_black': lambda w: Image.new('1', (w, 40), 0),
+    'random': lambda w: random_image(w, 24, w),
+    'lines_text': lines_and_text,
+    'byte_edges': byte_edges,
+    'dithered_gradient': dithered_gradient,
+}
+
+ENCODERS = {'pil': _pack_raster_pil}
+if raster_engine.HAS_NUMPY:
+    ENCODERS['numpy'] = _pack_raster_numpy
+
+
+@pytest.mark.parametrize('pattern', sorted(PATTERNS))
+@pytest.mark.parametrize('encoder', sorted(ENCODERS))
+def test_packers_match_python_reference(pattern, encoder):
+    img = PATTERNS[pattern](PRINTER_WIDTH_PIXELS)
+    assert ENCODERS[encoder](img) == _pack_raster_python(img, PRINTER_BYTES_PER_LINE)
+
+
+@pytest.mark.parametrize('width', [1, 7, 9, 13, 383, 385])
+@pytest.mark.parametrize('encoder', sorted(ENCODERS))
+def test_packers_match_on_odd_widths(width, encoder):
+    # Letztes Byte je Zeile wird mit weißen (0-)Bits aufgefüllt
+    for img in (random_image(width, 9, width), Image.new('1', (width, 3), 0), Image.new('1', (width, 3), 1)):
+        assert ENCODERS[encoder](img) == _pack_raster_python(img, (width + 7) // 8)
+
+
+@pytest.mark.parametrize('pattern', sorted(PATTERNS))
+def test_stream_bands_match_bulk_packing(pattern):
+    img = PATTERNS[pattern](PRINTER_WIDTH_PIXELS)
+    streamed = b''.join(iter_raster_bands(img, PRINTER_BYTES_PER_LINE, band_lines=7))
+    assert streamed == pack_image_to_raster(img)
+
+
+@pytest.mark.parametrize('pattern', sorted(PATTERNS))
+def test_without_numpy(monkeypatch, pattern):
+    img = PATTERNS[pattern](PRINTER_WIDTH_PIXELS)
+    expected_raster = pack_image_to_raster(img)
+    expected_stats = compute_raster_stats(expected_raster)
+
+    monkeypatch.setattr(raster_engine, 'HAS_NUMPY', False)
+    raster = pack_image_to_raster(img)
+    assert raster == expected_raster == _pack_raster_python(img)
+
+    stats = compute_raster_stats(raster)
+    assert stats.nonzero_bytes == expected_stats.nonzero_bytes
+    assert stats.black_pixels == expected_stats.black_pixels
+    assert list(stats.line_popcounts) == list(expected_stats.line_popcounts)
+    assert stats.blank_runs == expected_stats.blank_runs
+
+
+def test_python_fallback_when_pil_encoder_fails(monkeypatch):
+    img = PATTERNS['random'](PRINTER_WIDTH_PIXELS)
+
+    def broken(_img):
+        raise ValueError('encoder unavailable')
+
+    monkeypatch.setattr(raster_engine, 'HAS_NUMPY', False)
+    monkeypatch.setattr(raster_engine, '_pack_raster_pil', broken)
+    assert pack_image_to_raster(img) == _pack_raster_python(img)
+
+
+def test_all_black_and_white_stats():
+    black = compute_raster_stats(pack_image_to_raster(PATTERNS['all_black'](PRINTER_WIDTH_PIXELS)))
+    white = compute_raster_stats(pack_image_to_raster(PATTERNS['all_white'](PRINTER_WIDTH_PIXELS)))
+    assert black.complexity == 1.0 and black.bit_density == 1.0 and black.blank_runs == []
+    assert white.complexity == 0.0 and white.blank_runs == [(0, 40)]
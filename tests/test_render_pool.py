@@ -0,0 +1,55 @@
+"""
+Tests für den Render-Prozesspool
+Nach einem Worker-Absturz darf der Pool nicht aus laufenden Threads neu forken
+"""
+
+import os
+import sys
+
+import pytest
+
+# Module liegen eine Ebene höher
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from render_pool import RenderPool, RenderPoolUnavailable
+
+
+def crash_worker():
+    os._exit(1)
+
+
+@pytest.fixture
+def pool():
+    pool = RenderPool(workers=1, timeout=10.0)
+    yield pool
+    pool.stop()
+
+
+def test_not_started_is_unavailable(pool):
+    with pytest.raises(RenderPoolUnavailable):
+        pool.run(os.getpid)
+
+
+def test_runs_in_worker_process(pool):
+    pool.start()
+    assert pool.run(os.getpid) != os.getpid()
+    assert pool.get_status()['completed'] >= 1
+
+
+def test_worker_crash_disables_pool_without_refork(pool):
+    pool.start()
+    with pytest.raises(RenderPoolUnavailable):
+        pool.run(crash_worker)
+
+    assert not pool.running
+    assert pool.get_status()['crashes'] == 1
+    # Weitere Aufträge rendern lokal statt einen neuen Pool zu forken
+    with pytest.raises(RenderPoolUnavailable, match='disabled'):
+        pool.run(os.getpid)
+    assert pool._executor is None
+
+    # Erst ein expliziter start() (Dienststart, vor den Threads) forkt neu
+    pool.start()
+    assert pool.running
+    assert pool.get_status()['disabled_reason'] is None
+    assert pool.run(os.getpid) != os.getpid()
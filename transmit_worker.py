@@ -0,0 +1,112 @@
+"""
+Sende-Thread für Phomemo M110
+Führt alle Rasterübertragungen in einem eigenen, optional höher priorisierten Thread aus
+Wird von printer_controller.py verwendet
+"""
+
+import os
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TransmitWorker:
+    """
+    Dedizierter Thread für zeitkritische Übertragungen
+
+    Aufrufer übergeben eine Funktion per run() und warten auf deren Ergebnis;
+    das Pacing läuft so in einem Thread, der nicht mit Flask-Requests oder
+    der Bildverarbeitung der Queue konkurriert. Beim Start wird optional die
+    Priorität angehoben (nice-Wert oder SCHED_FIFO) - ohne Rechte dafür
+    läuft der Thread mit normaler Priorität weiter.
+
+    Args:
+        nice: Ziel-nice-Wert des Threads (z.B. -5), None = unverändert
+        realtime_priority: SCHED_FIFO-Priorität (1-99), None = aus
+    """
+
+    def __init__(self, nice: Optional[int] = None, realtime_priority: Optional[int] = None,
+                 name: str = 'phomemo-transmit'):
+        self.nice = nice
+        self.realtime_priority = realtime_priority
+        self.name = name
+        self.priority = 'normal'
+        self._jobs: 'queue.Queue' = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.jobs_run = 0
+
+    def _raise_priority(self):
+        """Hebt die Priorität des aktuellen Threads an (Linux: pro Thread über die TID)"""
+        if self.realtime_priority and hasattr(os, 'sched_setscheduler'):
+            try:
+                os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(int(self.realtime_priority)))
+                self.priority = f'SCHED_FIFO {self.realtime_priority}'
+                return
+            except (OSError, PermissionError) as e:
+                logger.warning(f"⚠️ SCHED_FIFO not permitted for transmit thread: {e}")
+        if self.nice is not None and hasattr(os, 'setpriority'):
+            try:
+                os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), int(self.nice))
+                self.priority = f'nice {self.nice}'
+            except (OSError, PermissionError) as e:
+                logger.warning(f"⚠️ Could not set transmit thread nice {self.nice}: {e}")
+
+    def _run(self):
+        self._raise_priority()
+        logger.info(f"📡 Transmit thread started ({self.priority})")
+        while True:
+            item = self._jobs.get()
+            if item is None:
+                break
+            future, fn, args, kwargs = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                self.jobs_run += 1
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None and thread.is_alive():
+            self._jobs.put(None)
+            thread.join(timeout=timeout)
+
+    def in_worker_thread(self) -> bool:
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """Reiht fn in den Sende-Thread ein (startet ihn bei Bedarf)"""
+        self.start()
+        future: Future = Future()
+        self._jobs.put((future, fn, args, kwargs))
+        return future
+
+    def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Führt fn im Sende-Thread aus und wartet auf das Ergebnis (direkt, falls schon dort)"""
+        if self.in_worker_thread():
+            return fn(*args, **kwargs)
+        return self.submit(fn, *args, **kwargs).result()
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            'running': self._thread is not None and self._thread.is_alive(),
+            'priority': self.priority,
+            'pending': self._jobs.qsize(),
+            'jobs_run': self.jobs_run,
+        }
@@ -0,0 +1,351 @@
+"""
+Transport-Sitzung für Phomemo M110
+Hält genau einen offenen Kanal zum Drucker (/dev/rfcomm0 oder RFCOMM-Socket)
+Wird von printer_controller.py verwendet
+"""
+
+import os
+import time
+import errno
+import select
+import socket
+import logging
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from flow_control import output_queue_depth
+
+logger = logging.getLogger(__name__)
+
+# Fehler, nach denen der Kanal tot ist und neu geöffnet werden muss
+RECOVERABLE_ERRNOS = {
+    errno.EIO, errno.EPIPE, errno.EBADF, errno.ENODEV, errno.ENXIO,
+    errno.ENOTCONN, errno.ECONNRESET, errno.ECONNABORTED, errno.EHOSTDOWN,
+}
+
+# Maximale Pufferzahl je writev-Aufruf
+try:
+    IOV_MAX = os.sysconf('SC_IOV_MAX')
+except (ValueError, OSError, AttributeError):
+    IOV_MAX = 1024
+
+
+class PrinterTransport:
+    """
+    Langlebige Transport-Sitzung: ein fd bzw. ein Socket für alle Schreibzugriffe
+
+    send_command, send_bitmap und Heartbeats teilen sich die Sitzung - kein
+    open()/connect() mehr pro Kommando. Bei EIO/EPIPE (Verbindung abgerissen,
+    rfcomm neu gebunden) wird einmal automatisch neu geöffnet und der Puffer
+    von vorn geschrieben - ein Rest ab der Abbruchstelle wäre für den Drucker
+    auf dem neuen Kanal ein abgeschnittenes Kommando.
+
+    Mit set_nonblocking(True) läuft der Kanal nicht-blockierend (asyncio-
+    Engine, siehe async_engine.py); die synchronen Schreibmethoden warten dann
+    per select() auf Platz im Puffer.
+
+    Nicht thread-sicher: Aufrufer serialisieren (EnhancedPhomemoM110._comm_lock).
+    """
+
+    def __init__(self, device: str, mac_address: str, channel: int = 1,
+                 use_socket: bool = False, connect_timeout: float = 10.0, read_access: bool = False):
+        self.device = device
+        self.mac_address = mac_address
+        self.channel = int(channel)
+        self.use_socket = use_socket
+        self.connect_timeout = float(connect_timeout)
+        self.read_access = read_access   # Gerät lesend öffnen (Status-Rückkanal)
+        self.nonblocking = False
+
+        self._fd: Optional[int] = None
+        self._sock: Optional[socket.socket] = None
+        self.opened_at: Optional[float] = None
+        self.stats = {
+            'opens': 0,
+            'reopens': 0,
+            'bytes_written': 0,
+            'writev_calls': 0,
+            'write_errors': 0,
+            'last_error': None,
+        }
+
+    # ------------------------------------------------------------------ Sitzung
+
+    @property
+    def is_open(self) -> bool:
+        return self._fd is not None or self._sock is not None
+
+    def open(self) -> 'PrinterTransport':
+        """Öffnet den Kanal (no-op, falls bereits offen)"""
+        if self.is_open:
+            return self
+
+        if self.use_socket:
+            # AF_BLUETOOTH und BTPROTO_RFCOMM gibt es nur unter Linux
+            sock = socket.socket(socket.AF_BLUETOOTH, socket.SOCK_STREAM, socket.BTPROTO_RFCOMM)
+            try:
+                sock.settimeout(self.connect_timeout)
+                sock.connect((self.mac_address, self.channel))
+                sock.settimeout(None)
+            except Exception:
+                sock.close()
+                raise
+            self._sock = sock
+            logger.info(f"🔌 Transport opened: RFCOMM socket {self.mac_address}:{self.channel}")
+        else:
+            mode = os.O_RDWR if self.read_access else os.O_WRONLY
+            self._fd = os.open(self.device, mode | os.O_NOCTTY)
+            logger.info(f"🔌 Transport opened: {self.device} (fd {self._fd})")
+
+        self._apply_blocking()
+        self.opened_at = time.time()
+        self.stats['opens'] += 1
+        return self
+
+    def close(self):
+        """Schließt den Kanal (Fehler beim Schließen werden ignoriert)"""
+        if self._fd is not None:
+            try:
+                os.close(self._fd)
+            except OSError:
+                pass
+            self._fd = None
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+        self.opened_at = None
+
+    def fileno(self) -> Optional[int]:
+        if self._sock is not None:
+            return self._sock.fileno()
+        return self._fd
+
+    def _apply_blocking(self):
+        if self._sock is not None:
+            self._sock.setblocking(not self.nonblocking)
+        elif self._fd is not None:
+            os.set_blocking(self._fd, not self.nonblocking)
+
+    def set_nonblocking(self, nonblocking: bool = True):
+        """Schaltet den Kanal (auch künftig geöffnete) auf nicht-blockierend um"""
+        if nonblocking != self.nonblocking:
+            self.nonblocking = nonblocking
+            self._apply_blocking()
+
+    def reopen(self) -> 'PrinterTransport':
+        self.close()
+        self.stats['reopens'] += 1
+        return self.open()
+
+    def retarget(self, device: str):
+        """Wechselt das Gerät (z.B. anderes rfcomm-Device) - schließt eine offene Sitzung"""
+        if device != self.device:
+            self.close()
+            self.device = device
+
+    def check_health(self) -> bool:
+        """
+        Prüft, ob der offene Kanal noch benutzbar ist
+
+        fd: Gerät existiert noch und fstat gelingt. Socket: kein anstehender
+        Socket-Fehler. Ein toter Kanal wird geschlossen (nächster Write öffnet neu).
+        """
+        if not self.is_open:
+            return False
+        try:
+            if self._sock is not None:
+                if self._sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR) != 0:
+                    raise OSError(errno.ENOTCONN, 'socket error pending')
+            else:
+                if not os.path.exists(self.device):
+                    raise OSError(errno.ENODEV, f'{self.device} vanished')
+                os.fstat(self._fd)
+            return True
+        except OSError as e:
+            logger.warning(f"⚠️ Transport unhealthy, closing: {e}")
+            self.stats['last_error'] = str(e)
+            self.close()
+            return False
+
+    # ------------------------------------------------------------------ Schreiben
+
+    def _wait_writable(self):
+        """Nicht-blockierender Kanal voll: synchron auf Platz warten"""
+        select.select([], [self.fileno()], [])
+
+    def _write_once(self, data: memoryview) -> int:
+        if self._sock is not None:
+            return self._sock.send(data)
+        return os.write(self._fd, data)
+
+    def write(self, data: bytes, reopen: bool = True) -> int:
+        """
+        Schreibt alle Bytes; öffnet bei Bedarf und einmalig neu nach EIO/EPIPE
+
+        Nach dem Neuöffnen wird der komplette Puffer erneut gesendet, nicht nur
+        der Rest ab der Abbruchstelle.
+
+        Mit reopen=False wird nach einem Fehler nur geschlossen und der Fehler
+        weitergereicht (Aufrufer wiederholt selbst, z.B. bandweise).
+
+        Returns:
+            int: Anzahl geschriebener Bytes (== len(data))
+        """
+        view = memoryview(data)
+        written = 0
+        reopened = False
+        if not self.is_open:
+            self.open()
+
+        while written < len(view):
+            try:
+                n = self._write_once(view[written:])
+            except BlockingIOError:
+                self._wait_writable()
+                continue
+            except OSError as e:
+                self.stats['write_errors'] += 1
+                self.stats['last_error'] = str(e)
+                if reopen and e.errno in RECOVERABLE_ERRNOS and not reopened:
+                    logger.warning(f"⚠️ Transport write failed ({e}) after {written}/{len(view)} bytes, "
+                                   f"reopening and restarting the buffer")
+                    reopened = True
+                    self.reopen()
+                    self.stats['bytes_written'] += written
+                    written = 0
+                    continue
+                self.close()
+                raise
+            written += n
+
+        self.stats['bytes_written'] += written
+        return written
+
+    def _writev_once(self, buffers: List[memoryview]) -> int:
+        if self._sock is not None:
+            return self._sock.sendmsg(buffers)
+        return os.writev(self._fd, buffers)
+
+    def writev(self, buffers: Sequence[bytes], reopen: bool = True) -> int:
+        """
+        Schreibt mehrere Puffer mit möglichst wenigen Syscalls (os.writev / sendmsg)
+
+        Teilschreibvorgänge werden fortgesetzt; Fehlerbehandlung wie write()
+        (nach dem Neuöffnen alle Puffer von vorn).
+
+        Returns:
+            int: Anzahl geschriebener Bytes
+        """
+        views = [memoryview(b) for b in buffers if len(b)]
+        pending = list(views)
+        total = sum(len(b) for b in pending)
+        written = 0
+        reopened = False
+        if not self.is_open:
+            self.open()
+
+        while pending:
+            try:
+                n = self._writev_once(pending[:IOV_MAX])
+            except BlockingIOError:
+                self._wait_writable()
+                continue
+            except OSError as e:
+                self.stats['write_errors'] += 1
+                self.stats['last_error'] = str(e)
+                if reopen and e.errno in RECOVERABLE_ERRNOS and not reopened:
+                    logger.warning(f"⚠️ Transport writev failed ({e}) after {written}/{total} bytes, "
+                                   f"reopening and restarting the buffers")
+                    reopened = True
+                    self.reopen()
+                    self.stats['bytes_written'] += written
+                    written = 0
+                    pending = list(views)
+                    continue
+                self.close()
+                raise
+            self.stats['writev_calls'] += 1
+            written += n
+            # Vollständig geschriebene Puffer verwerfen, angefangenen kürzen
+            while pending and n >= len(pending[0]):
+                n -= len(pending[0])
+                pending.pop(0)
+            if n:
+                pending[0] = pending[0][n:]
+
+        self.stats['bytes_written'] += written
+        return written
+
+    def send_some(self, buffers: Sequence[memoryview]) -> int:
+        """
+        Ein einzelner writev/sendmsg-Aufruf ohne Wiederholung (für die asyncio-Engine)
+
+        Raises:
+            BlockingIOError: Kanal nicht-blockierend und Puffer voll
+            OSError: Kanal tot - die Sitzung wird geschlossen
+        """
+        if not self.is_open:
+            self.open()
+        try:
+            n = self._writev_once(list(buffers[:IOV_MAX]))
+        except BlockingIOError:
+            raise
+        except OSError as e:
+            self.stats['write_errors'] += 1
+            self.stats['last_error'] = str(e)
+            self.close()
+            raise
+        self.stats['writev_calls'] += 1
+        self.stats['bytes_written'] += n
+        return n
+
+    def write_chunked(self, data: bytes, chunk_size: int, inter_chunk_sleep: float = 0.0,
+                      wait: Optional[Callable[[int], Any]] = None, reopen: bool = True) -> int:
+        """
+        Schreibt in Chunks mit optionaler Pause dazwischen (Host-Puffer schonen)
+
+        Mit wait (Pacer.pace, bekommt die Chunk-Größe) wird vor jedem Chunk
+        gewartet statt danach fest geschlafen. Reißt der Kanal ab, wird einmal
+        neu geöffnet und ab dem ersten Chunk neu gesendet (wie write()); mit
+        reopen=False wird der Fehler weitergereicht (Teilstück eines Rasters).
+        """
+        chunk_size = max(1, int(chunk_size))
+        reopened = False
+        while True:
+            written = 0
+            try:
+                for offset in range(0, len(data), chunk_size):
+                    chunk = data[offset:offset + chunk_size]
+                    if wait is not None:
+                        wait(len(chunk))
+                    written += self.write(chunk, reopen=False)
+                    if wait is None and inter_chunk_sleep > 0:
+                        time.sleep(inter_chunk_sleep)
+                return written
+            except OSError as e:
+                if not reopen or reopened or e.errno not in RECOVERABLE_ERRNOS:
+                    raise
+                logger.warning(f"⚠️ Transport write failed ({e}) after {written}/{len(data)} bytes, "
+                               f"reopening and restarting the buffer")
+                reopened = True
+                self.reopen()
+
+    def output_queue(self) -> Optional[int]:
+        """Bytes im Kernel-Ausgabepuffer (TIOCOUTQ/SIOCOUTQ), None wenn unbekannt"""
+        if self._sock is not None:
+            return output_queue_depth(self._sock.fileno())
+        if self._fd is not None:
+            return output_queue_depth(self._fd)
+        return None
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            'open': self.is_open,
+            'kind': 'socket' if self.use_socket else 'device',
+            'nonblocking': self.nonblocking,
+            'target': f'{self.mac_address}:{self.channel}' if self.use_socket else self.device,
+            'open_since': self.opened_at,
+            **self.stats,
+        }
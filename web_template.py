@@ -206,6 +206,19 @@ WEB_INTERFACE = '''
                         </select>
                     </div>
                 </div>
+                <div class="row" style="margin-bottom:12px">
+                    <div>
+                        <label style="font-size:13px;color:var(--text2)">Dither-Verfahren</label>
+                        <select id="ditherAlgorithm" onchange="updatePreview()" style="width:100%">
+                            <option value="">Standard (Einstellungen)</option>
+                            <option value="floyd_steinberg">Floyd-Steinberg</option>
+                            <option value="atkinson">Atkinson (heller)</option>
+                            <option value="bayer">Bayer (Raster)</option>
+                            <option value="blue_noise">Blue Noise</option>
+                            <option value="auto">Automatisch</option>
+                        </select>
+                    </div>
+                </div>
                 <div class="btn-row">
                     <button class="btn btn-primary" onclick="printImage(false)" id="printImageBtn" disabled>🖨️ Drucken</button>
                     <button class="btn btn-outline" onclick="printImage(true)" id="queueImageBtn" disabled>📤 In Queue</button>
@@ -250,6 +263,16 @@ WEB_INTERFACE = '''
                     <input type="range" id="ditherStrength" value="1.0" min="0.1" max="2.0" step="0.1" oninput="this.nextElementSibling.textContent=this.value">
                     <span style="font-weight:600;min-width:30px">1.0</span>
                 </div>
+                <div class="setting-row">
+                    <label>Dither-Verfahren</label>
+                    <select id="ditherAlgorithmGlobal" style="width:180px">
+                        <option value="floyd_steinberg">Floyd-Steinberg</option>
+                        <option value="atkinson">Atkinson (heller)</option>
+                        <option value="bayer">Bayer (Raster)</option>
+                        <option value="blue_noise">Blue Noise</option>
+                        <option value="auto">Automatisch (Dichte-Budget)</option>
+                    </select>
+                </div>
                 <div class="setting-row">
                     <label>Kontrast</label>
                     <input type="range" id="contrastBoost" value="1.0" min="0.5" max="2.0" step="0.1" oninput="this.nextElementSibling.textContent=this.value">
@@ -286,6 +309,7 @@ WEB_INTERFACE = '''
 
 <script>
 let currentImageData = null;
+let currentPreviewToken = null;
 let textPreviewTimeout;
 
 // === THEME ===
@@ -379,6 +403,7 @@ function updateSettingsFromData(s) {
         el.nextElementSibling.textContent = s.contrast_boost;
     }
     if (s.dither_enabled !== undefined) document.getElementById('enableDitherGlobal').checked = s.dither_enabled;
+    if (s.dither_algorithm !== undefined) document.getElementById('ditherAlgorithmGlobal').value = s.dither_algorithm;
     if (s.label_size !== undefined) {
         document.getElementById('labelSize').value = s.label_size;
         labelSizeChanged();
@@ -402,6 +427,7 @@ function saveSettings() {
         dither_threshold: parseInt(document.getElementById('ditherThreshold').value),
         dither_enabled: document.getElementById('enableDitherGlobal').checked,
         dither_strength: parseFloat(document.getElementById('ditherStrength').value),
+        dither_algorithm: document.getElementById('ditherAlgorithmGlobal').value,
         contrast_boost: parseFloat(document.getElementById('contrastBoost').value)
     };
     fetch('/api/settings', {method:'POST', headers:{'Content-Type':'application/json'}, body:JSON.stringify(s)})
@@ -433,7 +459,7 @@ function updateTextPreview() {
         if (d.success) {
             document.getElementById('textPreviewPlaceholder').style.display = 'none';
             const img = document.getElementById('textPreviewImage');
-            img.src = 'data:image/png;base64,' + d.preview_base64;
+            img.src = d.preview_url;
             img.style.display = 'block';
             document.getElementById('textInfo').textContent = d.info.width + '×' + d.info.height + 'px | ' + d.info.font_size + 'px ' + d.info.alignment;
             document.getElementById('textInfo').style.display = '';
@@ -469,12 +495,13 @@ function uploadAndPreview() {
     fd.append('maintain_aspect', document.getElementById('maintainAspect').checked);
     fd.append('enable_dither', document.getElementById('enableDither').checked);
     fd.append('scaling_mode', document.getElementById('scalingMode').value);
+    fd.append('dither_algorithm', document.getElementById('ditherAlgorithm').value);
     toast('Erstelle Vorschau...', 'info');
     fetch('/api/preview-image', {method:'POST', body:fd}).then(r=>r.json()).then(d => {
         if (d.success) {
             document.getElementById('previewPlaceholder').style.display = 'none';
             const img = document.getElementById('previewImage');
-            img.src = 'data:image/png;base64,' + d.preview_base64;
+            img.src = d.preview_url;
             img.style.display = 'block';
             document.getElementById('imageInfo').textContent =
                 d.info.original_width + '×' + d.info.original_height + ' → ' +
@@ -483,6 +510,7 @@ function uploadAndPreview() {
             document.getElementById('printImageBtn').disabled = false;
             document.getElementById('queueImageBtn').disabled = false;
             currentImageData = file;
+            currentPreviewToken = d.preview_token || null;
             toast('✅ Vorschau fertig', 'success');
         } else { toast('❌ ' + (d.error||''), 'error'); }
     }).catch(e => toast('Fehler: ' + e, 'error'));
@@ -501,6 +529,19 @@ function applyDitherPreset() {
 }
 function printImage(queue) {
     if (!currentImageData) { toast('Kein Bild!', 'error'); return; }
+    if (currentPreviewToken) {
+        // Vorschau-Raster direkt drucken - kein erneuter Upload
+        toast('Drucke Bild...', 'info');
+        fetch('/api/print-token', {method:'POST', headers:{'Content-Type':'application/json'},
+                                   body:JSON.stringify({token: currentPreviewToken, use_queue: queue})})
+            .then(r => r.json().then(d => ({status: r.status, d})))
+            .then(({status, d}) => {
+                if (status === 410) { currentPreviewToken = null; printImage(queue); return; }
+                toast(d.success ? '✅ Gedruckt!' : '❌ ' + (d.error||''), d.success ? 'success' : 'error');
+            })
+            .catch(() => toast('Druckfehler', 'error'));
+        return;
+    }
     const fd = new FormData();
     fd.append('image', currentImageData);
     fd.append('immediate', queue ? 'false' : 'true');
@@ -508,6 +549,7 @@ function printImage(queue) {
     fd.append('maintain_aspect', document.getElementById('maintainAspect').checked);
     fd.append('enable_dither', document.getElementById('enableDither').checked);
     fd.append('scaling_mode', document.getElementById('scalingMode').value);
+    fd.append('dither_algorithm', document.getElementById('ditherAlgorithm').value);
     toast('Drucke Bild...', 'info');
     fetch('/api/print-image', {method:'POST', body:fd}).then(r=>r.json())
         .then(d => toast(d.success ? '✅ Gedruckt!' : '❌ ' + (d.error||''), d.success ? 'success' : 'error'))
@@ -0,0 +1,282 @@
+"""
+Write-Plan für Phomemo M110
+Fasst Init, GS v 0 Header und Rasterzeilen zu wenigen zusammenhängenden
+Segmenten zusammen, getrennt nur durch die nötigen Pacing-Punkte
+Wird von printer_controller.py verwendet
+"""
+
+import time
+import itertools
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from config import (ADAPTIVE_LINE_TIMING, ADAPTIVE_LINE_BASE_DELAY_MS, ADAPTIVE_LINE_MAX_EXTRA_MS,
+                    ADAPTIVE_LINE_DENSITY_THRESHOLD, WRITE_PLAN_MAX_SEGMENT_BYTES,
+                    WRITE_PLAN_KEEP_INIT_DELAY, WRITE_PLAN_MIN_PAUSE_MS, BLANK_ELISION_MIN_LINES)
+from raster_engine import line_popcount
+
+logger = logging.getLogger(__name__)
+
+ESC_INIT = b'\x1b\x40'
+
+
+def raster_header(width_bytes: int, height: int, mode: int = 0) -> bytes:
+    """GS v 0 Header: 1D 76 30 m xL xH yL yH"""
+    return bytes([
+        0x1D, 0x76, 0x30, mode,
+        width_bytes & 0xFF, (width_bytes >> 8) & 0xFF,
+        height & 0xFF, (height >> 8) & 0xFF
+    ])
+
+
+@dataclass
+class WriteSegment:
+    """Zusammenhängende Puffer (ein writev) mit anschließender Pause"""
+    buffers: List[bytes]
+    pause: float = 0.0            # Sekunden nach dem Schreiben
+    lines: int = 0                # enthaltene Rasterzeilen
+    reason: str = ''              # Grund des Pacing-Punkts (init, dense, batch, band)
+    band: int = -1                # Index des Bands (-1: Init vor dem ersten Band)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(b) for b in self.buffers)
+
+
+@dataclass
+class WritePlanSummary:
+    """Kennzahlen eines abgearbeiteten Plans"""
+    segments: int = 0
+    bytes: int = 0
+    lines: int = 0
+    planned_pause: float = 0.0
+    pacing_points: Dict[str, int] = field(default_factory=dict)
+
+    def add(self, segment: WriteSegment):
+        self.segments += 1
+        self.bytes += segment.nbytes
+        self.lines += segment.lines
+        self.planned_pause += segment.pause
+        if segment.pause > 0:
+            self.pacing_points[segment.reason] = self.pacing_points.get(segment.reason, 0) + 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'segments': self.segments,
+            'bytes': self.bytes,
+            'lines': self.lines,
+            'planned_pause_s': round(self.planned_pause, 4),
+            'pacing_points': dict(self.pacing_points),
+        }
+
+
+class BandTracker:
+    """
+    Buchführung für bandweises Senden eines Write-Plans
+
+    Merkt sich die schon geschriebenen Segmente des laufenden Bands (für eine
+    Wiederholung ab dessen Header), zählt Versuche und misst die Dauer je Band.
+
+    Args:
+        bands: Band-Folge des Plans (art, start, zeilen)
+        retries: Wiederholungen je Band
+        backoff: erste Wartezeit vor einer Wiederholung (s), verdoppelt sich
+    """
+
+    def __init__(self, bands: Sequence[Tuple[str, int, int]], retries: int, backoff: float):
+        self.bands = bands
+        self.retries = int(retries)
+        self.backoff = float(backoff)
+        self.segments: List[WriteSegment] = []
+        self.attempts = 1
+        self.total_retries = 0
+        self.timings: List[Dict[str, Any]] = []
+        self._start = 0.0
+
+    def begin(self, segment: WriteSegment) -> List[WriteSegment]:
+        """Nimmt das nächste Segment auf (schließt ggf. das vorige Band ab), liefert die zu schreibenden Segmente"""
+        if not self.segments or segment.band != self.segments[0].band:
+            self.close()
+            self._start = time.perf_counter()
+            self.attempts = 1
+        self.segments.append(segment)
+        return [segment]
+
+    def retry(self, error: Exception) -> Optional[float]:
+        """Back-off vor der nächsten Wiederholung des laufenden Bands, None wenn ausgeschöpft"""
+        if not self.segments or self.attempts > self.retries:
+            return None
+        backoff = self.backoff * (2 ** (self.attempts - 1))
+        logger.warning(f"⚠️ Band {self.segments[0].band} write failed ({error}), "
+                       f"retry {self.attempts}/{self.retries} in {backoff * 1000:.0f}ms")
+        self.attempts += 1
+        self.total_retries += 1
+        return backoff
+
+    def close(self):
+        """Schließt das laufende Band ab und protokolliert Dauer, Bytes und Versuche"""
+        if not self.segments:
+            return
+        band_idx = self.segments[0].band
+        kind, start, lines = self.bands[band_idx] if band_idx >= 0 else ('init', 0, 0)
+        self.timings.append({
+            'band': band_idx, 'kind': kind, 'start': start, 'lines': lines,
+            'bytes': sum(seg.nbytes for seg in self.segments),
+            'attempts': self.attempts,
+            'ms': round((time.perf_counter() - self._start) * 1000, 2),
+        })
+        self.segments = []
+
+
+def plan_raster_bands(height: int, blank_runs: Sequence[Tuple[int, int]],
+                      min_blank_lines: int = BLANK_ELISION_MIN_LINES) -> List[Tuple[str, int, int]]:
+    """
+    Zerlegt ein Raster in Druck- und Vorschub-Bänder
+
+    Leerzeilen-Runs ab min_blank_lines (führend, innen, abschließend) werden
+    zu 'feed'-Bändern, der Rest zu 'print'-Bändern mit eigenem GS v 0 Header.
+
+    Returns:
+        Liste von (art, startzeile, zeilen) mit art 'print' oder 'feed'
+    """
+    bands = []
+    cursor = 0
+    for start, length in blank_runs:
+        if length < min_blank_lines:
+            continue
+        if start > cursor:
+            bands.append(('print', cursor, start - cursor))
+        bands.append(('feed', start, length))
+        cursor = start + length
+    if cursor < height:
+        bands.append(('print', cursor, height - cursor))
+    return bands
+
+
+def split_bands(bands: Sequence[Tuple[str, int, int]], max_lines: int) -> List[Tuple[str, int, int]]:
+    """Teilt Druck-Bänder in Stücke von höchstens max_lines Zeilen (0 = nicht teilen)"""
+    if max_lines <= 0:
+        return list(bands)
+    result = []
+    for kind, start, length in bands:
+        if kind != 'print':
+            result.append((kind, start, length))
+            continue
+        for offset in range(0, length, max_lines):
+            result.append(('print', start + offset, min(max_lines, length - offset)))
+    return result
+
+
+def feed_command(lines: int) -> bytes:
+    """ESC J n (Vorschub um n Punktzeilen), bei mehr als 255 Zeilen mehrfach"""
+    out = bytearray()
+    while lines > 0:
+        step = min(lines, 255)
+        out += bytes([0x1B, 0x4A, step])
+        lines -= step
+    return bytes(out)
+
+
+def iter_write_plan(rows: Iterable[bytes], height: int, width_bytes: int, timing_config: Dict[str, Any],
+                    popcount: Optional[Callable[[int, bytes], int]] = None,
+                    max_segment_bytes: int = WRITE_PLAN_MAX_SEGMENT_BYTES,
+                    bands: Optional[Sequence[Tuple[str, int, int]]] = None) -> Iterator[WriteSegment]:
+    """
+    Erzeugt den Write-Plan eines Rasterjobs als Segment-Folge (lazy, streaming-fähig)
+
+    Pacing-Punkte bleiben nur dort, wo das Zeilen-Timing sie braucht:
+    - nach ESC @ (init_delay, der Drucker setzt sich zurück) - abschaltbar
+    - nach Zeilen über ADAPTIVE_LINE_DENSITY_THRESHOLD (Dichte-Zuschlag)
+    - am Segment-Ende (max_segment_bytes) mit den aufgelaufenen Grundpausen
+    Der Header gehört zum selben GS v 0 Kommando wie die Daten und wird direkt
+    mit den ersten Zeilen geschrieben (kein header_delay). Pausen unter
+    WRITE_PLAN_MIN_PAUSE_MS werden ins nächste Segment übertragen statt
+    einzeln geschlafen - die Summe der Pausen bleibt erhalten.
+
+    Mit bands (siehe plan_raster_bands, split_bands) bekommt jedes Druck-Band
+    einen eigenen GS v 0 Header; Vorschub-Bänder werden als ESC J gesendet,
+    ihre Zeilen aus rows übersprungen und nicht gepaced. Segmente reichen nie
+    über eine Bandgrenze - ein Band lässt sich so als Ganzes wiederholen.
+
+    Ohne ADAPTIVE_LINE_TIMING wird blockweise (480 Bytes, block_delay) geplant.
+
+    Args:
+        rows: Rasterzeilen zu je width_bytes
+        popcount: popcount(line_idx, line) -> gesetzte Bits (Standard: zählen)
+        bands: (art, start, zeilen)-Folge, Standard: ein Druck-Band über alles
+    """
+    if popcount is None:
+        popcount = lambda line_idx, line: line_popcount(line)
+    if bands is None:
+        bands = [('print', 0, height)]
+
+    min_pause = WRITE_PLAN_MIN_PAUSE_MS / 1000.0
+    bits_per_line = width_bytes * 8
+
+    init_pause = timing_config['init_delay'] if WRITE_PLAN_KEEP_INIT_DELAY else 0.0
+    if init_pause > 0:
+        yield WriteSegment([ESC_INIT], init_pause, reason='init')
+        buffers = []
+    else:
+        buffers = [ESC_INIT]
+    nbytes = sum(len(b) for b in buffers)
+    lines = 0
+    pause = 0.0
+
+    if ADAPTIVE_LINE_TIMING:
+        base_delay = ADAPTIVE_LINE_BASE_DELAY_MS / 1000.0
+        max_extra = ADAPTIVE_LINE_MAX_EXTRA_MS / 1000.0
+        segment_limit = max_segment_bytes
+    else:
+        base_delay = 0.0
+        max_extra = 0.0
+        segment_limit = max(width_bytes, 480 // width_bytes * width_bytes)
+
+    rows = iter(rows)
+    for band_idx, (kind, start, band_lines) in enumerate(bands):
+        if kind == 'feed':
+            # Leerzeilen nicht senden - nur vorschieben
+            for _ in itertools.islice(rows, band_lines):
+                lines += 1
+            buffers.append(feed_command(band_lines))
+            yield WriteSegment(buffers, 0.0, lines, 'band', band_idx)
+            buffers, nbytes, lines = [], 0, 0
+            continue
+
+        header = raster_header(width_bytes, band_lines)
+        buffers.append(header)
+        nbytes += len(header)
+
+        for line_idx, line in enumerate(itertools.islice(rows, band_lines), start):
+            buffers.append(line)
+            nbytes += len(line)
+            lines += 1
+
+            reason = None
+            if ADAPTIVE_LINE_TIMING:
+                pause += base_delay
+                bit_density = popcount(line_idx, line) / bits_per_line
+                if bit_density > ADAPTIVE_LINE_DENSITY_THRESHOLD:
+                    pause += bit_density * max_extra
+                    reason = 'dense'
+            if reason is None and nbytes >= segment_limit:
+                reason = 'batch'
+                if not ADAPTIVE_LINE_TIMING:
+                    pause = timing_config['block_delay']
+
+            if reason is not None and (pause >= min_pause or reason == 'batch'):
+                yield WriteSegment(buffers, pause if pause >= min_pause else 0.0, lines, reason, band_idx)
+                if pause >= min_pause:
+                    pause = 0.0
+                buffers, nbytes, lines = [], 0, 0
+
+        # Bandende: Rest des Bands schreiben, aufgelaufene Pause mitnehmen
+        if buffers:
+            yield WriteSegment(buffers, pause if pause >= min_pause else 0.0, lines, 'band', band_idx)
+            if pause >= min_pause:
+                pause = 0.0
+            buffers, nbytes, lines = [], 0, 0
+
+    if buffers:
+        yield WriteSegment(buffers, 0.0, lines, 'band', len(bands) - 1)